@@ -12,7 +12,60 @@ class ConfigManager:
                 "model": "llama3",
                 "api_key": ""
             },
-            "view_mode": "list"
+            "view_mode": "list",
+            "embedding": {
+                "backend": "qwen", # "qwen" (fp32/GPU) | "qwen-int8" (CPU 동적 양자화)
+                "batch_size": 8,
+                "max_batch_tokens": 8192,
+                "image_batch_size": 4,
+                "image_max_side": 1024,
+                "decode_workers": 4,
+                "cache_max_entries": 200000
+            },
+            "indexing": {
+                "batch_files": 16,
+                "stop_timeout_sec": 5.0 # 종료 시 처리 중인 배치를 기다리는 최대 시간
+            },
+            "vector_db": {
+                "store_dimension": None, # 예: 256/512/1024 (None이면 전체 차원 저장)
+                "keep_full_vectors": False, # 축소 저장 시 전체 차원 rerank용 컬럼 유지
+                "rerank_factor": 4,
+                "flush_rows": 4096, # write-behind 버퍼 최대 행 수
+                "flush_interval_sec": 5.0,
+                "search_flush_rows": 256, # 검색 직전에는 버퍼가 이 크기 이하일 때만 기록
+                "index_type": "IVF_PQ", # IVF_PQ | IVF_HNSW_SQ | ... (None이면 인덱스 미사용)
+                "index_min_rows": 100000,
+                "index_rebuild_growth": 0.5,
+                "nprobes": 20,
+                "refine_factor": 10
+            },
+            "maintenance": {
+                "enabled": True,
+                "idle_sec": 60, # 큐가 이 시간 이상 비어 있을 때만 실행
+                "min_interval_sec": 3600,
+                "min_small_fragments": 8,
+                "min_versions": 20,
+                "cleanup_older_than_sec": 600, # 이보다 최근 버전은 보존
+                "max_fragments": 128, # 한 번에 합칠 최대 fragment 수 (이보다 많으면 나눠서 실행, null이면 제한 없음)
+                "max_rows": 50000 # 한 번에 다시 기록할 최대 행 수
+            },
+            "search": {
+                "query_cache_size": 256,
+                "persist_query_cache": False,
+                "tag_prefilter_max_files": 20000, # 태그 조건을 벡터 prefilter로 넘길 최대 파일 수
+                "page_size": 50, # 의미 검색 결과 파일 수
+                "overfetch_growth": 4, # 후처리 필터 후 결과가 부족할 때 top_k 증가 배수
+                "max_candidates": 5000,
+                "time_budget_ms": 300,
+                "aggregation": "fused", # 청크 -> 파일 점수: max | mean (상위 N개 평균) | fused
+                "aggregation_top_n": 3,
+                "aggregation_alpha": 0.7, # fused = alpha * max + (1 - alpha) * 상위 N개 합 / N
+                "hybrid": True, # 전문(BM25) 검색 결과를 의미 검색과 RRF로 결합
+                "rrf_k": 60,
+                "lexical_top_k": 200,
+                "lexical_fast_path": True, # 식별자 형태 검색어는 모델 없이 전문 검색만 수행
+                "filename_fuzzy_threshold": 0.5 # 파일명 오타 허용 검색의 최소 trigram 일치 비율
+            }
         }
         self.load()
 
@@ -72,3 +125,18 @@ class ConfigManager:
             "base_url": base_url
         }
         self.save()
+
+    def get_embedding_config(self):
+        return self.config.get("embedding", {})
+
+    def get_indexing_config(self):
+        return self.config.get("indexing", {})
+
+    def get_search_config(self):
+        return self.config.get("search", {})
+
+    def get_vector_db_config(self):
+        return self.config.get("vector_db", {})
+
+    def get_maintenance_config(self):
+        return self.config.get("maintenance", {})
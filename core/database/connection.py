@@ -0,0 +1,103 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# WAL: 읽기(UI 검색/폴더 탐색)와 쓰기(인덱싱 워커)가 서로 막지 않음
+# synchronous=NORMAL: WAL에서는 커밋마다 fsync하지 않아도 손상되지 않음 (전원 장애 시 마지막 커밋만 유실 가능)
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -65536, # KiB 단위 (64MB)
+    "mmap_size": 268435456, # 256MB
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000, # ms, 다른 스레드가 쓰는 중이면 대기 후 재시도
+    "foreign_keys": "ON", # 스키마의 ON DELETE CASCADE 적용 (SQLite 기본값은 OFF)
+}
+
+class ThreadLocalConnections:
+    """
+    스레드마다 하나의 장기 SQLite 연결을 재사용합니다.
+    호출마다 connect/close 하면 연결 설정, 스키마 로드, 페이지 캐시 재구성 비용을 매번 치르게 됩니다.
+
+    connection()은 기존 `with self._get_connection() as conn:` 패턴과 호환됩니다:
+    예외가 발생하거나 가장 바깥 블록이 커밋하지 않고 끝나면 롤백합니다 (기존 close 시 폐기 동작과 동일).
+    """
+    def __init__(self, db_path, pragmas=None):
+        self.db_path = db_path
+        self.pragmas = DEFAULT_PRAGMAS if pragmas is None else pragmas
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.pragmas.get("busy_timeout", 5000) / 1000.0)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def get(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.depth = 0
+            self._local.tx_depth = 0
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self.get()
+        self._local.depth += 1
+        try:
+            yield conn
+        except BaseException:
+            # transaction() 블록 안에서는 해당 블록(SAVEPOINT)이 되돌림을 담당
+            if conn.in_transaction and self._local.tx_depth == 0:
+                conn.rollback()
+            raise
+        finally:
+            self._local.depth -= 1
+            if self._local.depth == 0 and conn.in_transaction:
+                conn.rollback()
+
+    @contextmanager
+    def transaction(self):
+        """
+        블록 전체를 하나의 트랜잭션으로 실행하고 정상 종료 시 한 번 커밋합니다.
+        중첩 호출은 SAVEPOINT로 처리되어 안쪽 블록의 예외는 그 블록의 변경만 되돌립니다.
+        """
+        with self.connection() as conn:
+            level = self._local.tx_depth
+            savepoint = f"sp_{level}"
+            if level == 0:
+                if conn.in_transaction:
+                    conn.commit() # 트랜잭션 밖에서 남긴 변경을 섞지 않도록 먼저 정리
+                conn.execute("BEGIN")
+            else:
+                conn.execute(f"SAVEPOINT {savepoint}")
+            self._local.tx_depth += 1
+            try:
+                yield conn
+            except BaseException:
+                if level == 0:
+                    conn.rollback()
+                else:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                raise
+            else:
+                if level == 0:
+                    conn.commit()
+                else:
+                    conn.execute(f"RELEASE {savepoint}")
+            finally:
+                self._local.tx_depth -= 1
+
+    def in_transaction_block(self):
+        """현재 스레드가 transaction() 블록 안에 있는지 여부 (개별 메서드는 커밋을 미룸)"""
+        return getattr(self._local, "tx_depth", 0) > 0
+
+    def close(self):
+        """현재 스레드의 연결을 닫습니다. (다른 스레드의 연결은 스레드 종료 시 정리)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,42 @@
+import os
+
+def directory_key(path):
+    """
+    디렉터리 경로의 정규화 키: normcase + normpath, 구분자는 '/', 항상 '/'로 끝남.
+    예: "C:\\Users\\Me\\Docs" -> "c:/users/me/docs/" (Windows)
+    하위 폴더 키는 모두 이 키로 시작하므로 서브트리는 [key, subtree_upper_bound(key)) 범위 조회가 됩니다.
+    """
+    key = os.path.normcase(os.path.normpath(path)).replace("\\", "/")
+    if not key.endswith("/"):
+        key += "/"
+    return key
+
+def subtree_upper_bound(key):
+    """key로 시작하는 모든 문자열보다 큰 최소 경계 ('/' 다음 문자는 '0')."""
+    return key[:-1] + "0"
+
+def ensure_directory(cursor, dir_path, cache=None):
+    """
+    directories 행을 (조상 폴더 포함) 보장하고 ID를 반환합니다. 경로가 비어 있으면 None.
+    cache: {path_key: id} 일괄 처리 시 조회 생략용 (트랜잭션 안에서만 유효)
+    """
+    if not dir_path:
+        return None
+    dir_path = os.path.normpath(dir_path)
+    key = directory_key(dir_path)
+    if cache is not None and key in cache:
+        return cache[key]
+
+    cursor.execute("SELECT id FROM directories WHERE path_key = ?", (key,))
+    row = cursor.fetchone()
+    if row:
+        dir_id = row[0]
+    else:
+        parent = os.path.dirname(dir_path)
+        parent_id = ensure_directory(cursor, parent, cache) if parent and parent != dir_path else None
+        cursor.execute("INSERT INTO directories (path_key, parent_id, path) VALUES (?, ?, ?) RETURNING id",
+                       (key, parent_id, dir_path))
+        dir_id = cursor.fetchone()[0]
+    if cache is not None:
+        cache[key] = dir_id
+    return dir_id
@@ -0,0 +1,84 @@
+import time
+import threading
+from datetime import timedelta
+
+class VectorMaintenanceScheduler:
+    """
+    인덱싱 큐가 일정 시간 유휴 상태일 때 벡터 테이블의 fragment 병합과 오래된 버전 정리를 실행합니다.
+    잦은 append/delete로 늘어난 작은 fragment와 버전 파일은 검색 지연과 디스크 사용량을 키우므로
+    인덱싱이 없는 시간에 주기적으로 정리합니다.
+
+    한 번의 실행 범위는 다음으로 제한됩니다.
+    - min_interval 안에는 다시 실행하지 않음
+    - 작은 fragment/누적 버전 수가 임계값 미만이면 건너뜀
+    - cleanup_older_than보다 최근 버전은 남김 (동시에 열린 검색 핸들 보호)
+    - 작은 fragment가 max_fragments보다 많으면 그중 일부(max_fragments개, max_rows행 이내)만 합침.
+      남은 작업이 있으면 min_interval을 기다리지 않고 다음 유휴 tick에서 이어서 실행
+    """
+    def __init__(self, vector_db, queue_manager, idle_seconds=60, min_interval=3600,
+                 min_small_fragments=8, min_versions=20, cleanup_older_than=600, max_fragments=None,
+                 max_rows=None, poll_interval=5.0):
+        self.vector_db = vector_db
+        self.queue_manager = queue_manager
+        self.idle_seconds = idle_seconds
+        self.min_interval = min_interval
+        self.min_small_fragments = min_small_fragments
+        self.min_versions = min_versions
+        self.cleanup_older_than = timedelta(seconds=cleanup_older_than)
+        self.max_fragments = max_fragments
+        self.max_rows = max_rows
+        self.poll_interval = poll_interval
+
+        self.last_run = None # monotonic
+        self.last_result = None
+        self._idle_since = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    def _is_queue_idle(self):
+        return self.queue_manager.get_queue_size() == 0 and self.queue_manager.get_current_task() is None
+
+    def _loop(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"[Maintenance] Error: {e}")
+
+    def tick(self, now=None):
+        """유휴 시간과 실행 간격 조건을 확인하고 필요하면 정리를 실행합니다. 실행 결과(또는 None)를 반환합니다."""
+        now = time.monotonic() if now is None else now
+        if not self._is_queue_idle():
+            self._idle_since = None
+            return None
+        if self._idle_since is None:
+            self._idle_since = now
+        if now - self._idle_since < self.idle_seconds:
+            return None
+        resume = self.last_result is not None and self.last_result.get("partial")
+        if self.last_run is not None and now - self.last_run < self.min_interval and not resume:
+            return None
+        return self.run_once(now)
+
+    def run_once(self, now=None):
+        self.last_run = time.monotonic() if now is None else now
+        resume = self.last_result is not None and self.last_result.get("partial")
+        self.last_result = None
+        if not resume and not self.vector_db.needs_compaction(self.min_small_fragments, self.min_versions):
+            return None
+        print("[Maintenance] Queue idle, compacting vector table...")
+        self.last_result = self.vector_db.compact(cleanup_older_than=self.cleanup_older_than,
+                                                  max_fragments=self.max_fragments, max_rows=self.max_rows)
+        return self.last_result
@@ -0,0 +1,188 @@
+"""
+metadata.db 스키마 마이그레이션.
+
+PRAGMA user_version에 적용된 마지막 버전을 기록하고, 그 이후 항목만 순서대로 실행합니다.
+각 마이그레이션은 DatabaseManager.transaction() 안에서 user_version 갱신과 함께 커밋됩니다.
+새 스키마 변경은 기존 항목을 고치지 말고 목록 끝에 추가하세요.
+
+버전 관리 이전에 만들어진 DB는 user_version이 0이므로 1~3번은 기존 테이블이 있어도
+안전하게 다시 실행되도록(IF NOT EXISTS) 작성되어 있습니다.
+"""
+import os
+from core.database.directories import ensure_directory
+
+def _base_schema(cursor):
+    # Files table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_path TEXT UNIQUE NOT NULL,
+            file_name TEXT NOT NULL,
+            extension TEXT,
+            last_modified TIMESTAMP,
+            indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # Tags table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tags (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            color TEXT DEFAULT '#007acc',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # color 컬럼 이전에 만들어진 tags 테이블
+    cursor.execute("PRAGMA table_info(tags)")
+    columns = [info[1] for info in cursor.fetchall()]
+    if 'color' not in columns:
+        cursor.execute("ALTER TABLE tags ADD COLUMN color TEXT DEFAULT '#007acc'")
+    # FileTags relationship table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS file_tags (
+            file_id INTEGER,
+            tag_id INTEGER,
+            FOREIGN KEY(file_id) REFERENCES files(id) ON DELETE CASCADE,
+            FOREIGN KEY(tag_id) REFERENCES tags(id) ON DELETE CASCADE,
+            PRIMARY KEY(file_id, tag_id)
+        )
+    """)
+    # FileVectors table (Vector DB ID mapping)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS file_vectors (
+            id INTEGER PRIMARY KEY, -- This will be the Vector DB ID
+            file_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(file_id) REFERENCES files(id) ON DELETE CASCADE
+        )
+    """)
+
+def _full_text_indexes(cursor):
+    # 청크 전문 검색 인덱스 (rowid = Vector DB ID)
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+            content,
+            chunk_index UNINDEXED,
+            tokenize = 'unicode61'
+        )
+    """)
+    # 파일명/경로 trigram 인덱스 (files 테이블을 external content로 사용, 트리거로 동기화)
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS files_name_fts USING fts5(
+            file_name,
+            file_path,
+            content = 'files',
+            content_rowid = 'id',
+            tokenize = 'trigram'
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS files_name_fts_ai AFTER INSERT ON files BEGIN
+            INSERT INTO files_name_fts (rowid, file_name, file_path) VALUES (new.id, new.file_name, new.file_path);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS files_name_fts_ad AFTER DELETE ON files BEGIN
+            INSERT INTO files_name_fts (files_name_fts, rowid, file_name, file_path)
+            VALUES ('delete', old.id, old.file_name, old.file_path);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS files_name_fts_au AFTER UPDATE OF file_name, file_path ON files BEGIN
+            INSERT INTO files_name_fts (files_name_fts, rowid, file_name, file_path)
+            VALUES ('delete', old.id, old.file_name, old.file_path);
+            INSERT INTO files_name_fts (rowid, file_name, file_path) VALUES (new.id, new.file_name, new.file_path);
+        END
+    """)
+    # 이미 등록된 파일로 인덱스 생성
+    cursor.execute("INSERT INTO files_name_fts (files_name_fts) VALUES ('rebuild')")
+
+def _roots(cursor):
+    # Roots table (모니터링 루트 폴더 ID, 벡터 테이블 root_id 컬럼에 기록)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS roots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT UNIQUE NOT NULL
+        )
+    """)
+
+def _hot_query_indexes(cursor):
+    # get_vector_ids, 파일 삭제 시 file_vectors cascade
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_vectors_file_id ON file_vectors(file_id)")
+    # 태그 검색(tag -> files), 태그 삭제 시 file_tags cascade. (file_id, tag_id) PK는 반대 방향만 지원
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_tags_tag_id ON file_tags(tag_id, file_id)")
+    # 확장자별 파일 조회
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_files_extension ON files(extension)")
+
+def _directories(cursor):
+    # 폴더 계층 (path_key: directory_key()로 정규화, 범위 조회로 서브트리 검색)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS directories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path_key TEXT UNIQUE NOT NULL,
+            parent_id INTEGER REFERENCES directories(id),
+            path TEXT NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_directories_parent_id ON directories(parent_id)")
+    cursor.execute("ALTER TABLE files ADD COLUMN dir_id INTEGER REFERENCES directories(id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_files_dir_id ON files(dir_id)")
+
+    # 기존 파일 backfill
+    cache = {}
+    updates = [(ensure_directory(cursor, os.path.dirname(file_path), cache), file_id)
+               for file_id, file_path in cursor.execute("SELECT id, file_path FROM files").fetchall()]
+    cursor.executemany("UPDATE files SET dir_id = ? WHERE id = ?", updates)
+
+def _file_fingerprint(cursor):
+    # 변경 감지용 정수 mtime(ns), 크기, 내용 해시 (기존 행은 NULL -> 다음 스캔 때 채움)
+    cursor.execute("ALTER TABLE files ADD COLUMN mtime_ns INTEGER")
+    cursor.execute("ALTER TABLE files ADD COLUMN size INTEGER")
+    cursor.execute("ALTER TABLE files ADD COLUMN content_hash TEXT")
+
+def _vector_id_autoincrement(cursor):
+    # 롤백/삭제된 Vector ID가 재발급되지 않도록 AUTOINCREMENT 테이블로 재생성
+    # (벡터 DB에 남은 이전 ID의 벡터가 새 파일 결과로 검색되지 않도록)
+    cursor.execute("""
+        CREATE TABLE file_vectors_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, -- This will be the Vector DB ID
+            file_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(file_id) REFERENCES files(id) ON DELETE CASCADE
+        )
+    """)
+    # files에 없는 file_id의 매핑(이전 버전에서 남은 고아 행)은 외래 키 제약 때문에 복사하지 않음
+    last_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM file_vectors").fetchone()[0]
+    cursor.execute("""
+        INSERT INTO file_vectors_new (id, file_id, created_at)
+        SELECT id, file_id, created_at FROM file_vectors
+        WHERE file_id IN (SELECT id FROM files)
+    """)
+    cursor.execute("DROP TABLE file_vectors")
+    cursor.execute("ALTER TABLE file_vectors_new RENAME TO file_vectors")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_vectors_file_id ON file_vectors(file_id)")
+    # 버린 고아 행과 매핑이 지워진 뒤 chunks_fts에 남은 ID도 다시 쓰지 않음
+    cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'file_vectors'")
+    cursor.execute("""
+        INSERT INTO sqlite_sequence (name, seq)
+        SELECT 'file_vectors', MAX(?, COALESCE((SELECT MAX(rowid) FROM chunks_fts), 0))
+    """, (last_id,))
+
+def _vectors_pending(cursor):
+    # 벡터 DB에 아직 기록되지 않은(write-behind 버퍼) 파일 표시. 1이면 stat이 같아도 다시 인덱싱
+    cursor.execute("ALTER TABLE files ADD COLUMN vectors_pending INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_files_vectors_pending ON files(id) WHERE vectors_pending = 1")
+
+# (버전, 설명, 함수). 버전은 1부터 연속
+MIGRATIONS = [
+    (1, "base schema", _base_schema),
+    (2, "chunk/file name full-text indexes", _full_text_indexes),
+    (3, "roots table", _roots),
+    (4, "indexes for hot queries", _hot_query_indexes),
+    (5, "directory hierarchy", _directories),
+    (6, "file stat/content fingerprint", _file_fingerprint),
+    (7, "never reuse vector ids", _vector_id_autoincrement),
+    (8, "pending vector writes", _vectors_pending),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
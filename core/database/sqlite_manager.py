@@ -1,124 +1,275 @@
 import sqlite3
 import os
-from datetime import datetime
+import json
+import threading
+import numpy as np
 from contextlib import contextmanager
+from datetime import datetime
+from core.database.connection import ThreadLocalConnections
+from core.database.migrations import MIGRATIONS, SCHEMA_VERSION
+from core.database.directories import directory_key, subtree_upper_bound, ensure_directory
+from core.search.tag_index import TagPostingIndex
 
 class DatabaseManager:
     def __init__(self, db_path="data/metadata.db"):
         if os.path.dirname(db_path):
             os.makedirs(os.path.dirname(db_path), exist_ok=True)
         self.db_path = db_path
+        # 스레드별 장기 연결 (WAL + 튜닝된 pragma)
+        self._connections = ThreadLocalConnections(db_path)
+        # 태그 카탈로그 캐시: name -> (id, color), 역색인 id -> name (쓰기 시 함께 갱신)
+        self._tag_lock = threading.Lock()
+        self._tags_by_name = None
+        self._tag_names = None
+        # 태그별 파일 ID 목록 (태그 필터용, file_tags 변경 시 증분 갱신)
+        self._tag_postings = None
+        # 캐시 대상 쓰기마다 증가. 캐시를 로드하는 동안 값이 바뀌었으면 (그 쓰기는 캐시가 없어 반영되지 않았으므로)
+        # 로드 결과를 캐시하지 않음
+        self._tag_generation = 0
+        self._tag_local = threading.local() # dirty: 트랜잭션 블록 안에서 캐시 대상 쓰기를 한 스레드
         self._init_db()
 
-    @contextmanager
     def _get_connection(self):
-        conn = sqlite3.connect(self.db_path)
+        return self._connections.connection()
+
+    def close(self):
+        """현재 스레드의 연결을 닫습니다."""
+        self._connections.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        여러 메서드 호출을 하나의 트랜잭션(단일 커밋)으로 묶습니다.
+        블록 안에서는 각 메서드가 커밋하지 않으며, 예외 발생 시 블록 전체를 되돌립니다.
+        중첩하면 SAVEPOINT로 동작합니다 (예: 일괄 처리 중 파일 하나만 실패 처리).
+
+            with db.transaction():
+                file_id = db.upsert_file(path, mtime)
+                ids = db.allocate_vector_ids(file_id, len(chunks))
+        """
+        outer = not self._connections.in_transaction_block()
         try:
-            yield conn
+            with self._connections.transaction() as conn:
+                yield conn
         finally:
-            conn.close()
+            if outer and getattr(self._tag_local, "dirty", False):
+                self._tag_local.dirty = False
+                # 커밋/롤백 후 다시 무효화: 블록 도중 다른 스레드가 커밋 전 상태로 캐시를 채웠을 수 있음
+                self._invalidate_tag_caches()
+
+    def _commit(self, conn):
+        # transaction() 블록 안이면 블록 종료 시 한 번에 커밋
+        if not self._connections.in_transaction_block():
+            conn.commit()
 
     def _init_db(self):
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            # Files table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS files (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    file_path TEXT UNIQUE NOT NULL,
-                    file_name TEXT NOT NULL,
-                    extension TEXT,
-                    last_modified TIMESTAMP,
-                    indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            # Tags table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS tags (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL,
-                    color TEXT DEFAULT '#007acc',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Migration: Add color column if not exists
-            cursor.execute("PRAGMA table_info(tags)")
-            columns = [info[1] for info in cursor.fetchall()]
-            if 'color' not in columns:
-                cursor.execute("ALTER TABLE tags ADD COLUMN color TEXT DEFAULT '#007acc'")
-            # FileTags relationship table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS file_tags (
-                    file_id INTEGER,
-                    tag_id INTEGER,
-                    FOREIGN KEY(file_id) REFERENCES files(id) ON DELETE CASCADE,
-                    FOREIGN KEY(tag_id) REFERENCES tags(id) ON DELETE CASCADE,
-                    PRIMARY KEY(file_id, tag_id)
-                )
-            """)
+        """PRAGMA user_version 이후의 마이그레이션을 순서대로 적용합니다 (core/database/migrations.py)."""
+        version = self.get_schema_version()
+        if version > SCHEMA_VERSION:
+            print(f"Warning: metadata.db schema version {version} is newer than supported ({SCHEMA_VERSION})")
+            return
+        for target, description, migrate in MIGRATIONS:
+            if target <= version:
+                continue
+            # 마이그레이션과 버전 기록을 하나의 트랜잭션으로 (중간 실패 시 다음 실행에서 재시도)
+            with self.transaction() as conn:
+                migrate(conn.cursor())
+                conn.execute(f"PRAGMA user_version = {target}")
+            print(f"Migrated metadata.db to v{target}: {description}")
 
-            # FileVectors table (Vector DB ID mapping)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS file_vectors (
-                    id INTEGER PRIMARY KEY, -- This will be the Vector DB ID
-                    file_id INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY(file_id) REFERENCES files(id) ON DELETE CASCADE
-                )
-            """)
-            conn.commit()
+    def get_schema_version(self):
+        with self._get_connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
 
-    def upsert_file(self, file_path, last_modified):
+    def upsert_file(self, file_path, last_modified, mtime_ns=None, size=None, content_hash=None,
+                    vectors_pending=False):
+        """
+        파일 행을 추가/갱신합니다.
+        vectors_pending: 벡터 DB 기록이 끝나지 않은 파일 (mark_vectors_written 전까지 변경 감지에서 '변경됨')
+        """
         file_name = os.path.basename(file_path)
         extension = os.path.splitext(file_path)[1].lower()
         with self._get_connection() as conn:
             cursor = conn.cursor()
+            dir_id = ensure_directory(cursor, os.path.dirname(file_path))
             cursor.execute("""
-                INSERT INTO files (file_path, file_name, extension, last_modified)
-                VALUES (?, ?, ?, ?)
+                INSERT INTO files (file_path, file_name, extension, last_modified, dir_id, mtime_ns, size, content_hash,
+                                   vectors_pending)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ON CONFLICT(file_path) DO UPDATE SET
                     last_modified=excluded.last_modified,
+                    dir_id=excluded.dir_id,
+                    mtime_ns=excluded.mtime_ns,
+                    size=excluded.size,
+                    content_hash=excluded.content_hash,
+                    vectors_pending=excluded.vectors_pending,
                     indexed_at=CURRENT_TIMESTAMP
-            """, (file_path, file_name, extension, last_modified))
-            conn.commit()
+            """, (file_path, file_name, extension, last_modified, dir_id, mtime_ns, size, content_hash,
+                  int(bool(vectors_pending))))
+            self._commit(conn)
             
             # lastrowid는 Insert/Update 상태에 따라 값이 다를 수 있으므로 명시적으로 ID 조회
             cursor.execute("SELECT id FROM files WHERE file_path = ?", (file_path,))
             return cursor.fetchone()[0]
 
+    def _tag_catalog(self, reload=False):
+        """태그 캐시를 반환합니다 (없거나 reload이면 로드). Returns: (by_name, names)"""
+        with self._tag_lock:
+            if reload:
+                self._tags_by_name = self._tag_names = None
+            if self._tags_by_name is not None:
+                return self._tags_by_name, self._tag_names
+            generation = self._tag_generation
+        with self._get_connection() as conn:
+            rows = conn.execute("SELECT id, name, color FROM tags ORDER BY id").fetchall()
+        by_name = {name: (tag_id, color) for tag_id, name, color in rows}
+        names = {tag_id: name for tag_id, name, _ in rows}
+        # 트랜잭션 블록 안에서 읽은 값은 롤백될 수 있으므로 캐시하지 않음
+        if not self._connections.in_transaction_block():
+            with self._tag_lock:
+                # 읽는 동안 다른 스레드가 태그를 바꿨으면 그 변경이 빠진 목록이므로 캐시하지 않음
+                if self._tag_generation == generation:
+                    self._tags_by_name, self._tag_names = by_name, names
+        return by_name, names
+
+    def _cache_tags(self, rows):
+        """쓰기 후 캐시 갱신. rows: [(id, name, color)]"""
+        if not rows or self._defer_tag_write():
+            return
+        with self._tag_lock:
+            self._tag_generation += 1
+            if self._tags_by_name is None:
+                return
+            for tag_id, name, color in rows:
+                self._tags_by_name[name] = (tag_id, color)
+                self._tag_names[tag_id] = name
+
+    def _uncache_tag(self, name):
+        if self._defer_tag_write():
+            return
+        with self._tag_lock:
+            self._tag_generation += 1
+            if self._tags_by_name is None:
+                return
+            entry = self._tags_by_name.pop(name, None)
+            if entry:
+                self._tag_names.pop(entry[0], None)
+
+    def _invalidate_tag_caches(self):
+        """태그 캐시를 모두 비웁니다 (다음 조회 때 다시 로드)."""
+        with self._tag_lock:
+            self._tag_generation += 1
+            self._tags_by_name = self._tag_names = None
+            self._tag_postings = None
+
+    def _defer_tag_write(self):
+        """
+        트랜잭션 블록 안의 쓰기: 롤백될 수 있으므로 캐시를 무효화하고 블록 종료 시 한 번 더 무효화합니다.
+        Returns: 블록 안이면 True (호출 측은 증분 갱신을 건너뜀)
+        """
+        if not self._connections.in_transaction_block():
+            return False
+        self._tag_local.dirty = True
+        self._invalidate_tag_caches()
+        return True
+
+    def tag_postings(self):
+        """태그 필터 엔진을 반환합니다 (없으면 file_tags로 생성)."""
+        with self._tag_lock:
+            if self._tag_postings is not None:
+                return self._tag_postings
+            generation = self._tag_generation
+        with self._get_connection() as conn:
+            rows = conn.execute("SELECT tag_id, file_id FROM file_tags").fetchall()
+        index = TagPostingIndex(rows)
+        if not self._connections.in_transaction_block():
+            with self._tag_lock:
+                # 읽는 동안 다른 스레드가 file_tags를 바꿨으면 그 변경이 빠진 목록이므로 캐시하지 않음
+                if self._tag_generation == generation:
+                    self._tag_postings = index
+        return index
+
+    def _update_postings(self, apply):
+        """커밋된 file_tags 변경을 태그 필터 엔진에 반영합니다. (트랜잭션 블록 안이면 무효화 후 다음 조회 때 재생성)"""
+        if self._defer_tag_write():
+            return
+        with self._tag_lock:
+            self._tag_generation += 1
+            index = self._tag_postings
+            if index is None:
+                return
+        apply(index)
+
+    def _ensure_tags(self, cursor, tag_names):
+        """
+        이름 목록의 태그 ID를 반환합니다 (캐시에 없는 태그만 조회/생성).
+        Returns: ({name: id}, 새로 조회한 행) - 행은 커밋 후 _cache_tags로 캐시에 반영
+        """
+        by_name, _ = self._tag_catalog()
+        ids = {name: by_name[name][0] for name in tag_names if name in by_name}
+        missing = list(dict.fromkeys(name for name in tag_names if name not in ids))
+        rows = []
+        if missing:
+            cursor.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)", [(name,) for name in missing])
+            placeholders = ",".join(["?"] * len(missing))
+            cursor.execute(f"SELECT id, name, color FROM tags WHERE name IN ({placeholders})", missing)
+            rows = cursor.fetchall()
+            ids.update((name, tag_id) for tag_id, name, _ in rows)
+        return ids, rows
+
     def add_tag(self, tag_name, color="#007acc"):
+        by_name, _ = self._tag_catalog()
+        if tag_name in by_name:
+            return by_name[tag_name][0]
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("INSERT OR IGNORE INTO tags (name, color) VALUES (?, ?)", (tag_name, color))
-            conn.commit()
-            cursor.execute("SELECT id FROM tags WHERE name = ?", (tag_name,))
-            return cursor.fetchone()[0]
+            self._commit(conn)
+            cursor.execute("SELECT id, name, color FROM tags WHERE name = ?", (tag_name,))
+            row = cursor.fetchone()
+            self._cache_tags([row])
+            return row[0]
 
     def update_tag_color(self, tag_name, color):
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("UPDATE tags SET color = ? WHERE name = ?", (color, tag_name))
-            conn.commit()
-            return cursor.rowcount > 0
+            cursor.execute("UPDATE tags SET color = ? WHERE name = ? RETURNING id", (color, tag_name))
+            row = cursor.fetchone()
+            self._commit(conn)
+            if row:
+                self._cache_tags([(row[0], tag_name, color)])
+            return row is not None
 
     def link_file_tag(self, file_path, tag_name):
+        self.link_file_tags(file_path, [tag_name])
+
+    def link_file_tags(self, file_path, tag_names):
+        """파일에 여러 태그를 한 번에 연결합니다 (없는 태그는 생성)."""
+        if not tag_names:
+            return
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT id FROM files WHERE file_path = ?", (file_path,))
             file_row = cursor.fetchone()
             if not file_row: return
-            
-            tag_id = self.add_tag(tag_name)
-            cursor.execute("INSERT OR IGNORE INTO file_tags (file_id, tag_id) VALUES (?, ?)", 
-                           (file_row[0], tag_id))
-            conn.commit()
+
+            tag_ids, new_rows = self._ensure_tags(cursor, tag_names)
+            cursor.executemany("INSERT OR IGNORE INTO file_tags (file_id, tag_id) VALUES (?, ?)",
+                               [(file_row[0], tag_id) for tag_id in set(tag_ids.values())])
+            self._commit(conn)
+        self._cache_tags(new_rows)
+        def apply(index):
+            for tag_id in set(tag_ids.values()):
+                index.add(tag_id, [file_row[0]])
+        self._update_postings(apply)
 
     def get_all_tags(self):
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT name, color FROM tags")
-            return cursor.fetchall() # Returns list of (name, color) tuples
+        by_name, _ = self._tag_catalog()
+        return [(name, color) for name, (_, color) in by_name.items()] # Returns list of (name, color) tuples
+
+    def get_tag_names(self):
+        """태그 이름 목록 (캐시에서 조회, 인덱싱 중 태그 생성 프롬프트용)."""
+        return list(self._tag_catalog()[0])
 
     def search_by_tag(self, tag_name):
         with self._get_connection() as conn:
@@ -133,35 +284,7 @@ class DatabaseManager:
 
     def search_by_tags(self, tags, condition="AND"):
         if not tags: return []
-        
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            if condition == "OR":
-                placeholders = ",".join(["?"] * len(tags))
-                query = f"""
-                    SELECT DISTINCT f.file_path FROM files f
-                    JOIN file_tags ft ON f.id = ft.file_id
-                    JOIN tags t ON ft.tag_id = t.id
-                    WHERE t.name IN ({placeholders})
-                """
-                cursor.execute(query, tags)
-                
-            else: # AND
-                # Find files that have ALL tags
-                # Use intersection or count grouping
-                placeholders = ",".join(["?"] * len(tags))
-                query = f"""
-                    SELECT f.file_path FROM files f
-                    JOIN file_tags ft ON f.id = ft.file_id
-                    JOIN tags t ON ft.tag_id = t.id
-                    WHERE t.name IN ({placeholders})
-                    GROUP BY f.id
-                    HAVING COUNT(DISTINCT t.id) = ?
-                """
-                cursor.execute(query, tags + [len(tags)])
-                
-            return [row[0] for row in cursor.fetchall()]
+        return self.get_file_paths_by_ids(self.get_file_ids_by_tags(tags, condition=condition))
 
     def get_tags_for_file(self, file_path):
         with self._get_connection() as conn:
@@ -186,37 +309,52 @@ class DatabaseManager:
             cursor = conn.cursor()
             placeholders = ",".join(["?"] * len(file_paths))
             query = f"""
-                SELECT f.file_path, t.name, t.color 
+                SELECT f.file_path, ft.tag_id
                 FROM files f
                 JOIN file_tags ft ON f.id = ft.file_id
-                JOIN tags t ON ft.tag_id = t.id
                 WHERE f.file_path IN ({placeholders})
             """
             cursor.execute(query, file_paths)
-            
-            result = {}
-            for row in cursor.fetchall():
-                path, tag_name, tag_color = row
-                if path not in result:
-                    result[path] = []
-                result[path].append((tag_name, tag_color))
-            return result
+            rows = cursor.fetchall()
+
+        # 태그 이름/색상은 캐시의 역색인으로 변환
+        by_name, names = self._tag_catalog()
+        if any(tag_id not in names for _, tag_id in rows):
+            # 캐시 로드 이후 만들어진 태그 (다른 연결 등): 건너뛰지 않고 다시 로드
+            by_name, names = self._tag_catalog(reload=True)
+        result = {}
+        for path, tag_id in rows:
+            tag_name = names.get(tag_id)
+            if tag_name is None:
+                continue
+            if path not in result:
+                result[path] = []
+            result[path].append((tag_name, by_name[tag_name][1]))
+        return result
 
     def delete_tag(self, tag_name):
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM tags WHERE name = ?", (tag_name,))
-            conn.commit()
+            cursor.execute("DELETE FROM tags WHERE name = ? RETURNING id", (tag_name,))
+            row = cursor.fetchone()
+            self._commit(conn)
+        self._uncache_tag(tag_name)
+        if row:
+            self._update_postings(lambda index: index.drop_tag(row[0]))
 
     def rename_tag(self, old_name, new_name):
         with self._get_connection() as conn:
             cursor = conn.cursor()
             try:
-                cursor.execute("UPDATE tags SET name = ? WHERE name = ?", (new_name, old_name))
-                conn.commit()
-                return True
+                cursor.execute("UPDATE tags SET name = ? WHERE name = ? RETURNING id, name, color", (new_name, old_name))
+                row = cursor.fetchone()
+                self._commit(conn)
             except sqlite3.IntegrityError:
                 return False
+        self._uncache_tag(old_name)
+        if row:
+            self._cache_tags([row])
+        return True
 
     def update_file_tags(self, file_path, new_tags):
         with self._get_connection() as conn:
@@ -234,10 +372,11 @@ class DatabaseManager:
                          extension = os.path.splitext(file_path)[1].lower()
                          mtime = os.path.getmtime(file_path)
                          
+                         dir_id = ensure_directory(cursor, os.path.dirname(file_path))
                          cursor.execute("""
-                            INSERT INTO files (file_path, file_name, extension, last_modified)
-                            VALUES (?, ?, ?, ?)
-                         """, (file_path, file_name, extension, mtime))
+                            INSERT INTO files (file_path, file_name, extension, last_modified, dir_id)
+                            VALUES (?, ?, ?, ?, ?)
+                         """, (file_path, file_name, extension, mtime, dir_id))
                          file_id = cursor.lastrowid
                      except Exception as e:
                          print(f"Error auto-registering file {file_path}: {e}")
@@ -248,11 +387,8 @@ class DatabaseManager:
                 file_id = file_row[0]
 
             # 2. Get tag IDs for new tags (create if not exists)
-            tag_ids = []
-            for tag in new_tags:
-                cursor.execute("INSERT OR IGNORE INTO tags (name) VALUES (?)", (tag,))
-                cursor.execute("SELECT id FROM tags WHERE name = ?", (tag,))
-                tag_ids.append(cursor.fetchone()[0])
+            ids_by_name, new_rows = self._ensure_tags(cursor, new_tags)
+            tag_ids = list(dict.fromkeys(ids_by_name[tag] for tag in new_tags))
             
             # 3. Update relationships
             # Remove old
@@ -260,13 +396,140 @@ class DatabaseManager:
             # Add new
             for tag_id in tag_ids:
                 cursor.execute("INSERT INTO file_tags (file_id, tag_id) VALUES (?, ?)", (file_id, tag_id))
-            conn.commit()
+            self._commit(conn)
+        self._cache_tags(new_rows)
+        def apply(index):
+            index.drop_files([file_id])
+            for tag_id in tag_ids:
+                index.add(tag_id, [file_id])
+        self._update_postings(apply)
 
     def delete_file(self, file_path):
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM files WHERE file_path = ?", (file_path,))
-            conn.commit()
+            cursor.execute("DELETE FROM files WHERE file_path = ? RETURNING id", (file_path,))
+            deleted = [row[0] for row in cursor.fetchall()]
+            self._commit(conn)
+        if deleted:
+            self._update_postings(lambda index: index.drop_files(deleted))
+
+    def get_file_state(self, file_path):
+        """변경 감지용 저장 상태. Returns: {last_modified, mtime_ns, size, content_hash, vectors_pending} 또는 None"""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT last_modified, mtime_ns, size, content_hash, vectors_pending FROM files WHERE file_path = ?
+            """, (file_path,))
+            row = cursor.fetchone()
+            if row:
+                return {"last_modified": row[0], "mtime_ns": row[1], "size": row[2], "content_hash": row[3],
+                        "vectors_pending": bool(row[4])}
+            return None
+
+    def mark_vectors_written(self, file_ids):
+        """벡터 DB flush가 끝난 파일의 vectors_pending 표시를 지웁니다 (VectorDBManager.on_flush 콜백)."""
+        if len(file_ids) == 0:
+            return
+        with self._get_connection() as conn:
+            conn.execute("""
+                UPDATE files SET vectors_pending = 0
+                WHERE vectors_pending = 1 AND id IN (SELECT value FROM json_each(?))
+            """, (json.dumps([int(file_id) for file_id in file_ids]),))
+            self._commit(conn)
+
+    def get_pending_vector_files(self):
+        """벡터가 기록되기 전에 종료되어 다시 인덱싱해야 하는 파일 경로 목록."""
+        with self._get_connection() as conn:
+            return [row[0] for row in conn.execute("SELECT file_path FROM files WHERE vectors_pending = 1")]
+
+    def update_file_stat(self, file_path, last_modified, mtime_ns, size, content_hash=None):
+        """내용이 그대로인 파일(touch, 복사 등)의 stat 정보만 갱신합니다 (재인덱싱 없음)."""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE files SET last_modified = ?, mtime_ns = ?, size = ?,
+                                 content_hash = COALESCE(?, content_hash)
+                WHERE file_path = ?
+            """, (last_modified, mtime_ns, size, content_hash, file_path))
+            self._commit(conn)
+
+    def get_directory_files_with_tags(self, dir_path):
+        """
+        폴더 바로 아래 등록된 파일과 태그를 조회합니다 (하위 폴더 제외, dir_id 인덱스 조회).
+        Returns: {file_path: [(tag_name, tag_color), ...]} 태그가 없는 파일은 빈 리스트
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT f.file_path, t.name, t.color
+                FROM directories d
+                JOIN files f ON f.dir_id = d.id
+                LEFT JOIN file_tags ft ON f.id = ft.file_id
+                LEFT JOIN tags t ON ft.tag_id = t.id
+                WHERE d.path_key = ?
+            """, (directory_key(dir_path),))
+            result = {}
+            for path, tag_name, tag_color in cursor.fetchall():
+                tags = result.setdefault(path, [])
+                if tag_name:
+                    tags.append((tag_name, tag_color))
+            return result
+
+    def get_file_ids_under(self, dir_path):
+        """폴더와 모든 하위 폴더의 파일 ID (path_key 범위 조회)."""
+        key = directory_key(dir_path)
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT f.id FROM directories d
+                JOIN files f ON f.dir_id = d.id
+                WHERE d.path_key >= ? AND d.path_key < ?
+            """, (key, subtree_upper_bound(key)))
+            return [row[0] for row in cursor.fetchall()]
+
+    def get_vector_ids_under(self, dir_path):
+        """폴더 서브트리 전체 파일의 Vector ID를 한 번의 쿼리로 조회합니다."""
+        key = directory_key(dir_path)
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT fv.id FROM directories d
+                JOIN files f ON f.dir_id = d.id
+                JOIN file_vectors fv ON fv.file_id = f.id
+                WHERE d.path_key >= ? AND d.path_key < ?
+            """, (key, subtree_upper_bound(key)))
+            return [row[0] for row in cursor.fetchall()]
+
+    def delete_files_under(self, dir_path):
+        """
+        폴더 서브트리의 파일(file_vectors/file_tags는 cascade), 청크 전문 검색 행, 폴더 행을 삭제합니다.
+        벡터 DB의 벡터는 호출 측에서 먼저 삭제해야 합니다. Returns: 삭제된 파일 수
+        """
+        key = directory_key(dir_path)
+        bounds = (key, subtree_upper_bound(key))
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            # 청크 전문 검색 행 (가상 테이블이라 cascade 대상이 아님)
+            cursor.execute("""
+                DELETE FROM chunks_fts WHERE rowid IN (
+                    SELECT fv.id FROM directories d
+                    JOIN files f ON f.dir_id = d.id
+                    JOIN file_vectors fv ON fv.file_id = f.id
+                    WHERE d.path_key >= ? AND d.path_key < ?
+                )
+            """, bounds)
+            cursor.execute("""
+                DELETE FROM files WHERE dir_id IN (
+                    SELECT id FROM directories WHERE path_key >= ? AND path_key < ?
+                )
+                RETURNING id
+            """, bounds)
+            deleted = [row[0] for row in cursor.fetchall()]
+            cursor.execute("DELETE FROM directories WHERE path_key >= ? AND path_key < ?", bounds)
+            self._commit(conn)
+        if deleted:
+            self._update_postings(lambda index: index.drop_files(deleted))
+        return len(deleted)
 
     def get_file_metadata(self, file_path):
         with self._get_connection() as conn:
@@ -282,9 +545,26 @@ class DatabaseManager:
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("INSERT INTO file_vectors (file_id) VALUES (?)", (file_id,))
-            conn.commit()
+            self._commit(conn)
             return cursor.lastrowid
 
+    def allocate_vector_ids(self, file_id, count):
+        """파일에 Vector ID count개를 한 번의 INSERT로 발급합니다. Returns: 오름차순 ID 리스트"""
+        if count <= 0:
+            return []
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                WITH RECURSIVE seq(n) AS (
+                    SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?
+                )
+                INSERT INTO file_vectors (file_id) SELECT ? FROM seq
+                RETURNING id
+            """, (count, file_id))
+            ids = sorted(row[0] for row in cursor.fetchall())
+            self._commit(conn)
+            return ids
+
     def get_vector_ids(self, file_id):
         """Retrieves all vector IDs associated with a file."""
         with self._get_connection() as conn:
@@ -300,7 +580,110 @@ class DatabaseManager:
             cursor = conn.cursor()
             placeholders = ",".join(["?"] * len(vector_ids))
             cursor.execute(f"DELETE FROM file_vectors WHERE id IN ({placeholders})", vector_ids)
-            conn.commit()
+            cursor.execute(f"DELETE FROM chunks_fts WHERE rowid IN ({placeholders})", vector_ids)
+            self._commit(conn)
+
+    def add_chunk_texts(self, vector_ids, texts):
+        """청크 텍스트를 전문 검색 인덱스에 추가합니다 (vector_ids와 같은 순서, 청크 번호는 순서대로)."""
+        if not vector_ids:
+            return
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("INSERT OR REPLACE INTO chunks_fts (rowid, content, chunk_index) VALUES (?, ?, ?)",
+                               [(vid, text, i) for i, (vid, text) in enumerate(zip(vector_ids, texts))])
+            self._commit(conn)
+
+    def get_vector_files(self, vector_ids):
+        """
+        Vector ID별 파일 정보 (벡터 DB 메타데이터 backfill용).
+        Returns: {vector_id: (file_id, file_path, chunk_index)} 매핑이 없는 ID는 제외.
+        chunk_index는 파일의 Vector ID 오름차순 위치 (청크 순서대로 발급됨)
+        """
+        if not vector_ids:
+            return {}
+        ids = json.dumps([int(vid) for vid in vector_ids])
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT v.id, v.file_id, f.file_path, v.chunk_index FROM (
+                    SELECT fv.id, fv.file_id, ROW_NUMBER() OVER (PARTITION BY fv.file_id ORDER BY fv.id) - 1 AS chunk_index
+                    FROM file_vectors fv
+                    WHERE fv.file_id IN (SELECT file_id FROM file_vectors WHERE id IN (SELECT value FROM json_each(?)))
+                ) v
+                JOIN files f ON f.id = v.file_id
+                WHERE v.id IN (SELECT value FROM json_each(?))
+            """, (ids, ids))
+            return {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+
+    def get_files_missing_chunk_texts(self, extensions, after_id=0, limit=100):
+        """
+        벡터는 있지만 청크 전문 검색 행이 없는 파일 (chunks_fts 도입 이전에 인덱싱됨, backfill 대상).
+        Returns: [(file_id, file_path)] file_id 오름차순, after_id 이후부터
+        """
+        placeholders = ",".join(["?"] * len(extensions))
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT f.id, f.file_path FROM files f
+                WHERE f.id > ? AND f.vectors_pending = 0 AND f.extension IN ({placeholders})
+                  AND EXISTS (SELECT 1 FROM file_vectors fv WHERE fv.file_id = f.id)
+                  AND NOT EXISTS (
+                      SELECT 1 FROM file_vectors fv JOIN chunks_fts c ON c.rowid = fv.id WHERE fv.file_id = f.id
+                  )
+                ORDER BY f.id
+                LIMIT ?
+            """, (after_id, *extensions, limit))
+            return cursor.fetchall()
+
+    def search_chunks_fts(self, fts_query, limit=200):
+        """
+        FTS5 MATCH 질의로 청크를 검색합니다.
+        Returns: [(vector_id, file_path, chunk_index, score, file_id)] BM25 점수 내림차순 (클수록 관련도 높음)
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT c.rowid, f.file_path, c.chunk_index, -bm25(chunks_fts) AS score, f.id
+                FROM chunks_fts c
+                JOIN file_vectors fv ON fv.id = c.rowid
+                JOIN files f ON f.id = fv.file_id
+                WHERE chunks_fts MATCH ?
+                ORDER BY bm25(chunks_fts)
+                LIMIT ?
+            """, (fts_query, limit))
+            return cursor.fetchall()
+
+    def search_file_names(self, fts_query, limit=50, column=None):
+        """
+        파일명/경로 trigram 인덱스를 MATCH 질의로 검색합니다. (3글자 이상 검색어)
+        column("file_name" 또는 "file_path")을 지정하면 해당 컬럼만 검색합니다.
+        대량 일치 시 bm25 정렬 비용이 크므로 순서는 보장하지 않습니다 (정렬은 호출 측에서).
+        Returns: [(file_path, file_name)]
+        """
+        if column:
+            fts_query = f"{column} : ({fts_query})"
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT f.file_path, f.file_name
+                FROM files_name_fts
+                JOIN files f ON f.id = files_name_fts.rowid
+                WHERE files_name_fts MATCH ?
+                LIMIT ?
+            """, (fts_query, limit))
+            return cursor.fetchall()
+
+    def search_file_names_like(self, substring, limit=50):
+        """trigram 인덱스로 찾을 수 없는 짧은(1~2글자) 검색어용 파일명 부분 일치 검색."""
+        pattern = "%" + substring.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT file_path, file_name FROM files
+                WHERE file_name LIKE ? ESCAPE '\\'
+                LIMIT ?
+            """, (pattern, limit))
+            return cursor.fetchall()
 
     def get_file_paths_by_vector_ids(self, vector_ids):
         """Retrieves file paths for a given list of vector IDs.
@@ -325,6 +708,66 @@ class DatabaseManager:
                 result[row[0]] = row[1]
             return result
 
+    def get_or_create_root(self, root_path):
+        """모니터링 루트 폴더의 ID를 반환합니다 (없으면 등록)."""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT OR IGNORE INTO roots (path) VALUES (?)", (root_path,))
+            self._commit(conn)
+            cursor.execute("SELECT id FROM roots WHERE path = ?", (root_path,))
+            return cursor.fetchone()[0]
+
+    def get_roots(self):
+        """Returns list of (root_id, path) tuples."""
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, path FROM roots")
+            return cursor.fetchall()
+
+    def get_root_ids_under(self, dir_path):
+        """폴더 자신 또는 그 하위에 있는 모니터링 루트의 ID 목록."""
+        key = directory_key(dir_path)
+        return [root_id for root_id, path in self.get_roots() if directory_key(path).startswith(key)]
+
+    def get_file_ids_by_tags(self, tags, condition="AND", exclude_tags=None):
+        """
+        태그 조건을 만족하는 파일 ID (정렬된 int64 배열, 태그 필터 엔진 사용).
+        condition: "AND"(모든 태그) 또는 "OR"(하나 이상), exclude_tags: 제외할 태그 (NOT)
+        """
+        tags = list(tags or [])
+        exclude_tags = list(exclude_tags or [])
+        if not tags and not exclude_tags:
+            return np.empty(0, dtype=np.int64)
+
+        by_name, _ = self._tag_catalog()
+        tag_ids = [by_name[name][0] for name in tags if name in by_name]
+        if condition != "OR" and len(tag_ids) < len(set(tags)):
+            return np.empty(0, dtype=np.int64) # 존재하지 않는 태그를 모두 가진 파일은 없음
+        if tags and not tag_ids:
+            return np.empty(0, dtype=np.int64)
+        exclude_ids = [by_name[name][0] for name in exclude_tags if name in by_name]
+
+        universe = None
+        if not tags:
+            # NOT 조건만 있으면 전체 파일에서 제외
+            with self._get_connection() as conn:
+                universe = np.array([row[0] for row in conn.execute("SELECT id FROM files ORDER BY id")],
+                                    dtype=np.int64)
+        return self.tag_postings().query(tag_ids, condition=condition, exclude=exclude_ids, universe=universe)
+
+    def get_file_paths_by_ids(self, file_ids):
+        """파일 ID 목록의 경로 (ID 순서 유지, 없는 ID는 제외). 목록 길이와 무관하게 파라미터 1개로 조회."""
+        if len(file_ids) == 0:
+            return []
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT j.value, f.file_path FROM json_each(?) j
+                JOIN files f ON f.id = j.value
+                ORDER BY j.key
+            """, (json.dumps([int(file_id) for file_id in file_ids]),))
+            return [row[1] for row in cursor.fetchall()]
+
     def get_file_id(self, file_path):
         """Retrieves file ID for a given path."""
         with self._get_connection() as conn:
@@ -1,79 +1,628 @@
 import lancedb
 import numpy as np
 import os
+import time
+import threading
 import pyarrow as pa
+from datetime import timedelta
+from lancedb.index import IvfFlat, IvfSq, IvfPq, HnswPq, HnswSq, HnswFlat
+
+def to_fixed_size_list(vectors: np.ndarray) -> pa.FixedSizeListArray:
+    """(N, D) float32 배열을 Python 객체 변환 없이 FixedSizeListArray로 감쌉니다 (연속 버퍼 zero-copy)."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    values = pa.array(vectors.reshape(-1))
+    return pa.FixedSizeListArray.from_arrays(values, vectors.shape[1])
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass # 정리 중 삭제된 파일
+    return total
+
+def _sql_list(values):
+    """where 절 IN (...) 목록 (문자열은 작은따옴표 이스케이프)."""
+    items = []
+    for value in values:
+        if isinstance(value, str):
+            items.append("'" + value.replace("'", "''") + "'")
+        else:
+            items.append(str(int(value)))
+    return ", ".join(items)
+
+# 검색 prefilter용으로 벡터 테이블에 비정규화해 두는 파일 메타데이터 컬럼
+# (컬럼명: (Arrow 타입, 기존 행 기본값 SQL 식))
+METADATA_COLUMNS = {
+    "file_id": (pa.int64(), "CAST(-1 AS BIGINT)"),
+    "extension": (pa.string(), "''"),
+    "kind": (pa.string(), "''"),
+    "root_id": (pa.int64(), "CAST(-1 AS BIGINT)"),
+    "chunk_index": (pa.int32(), "CAST(-1 AS INT)"), # 파일 내 청크 순서 (행 단위)
+}
+
+# 설정의 index_type -> LanceDB 인덱스 설정 클래스 (create_index(config=...))
+INDEX_CONFIGS = {
+    "IVF_FLAT": IvfFlat,
+    "IVF_SQ": IvfSq,
+    "IVF_PQ": IvfPq,
+    "IVF_HNSW_FLAT": HnswFlat,
+    "IVF_HNSW_SQ": HnswSq,
+    "IVF_HNSW_PQ": HnswPq,
+}
+
+class VectorSchemaMismatchError(ValueError):
+    """저장된 벡터 테이블의 차원 설정이 현재 설정과 다를 때 발생합니다."""
+    pass
 
 class VectorDBManager:
-    def __init__(self, dimension, index_path="data/lancedb_store"):
-        self.dimension = dimension
+    def __init__(self, dimension, index_path="data/lancedb_store", store_dimension=None,
+                 keep_full_vectors=False, rerank_factor=4, flush_rows=4096, flush_interval=5.0,
+                 search_flush_rows=256, index_type="IVF_PQ", index_min_rows=100000, index_rebuild_growth=0.5,
+                 nprobes=20, refine_factor=10):
+        self.dimension = dimension # 임베딩 모델 출력 차원
+        # Matryoshka 방식 축소 저장 차원 (None이면 전체 차원 저장)
+        self.store_dimension = store_dimension or dimension
+        if self.store_dimension > dimension:
+            raise ValueError(f"store_dimension {self.store_dimension} exceeds embedding dimension {dimension}")
+        # 전체 차원 벡터를 별도 컬럼에 보관하면 상위 후보를 전체 차원으로 재정렬(rerank) 가능
+        self.keep_full_vectors = keep_full_vectors and self.store_dimension < dimension
+        self.rerank_factor = rerank_factor
         self.index_path = index_path
         self.table_name = "vectors"
+
+        # Write-behind 버퍼: 파일마다 add/delete를 바로 쓰면 Lance fragment와 버전이 파일 수만큼 생기므로
+        # 여러 파일의 변경을 모아 flush_rows 또는 flush_interval(초) 도달 시 한 번에 기록
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        # 검색 직전에는 버퍼가 이 크기 이하일 때만 기록 (UI 스레드가 큰 기록을 기다리지 않도록)
+        self.search_flush_rows = search_flush_rows
+        self.lock = threading.RLock()
+        self._pending_adds = [] # [(ids ndarray, vectors ndarray, 파일 메타데이터 dict)]
+        self._pending_rows = 0
+        self._pending_deletes = set()
+        self._pending_since = None
+        # flush 성공 후 호출: on_flush(file_ids) -> 벡터가 실제로 기록된 파일 ID 목록 (metadata.db 표시 해제용)
+        self.on_flush = None
         
+        # ANN 인덱스: 행 수가 index_min_rows 이상이면 자동 생성하고,
+        # 마지막 생성 시점 대비 index_rebuild_growth 비율만큼 늘어나면 백그라운드에서 재생성
+        self.index_type = index_type
+        self.index_min_rows = index_min_rows
+        self.index_rebuild_growth = index_rebuild_growth
+        self.nprobes = nprobes
+        self.refine_factor = refine_factor
+        self._indexed_rows = 0
+        self._index_thread = None
+        # 메타데이터 컬럼 없이 저장된 행(file_id < 0)이 남아 있는지 여부
+        self._has_legacy_rows = False
+
         # Connect to lancedb directory
         os.makedirs(index_path, exist_ok=True)
         self.db = lancedb.connect(index_path)
         
         if self.table_name in self.db.table_names():
             self.table = self.db.open_table(self.table_name)
+            self._check_schema()
+            self._has_legacy_rows = self.table.count_rows("file_id < 0") > 0
+            self._indexed_rows = self._get_indexed_rows()
         else:
             # Create schema explicitly
-            schema = pa.schema([
-                pa.field("id", pa.int64()),
-                pa.field("vector", pa.list_(pa.float32(), list_size=self.dimension))
-            ])
-            self.table = self.db.create_table(self.table_name, schema=schema)
-
-    def add_vectors(self, vectors: np.ndarray, vector_ids: list):
-        """벡터와 명시적인 ID를 추가합니다. 벡터는 정규화되어야 합니다."""
+            self.table = self.db.create_table(self.table_name, schema=self._build_schema())
+
+    def _build_schema(self):
+        fields = [
+            pa.field("id", pa.int64()),
+            pa.field("vector", pa.list_(pa.float32(), list_size=self.store_dimension))
+        ]
+        if self.keep_full_vectors:
+            fields.append(pa.field("vector_full", pa.list_(pa.float32(), list_size=self.dimension)))
+        for name, (dtype, _) in METADATA_COLUMNS.items():
+            fields.append(pa.field(name, dtype))
+        # 차원 설정을 스키마 메타데이터에 기록하여 설정 변경 시 불일치를 감지
+        metadata = {
+            "embedding_dim": str(self.dimension),
+            "store_dim": str(self.store_dimension),
+        }
+        return pa.schema(fields, metadata=metadata)
+
+    def _check_schema(self):
+        schema = self.table.schema
+        metadata = schema.metadata or {}
+        stored_dim = schema.field("vector").type.list_size
+        # 메타데이터가 없는 기존 테이블은 전체 차원으로 저장된 것으로 간주
+        embedding_dim = int(metadata.get(b"embedding_dim", stored_dim))
+        if embedding_dim != self.dimension or stored_dim != self.store_dimension:
+            raise VectorSchemaMismatchError(
+                f"Vector table '{self.table_name}' was built with embedding_dim={embedding_dim}, "
+                f"store_dim={stored_dim}, but current settings are embedding_dim={self.dimension}, "
+                f"store_dim={self.store_dimension}. Rebuild the index (delete {self.index_path}) "
+                f"or restore the previous vector_db settings."
+            )
+        # 전체 차원 컬럼 유무는 테이블 생성 시점 설정을 따름
+        has_full = "vector_full" in schema.names
+        if self.keep_full_vectors != has_full:
+            print(f"[VectorDB] keep_full_vectors={self.keep_full_vectors} ignored; existing table "
+                  f"{'has' if has_full else 'has no'} vector_full column")
+            self.keep_full_vectors = has_full
+
+        # 이전 버전에서 만든 테이블에는 메타데이터 컬럼을 기본값(-1/빈 문자열)으로 추가
+        missing = {name: expr for name, (_, expr) in METADATA_COLUMNS.items() if name not in schema.names}
+        if missing:
+            print(f"[VectorDB] Adding metadata columns to existing table: {', '.join(missing)}")
+            self.table.add_columns(missing)
+
+    def _truncate(self, vectors: np.ndarray) -> np.ndarray:
+        """앞쪽 store_dimension 차원만 남기고 L2 재정규화합니다 (Matryoshka 임베딩)."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.store_dimension == self.dimension:
+            return vectors
+        truncated = vectors[:, :self.store_dimension]
+        norms = np.linalg.norm(truncated, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return truncated / norms
+
+    def add_vectors(self, vectors: np.ndarray, vector_ids: list, file_id=-1, extension="", kind="", root_id=-1,
+                    chunk_indices=None):
+        """
+        벡터와 명시적인 ID를 추가합니다. 벡터는 정규화되어야 합니다.
+        file_id/extension/kind/root_id는 같은 파일의 모든 벡터에 기록되어 검색 prefilter에 사용됩니다.
+        chunk_indices를 생략하면 입력 순서(0, 1, 2, ...)를 청크 순서로 기록합니다.
+        """
         if vectors.shape[1] != self.dimension:
             raise ValueError(f"Vector dimension {vectors.shape[1]} does not match index dimension {self.dimension}")
         if len(vectors) != len(vector_ids):
             raise ValueError("Values and IDs must have the same length")
         
-        # LanceDB는 cosine 메트릭 설정 시 스스로 정규화 후 연산하므로 명시적인 L2 노멀라이즈 제거
-        # Lancedb dict array로 삽입
-        data = []
-        for vid, vec in zip(vector_ids, vectors):
-            data.append({"id": int(vid), "vector": vec.astype('float32').tolist()})
-            
-        if data:
-            self.table.add(data)
+        if len(vector_ids) == 0:
+            return
+
+        with self.lock:
+            if chunk_indices is None:
+                chunk_indices = np.arange(len(vector_ids), dtype=np.int32)
+            meta = {"file_id": int(file_id), "extension": extension or "", "kind": kind or "", "root_id": int(root_id),
+                    "chunk_index": np.asarray(chunk_indices, dtype=np.int32)}
+            if meta["file_id"] < 0:
+                self._has_legacy_rows = True
+            self._pending_adds.append((np.asarray(vector_ids, dtype=np.int64), np.asarray(vectors, dtype=np.float32), meta))
+            self._pending_rows += len(vector_ids)
+            self._mark_pending()
+            self._flush_if_needed()
+
+    def _to_record_batch(self, vectors, vector_ids, metadata=None):
+        """metadata: 컬럼명 -> 행별 값 배열 (없는 컬럼은 기존 행 기본값으로 채움)"""
+        metadata = metadata or {}
+        n = len(vector_ids)
+        columns = {
+            "id": pa.array(np.asarray(vector_ids, dtype=np.int64)),
+            "vector": to_fixed_size_list(self._truncate(vectors)),
+        }
+        if self.keep_full_vectors:
+            columns["vector_full"] = to_fixed_size_list(vectors)
+        for name, (dtype, _) in METADATA_COLUMNS.items():
+            default = -1 if pa.types.is_integer(dtype) else ""
+            columns[name] = pa.array(metadata.get(name, [default] * n), type=dtype)
+        schema = self.table.schema
+        return pa.RecordBatch.from_arrays([columns[name] for name in schema.names], schema=schema)
+
+    def get_legacy_vector_ids(self, limit=1000):
+        """
+        메타데이터 컬럼 없이 저장된 행(file_id < 0)의 ID를 최대 limit개 반환합니다 (backfill 대상).
+        남은 행이 없으면 prefilter의 예외 조건(file_id < 0)을 해제합니다.
+        """
+        with self.lock:
+            self.table.checkout_latest()
+            rows = self.table.search().where("file_id < 0").select(["id"]).limit(limit).to_arrow()
+            vector_ids = rows["id"].to_pylist()
+            if not vector_ids and not any(meta["file_id"] < 0 for _, _, meta in self._pending_adds):
+                self._has_legacy_rows = False
+            return vector_ids
+
+    def update_metadata(self, vector_ids, metadata):
+        """
+        이미 기록된 행의 파일 메타데이터를 merge_insert 한 번으로 갱신합니다 (벡터는 그대로).
+        metadata: 컬럼명 -> vector_ids와 같은 순서의 값 목록 (METADATA_COLUMNS 중 일부)
+        """
+        if not vector_ids:
+            return
+        columns = {"id": pa.array(np.asarray(vector_ids, dtype=np.int64))}
+        for name, (dtype, _) in METADATA_COLUMNS.items():
+            if name in metadata:
+                columns[name] = pa.array(metadata[name], type=dtype)
+        with self.lock:
+            # 그 사이 삭제된 행은 일치하지 않으므로 되살아나지 않음
+            self.table.merge_insert("id").when_matched_update_all().execute(pa.table(columns))
+
+    def build_filter(self, extensions=None, kinds=None, root_ids=None, file_ids=None):
+        """
+        메타데이터 컬럼 조건을 search()의 where 절로 만듭니다. (조건이 없으면 None)
+        extensions는 ".pdf"처럼 점을 포함한 소문자 확장자입니다.
+        """
+        clauses = []
+        for column, values in (("extension", extensions), ("kind", kinds),
+                               ("root_id", root_ids), ("file_id", file_ids)):
+            if values is None:
+                continue
+            if len(values) == 0:
+                clauses.append("false")
+            else:
+                clauses.append(f"{column} IN ({_sql_list(values)})")
+        if not clauses:
+            return None
+        where = " AND ".join(clauses)
+        if self._has_legacy_rows:
+            # 메타데이터 없이 저장된 기존 행은 통과시키고 호출 측 후처리 필터에 맡김
+            where = f"({where}) OR file_id < 0"
+        return where
 
-    def search(self, query_vector: np.ndarray, top_k=50):
-        """가장 유사한 벡터의 ID들을 반환합니다."""
+    def search(self, query_vector: np.ndarray, top_k=50, rerank=True, where=None):
+        """
+        가장 유사한 벡터의 ID들을 반환합니다.
+        where를 지정하면 벡터 탐색 전에 적용(prefilter)하므로 조건을 만족하는 top_k개를 얻습니다.
+        Returns: [{"vector_id", "file_id", "chunk_index", "distance"}] (유사도 내림차순)
+        """
         if query_vector.shape[1] != self.dimension:
             raise ValueError(f"Query vector dimension {query_vector.shape[1]} does not match index dimension {self.dimension}")
+
+        # 검색은 UI 스레드에서 실행되므로 인덱서의 잠금이나 큰 버퍼 기록을 기다리지 않음.
+        # 잠금이 비어 있고 버퍼가 작을 때만 먼저 기록하고, 그 외에는 삭제 예정 ID만 결과에서 제외
+        # (버퍼의 추가분은 다음 flush 이후, 최대 flush_interval 뒤에 검색됨)
+        self._flush_for_search()
+        pending_deletes = self._pending_deletes.copy()
+
+        # 전체 차원 rerank: 축소 벡터로 후보를 넉넉히 뽑은 뒤 전체 차원 코사인으로 재정렬
+        do_rerank = rerank and self.keep_full_vectors
+        limit = (top_k * self.rerank_factor if do_rerank else top_k) + len(pending_deletes)
             
         # LanceDB 조회 방식: cosine distance를 활용. 
         # 주의: FAISS IP는 코사인 유사도(1에 가까울수록 비슷)를 반환하지만,
         # LanceDB cosine는 코사인 거리(0에 가까울수록 비슷)를 반환합니다.
         # 기존 애플리케이션의 유사도 필터 로직과 호환성을 위해 1 - distance 형태로 반환 (Similarty)
-        results = (self.table.search(query_vector[0].astype('float32').tolist())
-                   .metric("cosine")
-                   .limit(top_k)
-                   .to_list())
+        query = self._truncate(query_vector)[0]
+        columns = ["id", "file_id", "chunk_index", "_distance"]
+        if do_rerank:
+            columns.append("vector_full")
+        builder = self._vector_query(query)
+        if where:
+            builder = builder.where(where, prefilter=True)
+        results = builder.select(columns).limit(limit).to_list()
+        if pending_deletes:
+            results = [res for res in results if res["id"] not in pending_deletes]
         
         formatted_results = []
-        for res in results:
-            # FAISS IP score = 1 - LanceDB cosine distance
-            similarity = 1.0 - res["_distance"]
-            formatted_results.append({
-                "vector_id": res["id"],
-                "distance": float(similarity)
-            })
+        if do_rerank and results:
+            full = np.array([res["vector_full"] for res in results], dtype=np.float32)
+            q = query_vector[0].astype(np.float32)
+            sims = full @ q / (np.linalg.norm(full, axis=1) * np.linalg.norm(q) + 1e-12)
+            for res, sim in zip(results, sims):
+                formatted_results.append({"vector_id": res["id"], "file_id": res["file_id"],
+                                          "chunk_index": res["chunk_index"], "distance": float(sim)})
+        else:
+            for res in results:
+                # FAISS IP score = 1 - LanceDB cosine distance
+                similarity = 1.0 - res["_distance"]
+                formatted_results.append({
+                    "vector_id": res["id"],
+                    "file_id": res["file_id"],
+                    "chunk_index": res["chunk_index"],
+                    "distance": float(similarity)
+                })
             
         # 유사도 내림차순 정렬 (Similarity 가 높은 순서)
         formatted_results.sort(key=lambda x: x["distance"], reverse=True)
-        return formatted_results
+        return formatted_results[:top_k]
+
+    def _flush_for_search(self):
+        if not self.lock.acquire(blocking=False):
+            return # 인덱서가 기록 중
+        try:
+            if 0 < self._pending_rows + len(self._pending_deletes) <= self.search_flush_rows:
+                self.flush()
+        finally:
+            self.lock.release()
+
+    def _vector_query(self, query, use_index=True):
+        builder = self.table.search(np.asarray(query, dtype=np.float32).tolist()).metric("cosine")
+        if not use_index:
+            return builder.bypass_vector_index()
+        if self._indexed_rows:
+            # IVF 탐색 파티션 수와 PQ 근사 결과 재정렬 배수 (정확도/지연 트레이드오프)
+            builder = builder.nprobes(self.nprobes)
+            if self.refine_factor:
+                builder = builder.refine_factor(self.refine_factor)
+        return builder
+
+    def _get_vector_index(self):
+        for index in self.table.list_indices():
+            if "vector" in index.columns:
+                return index
+        return None
+
+    def _get_indexed_rows(self):
+        try:
+            index = self._get_vector_index()
+            if index is None:
+                return 0
+            return self.table.index_stats(index.name).num_indexed_rows
+        except Exception as e:
+            print(f"[VectorDB] Could not read index stats: {e}")
+            return 0
+
+    def _maybe_build_index(self):
+        if self.index_type is None or not self.index_min_rows:
+            return
+        if self._index_thread and self._index_thread.is_alive():
+            return
+        rows = self.table.count_rows()
+        if rows < self.index_min_rows:
+            return
+        if self._indexed_rows and rows < self._indexed_rows * (1 + self.index_rebuild_growth):
+            return
+        self._index_thread = threading.Thread(target=self.build_index, args=(rows,), daemon=True)
+        self._index_thread.start()
+
+    def build_index(self, rows=None):
+        """벡터 컬럼에 ANN 인덱스를 생성(교체)합니다. 검색/추가와 병행 가능합니다."""
+        rows = rows or self.table.count_rows()
+        start = time.time()
+        print(f"[VectorDB] Building {self.index_type} index over {rows} vectors...")
+        # 파티션 수는 대략 sqrt(N)
+        params = {"distance_type": "cosine", "num_partitions": max(1, int(rows ** 0.5))}
+        if self.index_type.endswith("PQ"):
+            # 서브 벡터당 16차원 (차원을 나누어 떨어지게)
+            sub_vectors = max(1, self.store_dimension // 16)
+            while self.store_dimension % sub_vectors:
+                sub_vectors -= 1
+            params["num_sub_vectors"] = sub_vectors
+        try:
+            config = INDEX_CONFIGS[self.index_type](**params)
+            # 백그라운드 생성 시 별도 핸들 사용
+            table = lancedb.connect(self.index_path).open_table(self.table_name)
+            table.create_index("vector", replace=True, config=config)
+            self.table.checkout_latest()
+            self._indexed_rows = self._get_indexed_rows() or rows
+            print(f"[VectorDB] Index built in {time.time() - start:.1f}s ({self._indexed_rows} rows)")
+            stats = self.measure_recall(sample_size=10, k=10)
+            print(f"[VectorDB] recall@10 vs flat scan: {stats['recall']:.3f} "
+                  f"(ann {stats['ann_ms']:.1f}ms / flat {stats['flat_ms']:.1f}ms, nprobes={self.nprobes}, "
+                  f"refine_factor={self.refine_factor})")
+        except Exception as e:
+            print(f"[VectorDB] Index build failed: {e}")
+
+    def measure_recall(self, sample_size=20, k=10):
+        """
+        ANN 인덱스 검색 결과를 전체 스캔(flat) 결과와 비교한 recall@k를 측정합니다.
+        테이블의 벡터 일부를 질의로 사용합니다.
+        Returns: {"recall": float, "ann_ms": float, "flat_ms": float, "queries": int}
+        """
+        self.flush()
+        samples = self.table.search().select(["vector"]).limit(sample_size).to_list()
+        if not samples:
+            return {"recall": 1.0, "ann_ms": 0.0, "flat_ms": 0.0, "queries": 0}
+
+        hits, ann_time, flat_time = 0.0, 0.0, 0.0
+        for row in samples:
+            start = time.perf_counter()
+            ann = self._vector_query(row["vector"]).select(["id", "_distance"]).limit(k).to_list()
+            ann_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            flat = self._vector_query(row["vector"], use_index=False).select(["id", "_distance"]).limit(k).to_list()
+            flat_time += time.perf_counter() - start
+
+            truth = {r["id"] for r in flat}
+            if truth:
+                hits += len(truth & {r["id"] for r in ann}) / len(truth)
+
+        n = len(samples)
+        return {
+            "recall": hits / n,
+            "ann_ms": ann_time / n * 1000,
+            "flat_ms": flat_time / n * 1000,
+            "queries": n,
+        }
+
+    def get_storage_stats(self):
+        """
+        테이블 저장 상태를 반환합니다.
+        Returns: {"disk_bytes", "live_bytes", "rows", "fragments", "small_fragments", "versions"}
+        """
+        self.table.checkout_latest()
+        stats = self.table.stats()
+        fragment_stats = stats.get("fragment_stats", {})
+        return {
+            "disk_bytes": _dir_size(self.index_path),
+            "live_bytes": stats.get("total_bytes", 0),
+            "rows": stats.get("num_rows", 0),
+            "fragments": fragment_stats.get("num_fragments", 0),
+            "small_fragments": fragment_stats.get("num_small_fragments", 0),
+            "versions": len(self.table.list_versions()),
+        }
+
+    def needs_compaction(self, min_small_fragments=8, min_versions=20):
+        """작은 fragment나 누적 버전이 임계값 이상이면 True (유지보수 작업 필요 여부)."""
+        stats = self.get_storage_stats()
+        return stats["small_fragments"] >= min_small_fragments or stats["versions"] >= min_versions
+
+    def compact(self, cleanup_older_than=timedelta(minutes=10), max_fragments=None, max_rows=None):
+        """
+        작은 fragment 병합, 오래된 버전 정리, 인덱스 증분 갱신을 한 번에 수행합니다.
+        cleanup_older_than보다 최근 버전은 동시 reader를 위해 남겨둡니다.
+
+        table.optimize()는 범위를 나누거나 중간에 멈출 수 없으므로, 작은 fragment가 max_fragments보다
+        많으면 한 번에 가장 작은 fragment 최대 max_fragments개(행 수 max_rows 이내)만 하나로 합치고
+        "partial"을 표시합니다. 반복 실행할수록 fragment 수가 줄고, 상한 이하가 되면 전체 optimize를 실행합니다.
+        (None이면 제한 없음)
+        Returns: 실행 전후 get_storage_stats()와 소요 시간, 회수한 바이트 수, partial (남은 작업 여부)
+        """
+        if self._index_thread and self._index_thread.is_alive():
+            print("[VectorDB] Skip compaction: index build in progress")
+            return None
+        self.flush()
+        before = self.get_storage_stats()
+        start = time.time()
+        # 인덱스 생성과 마찬가지로 별도 핸들에서 실행 (검색/flush를 막지 않음)
+        table = lancedb.connect(self.index_path).open_table(self.table_name)
+        partial = max_fragments is not None and before["small_fragments"] > max_fragments
+        if partial:
+            merged = self._merge_small_fragments(table, max_fragments, max_rows)
+            partial = merged > 0 # 더 합칠 수 없으면 전체 optimize로 마무리
+        if not partial:
+            table.optimize(cleanup_older_than=cleanup_older_than, delete_unverified=False)
+        after = self.get_storage_stats()
+        result = {
+            "before": before,
+            "after": after,
+            "elapsed": time.time() - start,
+            "reclaimed_bytes": before["disk_bytes"] - after["disk_bytes"],
+            "partial": partial,
+        }
+        print(f"[VectorDB] Compacted {before['fragments']} -> {after['fragments']} fragments, "
+              f"{before['versions']} -> {after['versions']} versions, "
+              f"reclaimed {result['reclaimed_bytes'] / (1024 * 1024):.1f}MB in {result['elapsed']:.1f}s"
+              + (" (partial)" if partial else ""))
+        return result
+
+    def _merge_small_fragments(self, table, max_fragments, max_rows=None):
+        """
+        행 수가 가장 적은 fragment부터 최대 max_fragments개(합계 max_rows행 이내)의 살아 있는 행을
+        merge_insert 한 번으로 다시 기록해 하나의 fragment로 합칩니다. 원래 fragment는 모든 행이 삭제되어 제거됩니다.
+        Returns: 합친 fragment 수 (2개 미만이면 0)
+        """
+        # _rowid 상위 32비트 = fragment ID (안정 row ID를 쓰지 않는 테이블)
+        rows = table.search().with_row_id(True).select(["id"]).limit(None).to_arrow()
+        fragments = rows["_rowid"].to_numpy() >> 32
+        fragment_ids, counts = np.unique(fragments, return_counts=True)
+        picked, total = [], 0
+        for pos in np.argsort(counts, kind="stable")[:max_fragments]:
+            if max_rows is not None and picked and total + counts[pos] > max_rows:
+                break
+            picked.append(fragment_ids[pos])
+            total += counts[pos]
+        if len(picked) < 2:
+            return 0
+        ids = rows["id"].to_numpy()[np.isin(fragments, picked)]
+        data = table.search().where(f"id IN ({_sql_list(ids.tolist())})").limit(None).to_arrow()
+        # flush와 커밋이 겹치지 않도록 잠금 (그 사이 삭제된 행은 일치하지 않아 되살아나지 않음)
+        with self.lock:
+            table.merge_insert("id").when_matched_update_all().execute(data)
+        return len(picked)
 
     def save(self):
-        """LanceDB는 Auto-commit이므로 패스합니다."""
-        pass
+        """버퍼에 남은 변경 사항을 기록합니다 (LanceDB 자체는 Auto-commit)."""
+        self.flush()
 
     def delete_vectors_by_ids(self, vector_ids):
-        """명시적인 ID 리스트로 벡터를 삭제합니다."""
+        """명시적인 ID 리스트로 벡터를 삭제합니다. (버퍼링 후 일괄 삭제)"""
         if not vector_ids:
             return
-        
-        ids_str = ", ".join(str(vid) for vid in vector_ids)
-        self.table.delete(f"id IN ({ids_str})")
+
+        with self.lock:
+            ids = np.asarray(vector_ids, dtype=np.int64)
+            # 아직 기록되지 않은 추가분에서는 바로 제거
+            kept = []
+            for pending_ids, pending_vectors, meta in self._pending_adds:
+                mask = ~np.isin(pending_ids, ids)
+                if mask.all():
+                    kept.append((pending_ids, pending_vectors, meta))
+                elif mask.any():
+                    # 행 단위 메타데이터(chunk_index)도 함께 제거
+                    meta = {name: value[mask] if isinstance(value, np.ndarray) else value
+                            for name, value in meta.items()}
+                    kept.append((pending_ids[mask], pending_vectors[mask], meta))
+            self._pending_adds = kept
+            self._pending_rows = sum(len(item[0]) for item in kept)
+            # 이미 기록된 행을 위해 삭제 조건도 보관 (flush 시 삭제 -> 추가 순서로 적용)
+            self._pending_deletes.update(int(vid) for vid in ids)
+            self._mark_pending()
+            self._flush_if_needed()
+
+    def delete_bulk(self, vector_ids, root_ids=None):
+        """
+        폴더 제거 등 대량 삭제를 하나의 delete(= 버전 1개)로 처리합니다.
+        root_ids의 root_id 조건이 삭제 대상(vector_ids)과 정확히 같은 행을 가리키면
+        긴 ID 목록 대신 root_id 조건으로 삭제합니다 (루트 정보 없이 저장된 행이 섞여 있으면 ID 목록 사용).
+        Returns: 사용한 삭제 조건 ("root" 또는 "ids"), 삭제할 것이 없으면 None
+        """
+        if not vector_ids:
+            return None
+        with self.lock:
+            # 버퍼에 남은 추가/삭제를 먼저 기록해야 조건식이 모든 행에 적용됨
+            self.flush()
+            where, used = None, None
+            if root_ids:
+                root_where = f"root_id IN ({_sql_list(root_ids)})"
+                # 루트 폴더의 행은 모두 삭제 대상 폴더 아래에 있으므로 개수가 같으면 같은 집합
+                if self.table.count_rows(root_where) == len(vector_ids):
+                    where, used = root_where, "root"
+            if where is None:
+                where, used = f"id IN ({_sql_list(sorted(vector_ids))})", "ids"
+            self.table.delete(where)
+            return used
+
+    def _mark_pending(self):
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+
+    def _flush_if_needed(self):
+        if self._pending_rows + len(self._pending_deletes) >= self.flush_rows:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self):
+        """마지막 flush 이후 flush_interval이 지났으면 기록합니다. (유휴 루프에서 주기적으로 호출)"""
+        with self.lock:
+            if self._pending_since is not None and time.monotonic() - self._pending_since >= self.flush_interval:
+                self.flush()
+
+    def flush(self):
+        """버퍼링된 삭제를 하나의 조건식으로, 추가를 하나의 append로 기록합니다."""
+        with self.lock:
+            adds, self._pending_adds = self._pending_adds, []
+            deletes, self._pending_deletes = self._pending_deletes, set()
+            self._pending_rows = 0
+            self._pending_since = None
+
+            if not adds and not deletes:
+                return
+            added = sum(len(item[0]) for item in adds)
+            deleted = len(deletes)
+            try:
+                # ID는 재사용될 수 있으므로 삭제를 먼저 적용한 뒤 추가
+                if deletes:
+                    ids_str = ", ".join(str(vid) for vid in sorted(deletes))
+                    self.table.delete(f"id IN ({ids_str})")
+                    deletes = set()
+                if adds:
+                    ids = np.concatenate([item[0] for item in adds])
+                    vectors = np.concatenate([item[1] for item in adds])
+                    # 파일 단위 메타데이터를 행 단위로 펼침
+                    metadata = {name: [] for name in METADATA_COLUMNS}
+                    for pending_ids, _, meta in adds:
+                        for name in METADATA_COLUMNS:
+                            value = meta[name]
+                            if isinstance(value, np.ndarray):
+                                metadata[name].extend(value.tolist())
+                            else:
+                                metadata[name].extend([value] * len(pending_ids))
+                    self.table.add(self._to_record_batch(vectors, ids, metadata))
+            except Exception:
+                # 기록하지 못한 변경은 다음 flush에서 재시도
+                self._pending_deletes |= deletes
+                self._pending_adds = adds + self._pending_adds
+                self._pending_rows = sum(len(item[0]) for item in self._pending_adds)
+                self._mark_pending()
+                raise
+            print(f"[VectorDB] Flushed {added} adds, {deleted} deletes")
+            if added and self.on_flush:
+                file_ids = sorted({meta["file_id"] for _, _, meta in adds if meta["file_id"] >= 0})
+                try:
+                    self.on_flush(file_ids)
+                except Exception as e:
+                    # 표시가 남은 파일은 다음 스캔 때 다시 인덱싱되므로 데이터 손실은 없음
+                    print(f"[VectorDB] on_flush callback failed: {e}")
+            if added:
+                self._maybe_build_index()
@@ -18,6 +18,23 @@ class EmbeddingAdapter(ABC):
         """이미지 파일을 벡터로 변환합니다."""
         pass
 
+    @property
+    def embedding_id(self) -> str:
+        """임베딩 캐시 키에 사용하는 모델 식별자. 같은 값이면 같은 벡터를 낸다고 가정합니다."""
+        return getattr(self, "model_name", self.__class__.__name__)
+
+    def load_async(self):
+        """모델 로드를 백그라운드에서 시작합니다. 기본 구현은 즉시 사용 가능한 모델을 가정합니다."""
+        pass
+
+    def is_ready(self) -> bool:
+        """모델 로드가 끝나 인코딩 호출이 대기 없이 진행되는지 여부."""
+        return True
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """텍스트별 토큰 수(추정치)를 반환합니다. 배치 스케줄링에 사용됩니다."""
+        return [len(t) // 2 + 1 for t in texts]
+
     @property
     @abstractmethod
     def dimension(self) -> int:
@@ -0,0 +1,148 @@
+import os
+import time
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from core.database.connection import ThreadLocalConnections
+
+class EmbeddingCache:
+    """
+    (모델명, instruction, 텍스트 해시) -> 벡터를 저장하는 영속 캐시.
+    동일한 청크(재저장된 파일의 변경 없는 문단, 복사된 파일 등)의 재임베딩을 방지합니다.
+    최대 항목 수를 넘으면 가장 오래 사용되지 않은 항목부터 제거합니다.
+    """
+    def __init__(self, db_path="data/embedding_cache.db", max_entries=200000):
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._connections = ThreadLocalConnections(db_path)
+        self._init_db()
+
+    def _get_connection(self):
+        return self._connections.connection()
+
+    def close(self):
+        self._connections.close()
+
+    def _init_db(self):
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+            conn.commit()
+
+    @staticmethod
+    def make_key(model_name, instruction, text):
+        h = hashlib.sha256()
+        for part in (model_name, instruction, text):
+            h.update(part.encode("utf-8", errors="surrogatepass"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def get_many(self, model_name, instruction, texts):
+        """텍스트 순서대로 벡터(없으면 None) 리스트를 반환합니다."""
+        if not texts:
+            return []
+        keys = [self.make_key(model_name, instruction, t) for t in texts]
+        unique_keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            # SQLite 변수 개수 제한을 피하기 위해 나누어 조회
+            for i in range(0, len(unique_keys), 500):
+                part = unique_keys[i:i + 500]
+                placeholders = ",".join(["?"] * len(part))
+                cursor.execute(f"SELECT key, dim, vector FROM embeddings WHERE key IN ({placeholders})", part)
+                for key, dim, blob in cursor.fetchall():
+                    found[key] = np.frombuffer(blob, dtype=np.float32, count=dim)
+            if found:
+                now = time.time()
+                cursor.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                   [(now, key) for key in found])
+                conn.commit()
+        return [found.get(key) for key in keys]
+
+    def put_many(self, model_name, instruction, texts, vectors):
+        if not texts:
+            return
+        now = time.time()
+        rows = []
+        for text, vec in zip(texts, vectors):
+            vec = np.ascontiguousarray(vec, dtype=np.float32)
+            rows.append((self.make_key(model_name, instruction, text), int(vec.shape[0]), vec.tobytes(), now))
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("INSERT OR REPLACE INTO embeddings (key, dim, vector, last_used) VALUES (?, ?, ?, ?)", rows)
+            conn.commit()
+            self._evict(cursor)
+            conn.commit()
+
+    def _evict(self, cursor):
+        if not self.max_entries:
+            return
+        cursor.execute("SELECT COUNT(*) FROM embeddings")
+        count = cursor.fetchone()[0]
+        if count <= self.max_entries:
+            return
+        # 매번 정리하지 않도록 상한의 90%까지 비움
+        excess = count - int(self.max_entries * 0.9)
+        cursor.execute("""
+            DELETE FROM embeddings WHERE key IN (
+                SELECT key FROM embeddings ORDER BY last_used LIMIT ?
+            )
+        """, (excess,))
+        print(f"[EmbeddingCache] Evicted {cursor.rowcount} entries")
+
+    def count(self):
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM embeddings")
+            return cursor.fetchone()[0]
+
+
+class QueryEmbeddingLRU:
+    """
+    검색어 임베딩용 인메모리 LRU 캐시.
+    같은 검색어로 다시 그리기(뷰 모드/테마 변경 등)할 때 모델 forward pass를 건너뜁니다.
+    persistent(EmbeddingCache)를 지정하면 세션이 바뀌어도 재사용합니다.
+    """
+    def __init__(self, capacity=256, persistent=None):
+        self.capacity = capacity
+        self.persistent = persistent
+        self._items = OrderedDict() # (model_name, query) -> np.ndarray (1, dim)
+        self.lock = threading.Lock()
+
+    def get_or_encode(self, adapter, query):
+        model_name = adapter.embedding_id
+        key = (model_name, query)
+        with self.lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+
+        vec = None
+        instruction = getattr(adapter, "default_instruction", "")
+        if self.persistent is not None:
+            cached = self.persistent.get_many(model_name, instruction, [query])[0]
+            if cached is not None:
+                vec = cached[np.newaxis, :]
+        if vec is None:
+            vec = np.asarray(adapter.encode_text(query), dtype=np.float32)
+            if self.persistent is not None:
+                self.persistent.put_many(model_name, instruction, [query], vec)
+
+        with self.lock:
+            self._items[key] = vec
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+        return vec
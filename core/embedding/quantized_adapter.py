@@ -0,0 +1,26 @@
+import torch
+from core.embedding.qwen_adapter import QwenEmbeddingAdapter
+
+class QuantizedQwenEmbeddingAdapter(QwenEmbeddingAdapter):
+    """
+    GPU가 없는 환경을 위한 CPU 전용 Qwen 임베딩 어댑터.
+    모델 로드 후 모든 nn.Linear 가중치를 int8 동적 양자화하여
+    상주 메모리와 행렬곱 연산량을 줄입니다. (활성값은 실행 시점에 양자화)
+    """
+    def __init__(self, model_name="Qwen/Qwen3-VL-Embedding-2B", **kwargs):
+        super().__init__(model_name, **kwargs)
+        # 동적 양자화 커널은 CPU 전용
+        self.device = "cpu"
+
+    @property
+    def embedding_id(self):
+        # fp32 벡터와 값이 조금 다르므로 임베딩 캐시 네임스페이스를 분리
+        return f"{self.model_name}#int8"
+
+    def _load_model(self):
+        super()._load_model()
+        print(f"Quantizing {self.model_name} (dynamic int8, Linear layers)...")
+        self.model = torch.ao.quantization.quantize_dynamic(
+            self.model.to(torch.float32), {torch.nn.Linear}, dtype=torch.qint8
+        )
+        self.model.eval()
@@ -1,17 +1,63 @@
 import torch
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
 from transformers import AutoModel, AutoProcessor
 from PIL import Image
 from core.embedding.adapter import EmbeddingAdapter
 import numpy as np
 
 class QwenEmbeddingAdapter(EmbeddingAdapter):
-    def __init__(self, model_name="Qwen/Qwen3-VL-Embedding-2B"):
+    def __init__(self, model_name="Qwen/Qwen3-VL-Embedding-2B", batch_size=8, max_batch_tokens=8192,
+                 image_batch_size=4, image_max_side=1024, decode_workers=4):
         self.model_name = model_name
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.default_instruction = "Represent the user's input."
-        
-        # 실제 모델 로드는 필요할 때 하거나 초기화 시 진행 (메모리 고려)
-        print(f"Loading {model_name} on {self.device}...")
+        # 한 번의 forward pass에 넣을 최대 텍스트 수와 패딩 포함 토큰 예산
+        # 긴 청크가 섞이면 배치 크기가 자동으로 줄어듭니다.
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        # 이미지는 스레드 풀에서 축소 디코딩 후 image_batch_size 단위로 임베딩
+        self.image_batch_size = image_batch_size
+        self.image_max_side = image_max_side
+        self._decode_pool = ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix="image-decode")
+
+        # 모델은 지연 로드: load_async()로 백그라운드 로드를 시작하고,
+        # 인코딩 호출은 로드가 끝날 때까지만 대기합니다.
+        self.processor = None
+        self.model = None
+        self.ready = Future()
+        self._load_started = False
+        self._load_lock = threading.Lock()
+
+    def load_async(self):
+        """백그라운드 스레드에서 모델 로드를 시작합니다. 이미 시작했다면 무시합니다."""
+        with self._load_lock:
+            if self._load_started:
+                return self.ready
+            self._load_started = True
+        threading.Thread(target=self._load_worker, name="embedding-model-loader", daemon=True).start()
+        return self.ready
+
+    def _load_worker(self):
+        try:
+            self._load_model()
+            self.ready.set_result(True)
+            print(f"Model ready: {self.model_name}")
+        except Exception as e:
+            print(f"Error loading {self.model_name}: {e}")
+            self.ready.set_exception(e)
+
+    def is_ready(self):
+        """모델 로드가 끝났는지(성공/실패 포함) 반환합니다."""
+        return self.ready.done()
+
+    def _ensure_loaded(self):
+        # 아직 로드를 시작하지 않았다면 지금 시작하고, 완료될 때까지 대기 (실패 시 예외 전달)
+        self.load_async()
+        self.ready.result()
+
+    def _load_model(self):
+        print(f"Loading {self.model_name} on {self.device}...")
         
         # transformers 5.2.0 버그 우회 패치: NoneType 반복 에러 방지
         try:
@@ -31,81 +77,152 @@ class QwenEmbeddingAdapter(EmbeddingAdapter):
             pass
 
         # 임베딩 전용 모델이므로 trust_remote_code가 필요할 수 있음
-        self.processor = AutoProcessor.from_pretrained(model_name, trust_remote_code=True, padding_side='right')
-        self.model = AutoModel.from_pretrained(model_name, trust_remote_code=True).to(self.device)
+        self.processor = AutoProcessor.from_pretrained(self.model_name, trust_remote_code=True, padding_side='right')
+        self.model = AutoModel.from_pretrained(self.model_name, trust_remote_code=True).to(self.device)
         self.model.eval()
 
     @staticmethod
     def _pooling_last(hidden_state: torch.Tensor, attention_mask: torch.Tensor) -> torch.Tensor:
-        flipped_tensor = attention_mask.flip(dims=[1])
-        last_one_positions = flipped_tensor.argmax(dim=1)
-        col = attention_mask.shape[1] - last_one_positions - 1
+        # 오른쪽 패딩 배치: 각 행의 마지막 유효 토큰 위치는 (마스크 합 - 1)
+        # 왼쪽 패딩(모든 행의 마지막 토큰이 유효)이면 마지막 위치를 그대로 사용
+        if bool(attention_mask[:, -1].all()):
+            return hidden_state[:, -1]
+        col = attention_mask.sum(dim=1) - 1
         row = torch.arange(hidden_state.shape[0], device=hidden_state.device)
         return hidden_state[row, col]
 
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        # 토크나이저를 호출하지 않는 보수적 추정치 (한글/영문 혼합 기준 약 2자당 1토큰)
+        return len(text) // 2 + 1
+
+    def count_tokens(self, texts):
+        """토크나이저로 실제 토큰 수를 계산합니다 (채팅 템플릿 토큰 제외)."""
+        if not texts:
+            return []
+        self._ensure_loaded()
+        encoded = self.processor.tokenizer(list(texts), add_special_tokens=False)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def _plan_batches(self, lengths):
+        """
+        입력 순서를 유지한 채 (start, end) 배치 구간을 반환합니다.
+        배치 내 최장 길이 x 배치 크기(패딩 포함 비용)가 max_batch_tokens를 넘지 않도록
+        배치 크기를 청크 길이에 맞춰 줄입니다. 단일 항목은 예산을 넘어도 단독 배치로 처리합니다.
+        """
+        batches = []
+        start = 0
+        longest = 0
+        for i, length in enumerate(lengths):
+            size = i - start
+            candidate = max(longest, length)
+            if size > 0 and (size >= self.batch_size or candidate * (size + 1) > self.max_batch_tokens):
+                batches.append((start, i))
+                start = i
+                candidate = length
+            longest = candidate
+        if start < len(lengths):
+            batches.append((start, len(lengths)))
+        return batches
+
+    def _build_text_prompt(self, text):
+        conversation = [
+            {"role": "system", "content": [{"type": "text", "text": self.default_instruction}]},
+            {"role": "user", "content": [{'type': 'text', 'text': text}]}
+        ]
+        return self.processor.apply_chat_template(
+            conversation, add_generation_prompt=True, tokenize=False
+        )
+
     def encode_text(self, text):
         if isinstance(text, str): text = [text]
-        
+        if not text:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        self._ensure_loaded()
+
+        prompts = [self._build_text_prompt(t) for t in text]
+        lengths = [self._estimate_tokens(p) for p in prompts]
+
         embeddings_list = []
-        for t in text:
-            conversation = [
-                {"role": "system", "content": [{"type": "text", "text": self.default_instruction}]},
-                {"role": "user", "content": [{'type': 'text', 'text': t}]}
-            ]
-            
-            text_prompt = self.processor.apply_chat_template(
-                conversation, add_generation_prompt=True, tokenize=False
-            )
-            
+        for start, end in self._plan_batches(lengths):
+            # 배치당 토크나이저 1회, forward pass 1회 (오른쪽 패딩)
             inputs = self.processor(
-                text=[text_prompt], padding=True, return_tensors='pt'
+                text=prompts[start:end], padding=True, return_tensors='pt'
             ).to(self.device)
-            
+
             with torch.no_grad():
                 outputs = self.model(**inputs)
                 emb = self._pooling_last(outputs.last_hidden_state, inputs.attention_mask)
-            
-            emb = emb.to(torch.float32).cpu().numpy().squeeze()
-            if emb.ndim == 0: emb = np.expand_dims(emb, 0)
-            elif emb.ndim > 1: emb = emb.flatten()
-            embeddings_list.append(emb)
-            
-        return np.array(embeddings_list)
+
+            embeddings_list.append(emb.to(torch.float32).cpu().numpy())
+
+        return np.concatenate(embeddings_list, axis=0)
+
+    def _load_image(self, path):
+        img = Image.open(path)
+        # JPEG은 디코더 단계에서 1/2~1/8 스케일로 바로 축소 (전체 해상도 디코딩 생략)
+        if img.format == "JPEG":
+            img.draft("RGB", (self.image_max_side, self.image_max_side))
+        img = img.convert('RGB')
+        img.thumbnail((self.image_max_side, self.image_max_side))
+        return img
+
+    def _build_image_prompt(self, img):
+        conversation = [
+            {"role": "system", "content": [{"type": "text", "text": self.default_instruction}]},
+            {"role": "user", "content": [{'type': 'image', 'image': img}]}
+        ]
+        return self.processor.apply_chat_template(
+            conversation, add_generation_prompt=True, tokenize=False
+        )
+
+    def _stub_embedding(self):
+        return np.random.randn(self.dimension).astype('float32')
 
     def encode_image(self, image_path):
         if isinstance(image_path, str): image_paths = [image_path]
         else: image_paths = image_path
 
+        # 디코딩은 스레드 풀에서 미리 진행하고, 모델은 배치 단위로 소비 (모델 로드와 병행)
+        futures = [self._decode_pool.submit(self._load_image, path) for path in image_paths]
+
+        self._ensure_loaded()
         embeddings_list = []
-        for path in image_paths:
-            try:
-                img = Image.open(path).convert('RGB')
-                conversation = [
-                    {"role": "system", "content": [{"type": "text", "text": self.default_instruction}]},
-                    {"role": "user", "content": [{'type': 'image', 'image': img}]}
-                ]
-                
-                text_prompt = self.processor.apply_chat_template(
-                    conversation, add_generation_prompt=True, tokenize=False
-                )
-                
-                inputs = self.processor(
-                    text=[text_prompt], images=[img], padding=True, return_tensors='pt'
-                ).to(self.device)
-                
-                with torch.no_grad():
-                    outputs = self.model(**inputs)
-                    emb = self._pooling_last(outputs.last_hidden_state, inputs.attention_mask)
-                
-                emb = emb.to(torch.float32).cpu().numpy().squeeze()
-                if emb.ndim == 0: emb = np.expand_dims(emb, 0)
-                elif emb.ndim > 1: emb = emb.flatten()
-                
-                embeddings_list.append(emb)
-            except Exception as e:
-                print(f"Error encoding image {path} with model: {e}")
-                stub_emb = np.random.randn(self.dimension).astype('float32')
-                embeddings_list.append(stub_emb)
+        for start in range(0, len(image_paths), self.image_batch_size):
+            batch_paths = image_paths[start:start + self.image_batch_size]
+            batch_futures = futures[start:start + self.image_batch_size]
+
+            images = []
+            slots = [] # 배치 내 디코딩 성공한 이미지의 위치
+            batch_embs = [None] * len(batch_paths)
+            for i, (path, future) in enumerate(zip(batch_paths, batch_futures)):
+                try:
+                    images.append(future.result())
+                    slots.append(i)
+                except Exception as e:
+                    print(f"Error decoding image {path}: {e}")
+                    batch_embs[i] = self._stub_embedding()
+
+            if images:
+                try:
+                    prompts = [self._build_image_prompt(img) for img in images]
+                    inputs = self.processor(
+                        text=prompts, images=images, padding=True, return_tensors='pt'
+                    ).to(self.device)
+                    
+                    with torch.no_grad():
+                        outputs = self.model(**inputs)
+                        emb = self._pooling_last(outputs.last_hidden_state, inputs.attention_mask)
+
+                    emb = emb.to(torch.float32).cpu().numpy()
+                    for i, vec in zip(slots, emb):
+                        batch_embs[i] = vec
+                except Exception as e:
+                    print(f"Error encoding image batch {batch_paths} with model: {e}")
+                    for i in slots:
+                        batch_embs[i] = self._stub_embedding()
+
+            embeddings_list.extend(batch_embs)
             
         return np.array(embeddings_list)
 
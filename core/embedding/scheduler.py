@@ -0,0 +1,100 @@
+import bisect
+import numpy as np
+
+class EmbeddingBatchScheduler:
+    """
+    여러 파일의 텍스트 청크를 모아 토큰 길이 버킷별로 묶어 임베딩하는 스케줄러.
+    길이가 비슷한 청크끼리 배치를 구성해 패딩 연산 낭비를 줄이고,
+    결과는 제출한 키(파일)별로 원래 청크 순서대로 돌려줍니다.
+    """
+    def __init__(self, adapter, bucket_bounds=(64, 128, 256, 512), cache=None):
+        self.adapter = adapter
+        self.bucket_bounds = sorted(bucket_bounds)
+        self.cache = cache # EmbeddingCache (선택)
+        self.pending = [] # (key, chunk_index, text)
+
+    def submit(self, key, chunks):
+        for i, chunk in enumerate(chunks):
+            self.pending.append((key, i, chunk))
+
+    def pending_count(self):
+        return len(self.pending)
+
+    def flush(self):
+        """
+        대기 중인 모든 청크를 임베딩합니다.
+        캐시에 있는 청크와 중복 청크는 다시 인코딩하지 않습니다.
+        Returns: Dict[key, np.ndarray] -> 키별 (청크 수, 차원) 배열 (청크 순서 유지)
+        실패한 버킷의 청크는 키(파일) 단위로 다시 인코딩하며, 그래도 실패한 청크가 포함된 키는 결과에서 제외됩니다.
+        """
+        pending, self.pending = self.pending, []
+        if not pending:
+            return {}
+
+        model_name = self.adapter.embedding_id
+        instruction = getattr(self.adapter, "default_instruction", "")
+
+        # 0. 캐시 조회
+        text_vectors = {}
+        if self.cache is not None:
+            texts = list(dict.fromkeys(item[2] for item in pending))
+            for text, vec in zip(texts, self.cache.get_many(model_name, instruction, texts)):
+                if vec is not None:
+                    text_vectors[text] = vec
+
+        # 인코딩이 필요한 고유 텍스트
+        misses = list(dict.fromkeys(item[2] for item in pending if item[2] not in text_vectors))
+        lengths = self.adapter.count_tokens(misses)
+
+        # 1. 토큰 길이 버킷 분류 (버킷 내부는 길이순 정렬)
+        buckets = {}
+        for pos, length in enumerate(lengths):
+            bucket = bisect.bisect_left(self.bucket_bounds, length)
+            buckets.setdefault(bucket, []).append(pos)
+
+        # 2. 버킷 단위 배치 임베딩
+        for bucket in sorted(buckets):
+            positions = sorted(buckets[bucket], key=lambda p: lengths[p])
+            texts = [misses[p] for p in positions]
+            try:
+                emb = self.adapter.encode_text(texts)
+            except Exception as e:
+                print(f"[Scheduler] Error encoding bucket {bucket} ({len(texts)} chunks): {e}")
+                continue
+            self._store(text_vectors, texts, emb, model_name, instruction)
+
+        # 2-1. 실패한 버킷의 청크는 키 단위로 다시 시도 (같은 버킷의 다른 파일 청크 때문에 함께 실패하지 않도록)
+        retry = {}
+        for key, _, text in pending:
+            if text not in text_vectors:
+                retry.setdefault(key, []).append(text)
+        for key, texts in retry.items():
+            texts = [text for text in dict.fromkeys(texts) if text not in text_vectors]
+            if not texts:
+                continue # 앞선 키의 재시도에서 같은 텍스트가 인코딩됨
+            try:
+                emb = self.adapter.encode_text(texts)
+            except Exception as e:
+                print(f"[Scheduler] Error encoding {key} ({len(texts)} chunks): {e}")
+                continue
+            self._store(text_vectors, texts, emb, model_name, instruction)
+
+        # 3. 키(파일)별로 원래 청크 순서대로 재조립
+        failed_keys = {key for key, _, text in pending if text not in text_vectors}
+        grouped = {}
+        for key, chunk_index, text in pending:
+            if key in failed_keys:
+                continue
+            grouped.setdefault(key, []).append((chunk_index, text_vectors[text]))
+
+        results = {}
+        for key, items in grouped.items():
+            items.sort(key=lambda x: x[0])
+            results[key] = np.stack([vec for _, vec in items]).astype(np.float32)
+        return results
+
+    def _store(self, text_vectors, texts, emb, model_name, instruction):
+        for text, vec in zip(texts, emb):
+            text_vectors[text] = vec
+        if self.cache is not None:
+            self.cache.put_many(model_name, instruction, texts, emb)
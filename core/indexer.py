@@ -1,16 +1,23 @@
 from core.database.sqlite_manager import DatabaseManager
 from core.database.vector_db import VectorDBManager
+from core.database.maintenance import VectorMaintenanceScheduler
 from core.embedding.qwen_adapter import QwenEmbeddingAdapter
+from core.embedding.quantized_adapter import QuantizedQwenEmbeddingAdapter
+from core.embedding.cache import EmbeddingCache, QueryEmbeddingLRU
 from core.indexing.scanner import FileScanner
 from core.indexing.monitor import FileMonitor
 from core.tagging.auto_tagger import AutoTagger
 from core.tagging.llm_adapters import OllamaAdapter, OpenAIAdapter, GeminiAdapter, HuggingFaceAdapter
 from core.config import ConfigManager
 from core.indexing.queue_manager import IndexingQueueManager
+from core.search.aggregation import aggregate_by_file
+from core.search.fusion import reciprocal_rank_fusion
+from core.search.tag_index import contains_sorted
+from core.indexing.fingerprint import stat_unchanged, legacy_unchanged
+from core.search.lexical import looks_like_identifier, build_fts_query, build_trigram_query, trigram_similarity
 import os
 import threading
 import time
-from datetime import datetime
 
 class SemanticIndexer:
     def __init__(self, data_dir="data"):
@@ -35,21 +42,89 @@ class SemanticIndexer:
         self.config = ConfigManager(os.path.join(data_dir, "config.json"))
         
         # 1. 초기화
-        self.embedding = QwenEmbeddingAdapter()
+        emb_cfg = self.config.get_embedding_config()
+        backend = emb_cfg.get("backend", "qwen")
+        if backend == "qwen-int8":
+            adapter_cls = QuantizedQwenEmbeddingAdapter
+        else: # qwen (fp32/GPU) default
+            adapter_cls = QwenEmbeddingAdapter
+        self.embedding = adapter_cls(
+            batch_size=emb_cfg.get("batch_size", 8),
+            max_batch_tokens=emb_cfg.get("max_batch_tokens", 8192),
+            image_batch_size=emb_cfg.get("image_batch_size", 4),
+            image_max_side=emb_cfg.get("image_max_side", 1024),
+            decode_workers=emb_cfg.get("decode_workers", 4)
+        )
+        # 모델은 백그라운드에서 로드 (태그 검색/폴더 탐색/큐 UI는 즉시 사용 가능)
+        self.embedding.load_async()
         self.db = DatabaseManager(os.path.join(data_dir, "metadata.db"))
-        self.vector_db = VectorDBManager(self.embedding.dimension, os.path.join(data_dir, "lancedb"))
+        vdb_cfg = self.config.get_vector_db_config()
+        self.vector_db = VectorDBManager(
+            self.embedding.dimension, os.path.join(data_dir, "lancedb"),
+            store_dimension=vdb_cfg.get("store_dimension"),
+            keep_full_vectors=vdb_cfg.get("keep_full_vectors", False),
+            rerank_factor=vdb_cfg.get("rerank_factor", 4),
+            flush_rows=vdb_cfg.get("flush_rows", 4096),
+            flush_interval=vdb_cfg.get("flush_interval_sec", 5.0),
+            search_flush_rows=vdb_cfg.get("search_flush_rows", 256),
+            index_type=vdb_cfg.get("index_type", "IVF_PQ"),
+            index_min_rows=vdb_cfg.get("index_min_rows", 100000),
+            index_rebuild_growth=vdb_cfg.get("index_rebuild_growth", 0.5),
+            nprobes=vdb_cfg.get("nprobes", 20),
+            refine_factor=vdb_cfg.get("refine_factor", 10)
+        )
+        # 버퍼가 실제로 기록된 파일만 변경 감지에서 '인덱싱 완료'로 취급
+        self.vector_db.on_flush = self.db.mark_vectors_written
         
         # 2. LLM 태거 설정 
         self._init_tagger()
         
-        self.scanner = FileScanner(self.embedding, self.db, self.vector_db)
+        # 청크 임베딩 캐시 (metadata.db 옆에 저장)
+        self.embedding_cache = EmbeddingCache(
+            os.path.join(data_dir, "embedding_cache.db"),
+            max_entries=emb_cfg.get("cache_max_entries", 200000)
+        )
+        self._root_ids = {} # 모니터링 루트 경로 -> roots.id
+        self.scanner = FileScanner(self.embedding, self.db, self.vector_db, embedding_cache=self.embedding_cache,
+                                   root_resolver=self._resolve_root_id)
+        self.scanner.stop_requested = lambda: not self.running
+
+        # 검색어 임베딩 LRU (옵션: 임베딩 캐시에 영속화)
+        search_cfg = self.config.get_search_config()
+        self.last_search_stats = None # 마지막 의미 검색의 over-fetch 라운드 통계 (튜닝용)
+        self.query_cache = QueryEmbeddingLRU(
+            capacity=search_cfg.get("query_cache_size", 256),
+            persistent=self.embedding_cache if search_cfg.get("persist_query_cache", False) else None
+        )
         
         # 3. 큐 관리자 및 워커 스레드 초기화
         self.queue_manager = IndexingQueueManager()
+        # 벡터가 기록되기 전에 종료된 파일은 다시 인덱싱
+        for path in self.db.get_pending_vector_files():
+            self.queue_manager.add_task(path, "update")
+        # chunks_fts 이전에 인덱싱된 파일의 청크 텍스트 backfill 위치 (워커 유휴 시간에 진행, None이면 완료)
+        self._fts_backfill_cursor = 0
+        # 메타데이터 컬럼 이전에 저장된 벡터의 file_id/확장자/종류/루트 backfill (완료되면 False)
+        self._vector_metadata_backfill = True
         self.running = True
         self.worker_thread = threading.Thread(target=self._worker, daemon=True)
         self.worker_thread.start()
 
+        # 유휴 시간 벡터 테이블 정리 (fragment 병합 + 오래된 버전 삭제)
+        maint_cfg = self.config.get_maintenance_config()
+        self.maintenance = VectorMaintenanceScheduler(
+            self.vector_db, self.queue_manager,
+            idle_seconds=maint_cfg.get("idle_sec", 60),
+            min_interval=maint_cfg.get("min_interval_sec", 3600),
+            min_small_fragments=maint_cfg.get("min_small_fragments", 8),
+            min_versions=maint_cfg.get("min_versions", 20),
+            cleanup_older_than=maint_cfg.get("cleanup_older_than_sec", 600),
+            max_fragments=maint_cfg.get("max_fragments", 128),
+            max_rows=maint_cfg.get("max_rows", 50000)
+        )
+        if maint_cfg.get("enabled", True):
+            self.maintenance.start()
+
         self.monitor = FileMonitor() # Scanner dependency removed
         
         # 초기 저장되어있던 폴더들 모니터링 시작
@@ -57,6 +132,10 @@ class SemanticIndexer:
             if os.path.exists(folder):
                 self.monitor.add_path(folder, self._on_change)
 
+    def is_model_ready(self):
+        """임베딩 모델 로드 완료 여부 (의미 검색/인덱싱은 완료 시점까지 대기)"""
+        return self.embedding.is_ready()
+
     def _init_tagger(self):
         cfg = self.config.get_llm_config()
         provider = cfg.get("provider", "Ollama")
@@ -104,18 +183,54 @@ class SemanticIndexer:
                 count += 1
         print(f"Queued {count} files from {folder_path}") 
 
+    def _resolve_root_id(self, file_path):
+        """파일이 속한 모니터링 루트 폴더(가장 깊은 것)의 ID를 반환합니다."""
+        path = os.path.normpath(file_path)
+        best = None
+        for folder in self.config.get_folders():
+            folder = os.path.normpath(folder)
+            if path == folder or path.startswith(folder + os.sep):
+                if best is None or len(folder) > len(best):
+                    best = folder
+        if best is None:
+            return None
+        if best not in self._root_ids:
+            self._root_ids[best] = self.db.get_or_create_root(best)
+        return self._root_ids[best]
+
+    def _build_vector_filter(self, mode, extensions, tag_file_ids=None):
+        """검색 조건을 벡터 테이블 prefilter(where 절)로 변환합니다."""
+        exts = [("." + e.lstrip(".")).lower() for e in extensions] if extensions else None
+        kinds = None
+        if mode == "이미지 검색":
+            kinds = ["image"]
+        elif mode == "텍스트 검색":
+            kinds = ["text"]
+
+        # 현재 모니터링 중인 루트만 (-1: 루트 정보 없이 저장된 행)
+        root_ids = [rid for rid, path in self.db.get_roots() if self.is_monitored(path)] + [-1]
+
+        file_ids = tag_file_ids
+        if file_ids is not None:
+            # 너무 긴 IN 목록은 prefilter 대신 후처리 필터에 맡김
+            max_ids = self.config.get_search_config().get("tag_prefilter_max_files", 20000)
+            if len(file_ids) > max_ids:
+                file_ids = None
+        return self.vector_db.build_filter(extensions=exts, kinds=kinds, root_ids=root_ids, file_ids=file_ids)
+
     def remove_folder(self, folder_path):
         self.config.remove_folder(folder_path)
         self.monitor.remove_path(folder_path)
 
-    def search(self, query, mode="통합 검색", extensions=None, tags=None, tag_logic="AND"):
+    def search(self, query, mode="통합 검색", extensions=None, tags=None, tag_logic="AND", exclude_tags=None):
         # 1. 확장자 필터링 (SQLite에서 미리 처리하거나 후처리 가능)
         # 여기서는 우선 벡터 검색 후 후처리를 수행하거나 상위 레벨에서 필터링합니다.
         
         # 2. 검색 모드에 따른 처리
         # 태그가 제공되면 태그 검색 로직 수행 (검색어 없음)
-        if tags and not query:
-            results = self.db.search_by_tags(tags, condition=tag_logic)
+        if (tags or exclude_tags) and not query:
+            file_ids = self.db.get_file_ids_by_tags(tags, condition=tag_logic, exclude_tags=exclude_tags)
+            results = self.db.get_file_paths_by_ids(file_ids)
             ret = [{"file_path": path, "distance": 0.0} for path in results]
             if ret:
                 tags_map = self.db.get_tags_for_files(results)
@@ -136,76 +251,282 @@ class SemanticIndexer:
                         res["tags"] = tags_map.get(res["file_path"], [])
                 return ret
             
-        # 3. 벡터 검색
-        query_vec = self.embedding.encode_text(query)
-        vector_results = self.vector_db.search(query_vec, top_k=50)
-        
-        # 3-1. Vector ID -> File Path 변환
-        if vector_results:
-            vector_ids = [res['vector_id'] for res in vector_results]
-            # Batch query to get file paths
-            id_to_path_map = self.db.get_file_paths_by_vector_ids(vector_ids)
+        search_cfg = self.config.get_search_config()
+        page_size = search_cfg.get("page_size", 50)
+
+        # 태그 필터링을 위한 허용 파일 ID 미리 계산 (Query + Tags 경우, 태그 필터 엔진의 정렬된 ID 배열)
+        allowed_file_ids = None
+        if tags or exclude_tags:
+            allowed_file_ids = self.db.get_file_ids_by_tags(tags, condition=tag_logic, exclude_tags=exclude_tags)
+        verdicts = {} # file_path -> 후처리 필터 통과 여부 (의미/전문 검색 공용)
+
+        # 파일명 검색: 모델 없이 파일명/경로 trigram 인덱스만 사용
+        if mode == "파일명 검색":
+            results = self._filename_search(query, extensions, allowed_file_ids, verdicts, page_size,
+                                            min_similarity=search_cfg.get("filename_fuzzy_threshold", 0.5))
+            return self._attach_tags(results)
+
+        # 3. 전문(BM25) 검색: 식별자/오류 코드처럼 보이는 검색어는 모델 없이 전문 검색만 수행
+        use_hybrid = search_cfg.get("hybrid", True)
+        fast_path = search_cfg.get("lexical_fast_path", True) and looks_like_identifier(query)
+        lexical_results = []
+        if use_hybrid or fast_path:
+            lexical_results = self._lexical_search(query, mode, extensions, allowed_file_ids, verdicts,
+                                                   limit=search_cfg.get("lexical_top_k", 200))
+
+        # 일치 결과가 없더라도 모델 로딩 중이면 의미 검색을 기다리지 않음
+        if fast_path and (lexical_results or not self.is_model_ready()):
+            self.last_search_stats = {"rounds": 0, "lexical": len(lexical_results), "results": len(lexical_results)}
+            print(f"[Search] Lexical fast path: {len(lexical_results)} files")
+            results = lexical_results
+        else:
+            # 4. 의미(벡터) 검색 후 전문 검색 순위와 파일 단위 RRF로 결합
+            results = self._semantic_search(query, mode, extensions, allowed_file_ids, verdicts, search_cfg)
+            if use_hybrid and lexical_results:
+                results = self._fuse_results(results, lexical_results, k=search_cfg.get("rrf_k", 60))
+                self.last_search_stats["lexical"] = len(lexical_results)
+        return self._attach_tags(results[:page_size])
+
+    def _attach_tags(self, results):
+        # 5. 검색 결과에 태그 정보 포함 (배치 조회)
+        if results:
+            file_paths = [res['file_path'] for res in results]
+            tags_map = self.db.get_tags_for_files(file_paths)
             
-            # Map paths back to results
-            for res in vector_results:
-                res['file_path'] = id_to_path_map.get(res['vector_id'])
-        
-        # 4. 후속 필터링 (확장자 등)
-        filtered_results = []
-        
-        # 태그 필터링을 위한 허용 파일 목록 미리 조회 (Query + Tags 경우)
-        allowed_files_by_tags = None
-        if tags and query:
-             allowed_files_by_tags = set(self.db.search_by_tags(tags, condition=tag_logic))
+            for res in results:
+                res['tags'] = tags_map.get(res['file_path'], [])
+            
+        return results
+
+    def _filename_search(self, query, extensions, allowed_file_ids, verdicts, limit, min_similarity=0.5):
+        """
+        파일명/폴더명 검색. 부분 문자열 일치를 먼저, 결과가 부족하면 trigram 유사도 기반
+        오타 허용 일치를 이어 붙입니다.
+        """
+        query = query.strip()
+        if not query:
+            return []
+        start = time.perf_counter()
+        results = []
+        seen = set()
+
+        def collect(rows, match, score_fn):
+            for path, name in rows:
+                if path in seen:
+                    continue
+                seen.add(path)
+                if path not in verdicts:
+                    verdicts[path] = self._passes_post_filter(path, "파일명 검색", extensions, allowed_file_ids)
+                if verdicts[path]:
+                    results.append({"file_path": path, "distance": 0.0, "match": match, "name_score": score_fn(name)})
+
+        # 1. 부분 문자열 일치: 파일명 일치 -> 폴더(경로) 일치 순 (trigram 인덱스는 3글자 이상에서만 사용 가능)
+        fetch = limit * 2 # 후처리 필터로 빠지는 파일 여유분
+        if len(query) >= 3:
+            phrase = build_trigram_query(query)
+            rows = self.db.search_file_names(phrase, limit=fetch, column="file_name")
+            # 짧은 파일명일수록 검색어와 가까운 일치
+            collect(sorted(rows, key=lambda row: len(row[1])), "filename", lambda name: 1.0)
+            if len(results) < limit:
+                collect(self.db.search_file_names(phrase, limit=fetch, column="file_path"), "path", lambda name: 1.0)
+        else:
+            collect(self.db.search_file_names_like(query, limit=fetch), "filename", lambda name: 1.0)
+
+        # 2. 오타 허용: 검색어 trigram을 충분히 공유하는 파일명
+        fuzzy_count = 0
+        if len(results) < limit and len(query) >= 4:
+            candidates = self.db.search_file_names(build_trigram_query(query, fuzzy=True), limit=fetch * 4,
+                                                   column="file_name")
+            scored = [(trigram_similarity(query, name), path, name) for path, name in candidates if path not in seen]
+            scored = [item for item in scored if item[0] >= min_similarity]
+            scored.sort(key=lambda item: item[0], reverse=True)
+            before = len(results)
+            collect([(path, name) for _, path, name in scored], "filename_fuzzy",
+                    lambda name: trigram_similarity(query, name))
+            fuzzy_count = len(results) - before
+
+        results = results[:limit]
+        elapsed = (time.perf_counter() - start) * 1000
+        self.last_search_stats = {"rounds": 0, "filename": len(results), "fuzzy": fuzzy_count, "elapsed_ms": elapsed}
+        print(f"[Search] Filename search: {len(results)} files ({fuzzy_count} fuzzy) in {elapsed:.1f}ms")
+        return results
+
+    def is_lexical_query(self, query):
+        """모델 없이 전문 검색만으로 처리할 검색어인지 여부 (UI에서 모델 로딩 중 검색 허용 판단)"""
+        return bool(self.config.get_search_config().get("lexical_fast_path", True) and looks_like_identifier(query))
+
+    def _semantic_search(self, query, mode, extensions, allowed_file_ids, verdicts, search_cfg):
+        # 벡터 검색 (확장자/모드/태그/루트 조건은 탐색 전에 prefilter로 적용하여
+        # 필터 조건이 있어도 조건을 만족하는 상위 결과를 가져옴)
+        query_vec = self.query_cache.get_or_encode(self.embedding, query)
+        where = self._build_vector_filter(mode, extensions, allowed_file_ids)
+
+        # 후처리 필터(파일 존재, 예외 경로, 기존 행의 태그/확장자)로 결과가 줄어들 수 있으므로
+        # page_size개의 고유 파일이 남을 때까지 top_k를 기하급수적으로 늘려 재검색
+        page_size = search_cfg.get("page_size", 50)
+        growth = max(2, search_cfg.get("overfetch_growth", 4))
+        max_candidates = max(page_size, search_cfg.get("max_candidates", 5000))
+        time_budget = search_cfg.get("time_budget_ms", 300) / 1000.0
+
+        path_cache = {} # vector_id -> file_path (라운드 간 재사용)
+        top_k = page_size
+        rounds = 0
+        start = time.perf_counter()
+        while True:
+            rounds += 1
+            vector_results = self.vector_db.search(query_vec, top_k=top_k, where=where)
+            hits = self._filter_vector_results(
+                vector_results, mode, extensions, allowed_file_ids, path_cache, verdicts)
+            unique_results = self._aggregate_hits(hits, search_cfg)
+            exhausted = len(vector_results) < top_k # 조건에 맞는 후보를 모두 가져옴
+            elapsed = time.perf_counter() - start
+            if len(unique_results) >= page_size or exhausted or top_k >= max_candidates or elapsed >= time_budget:
+                break
+            top_k = min(top_k * growth, max_candidates)
+
+        self.last_search_stats = {
+            "rounds": rounds,
+            "top_k": top_k,
+            "candidates": len(vector_results),
+            "results": len(unique_results),
+            "exhausted": exhausted,
+            "elapsed_ms": (time.perf_counter() - start) * 1000,
+        }
+        print(f"[Search] {rounds} round(s), top_k={top_k}, {len(vector_results)} candidates -> "
+              f"{len(unique_results)} files in {self.last_search_stats['elapsed_ms']:.0f}ms")
+        return unique_results
+
+    def _lexical_search(self, query, mode, extensions, allowed_file_ids, verdicts, limit=200):
+        """청크 전문 검색(BM25) 결과를 파일 단위로 묶어 반환합니다. (파일 내 최고 점수 기준)"""
+        fts_query = build_fts_query(query)
+        if not fts_query:
+            return []
+        try:
+            rows = self.db.search_chunks_fts(fts_query, limit=limit)
+        except Exception as e:
+            print(f"[Search] Full-text search failed: {e}")
+            return []
+
+        hits = []
+        for vector_id, path, chunk_index, score, file_id in rows:
+            if path not in verdicts:
+                verdicts[path] = self._passes_post_filter(path, mode, extensions, allowed_file_ids, file_id)
+            if verdicts[path]:
+                hits.append({"vector_id": vector_id, "file_path": path, "chunk_index": chunk_index, "score": score})
+
+        ranked = aggregate_by_file([hit["file_path"] for hit in hits], [hit["score"] for hit in hits], method="max")
+        results = []
+        for path, score, indices in ranked:
+            best = hits[indices[0]]
+            results.append({
+                "file_path": path,
+                "vector_id": best["vector_id"],
+                "distance": 0.0, # 의미 유사도 없음
+                "lexical_score": score,
+                "match": "lexical",
+                "matched_chunk": best["chunk_index"],
+                "chunks": [{"vector_id": hits[i]["vector_id"], "chunk_index": hits[i]["chunk_index"],
+                            "lexical_score": hits[i]["score"]} for i in indices],
+            })
+        return results
+
+    def _fuse_results(self, semantic_results, lexical_results, k=60):
+        """파일 단위 의미/전문 검색 순위를 RRF로 결합합니다. 양쪽에 있으면 의미 검색 결과를 기준으로 병합."""
+        by_path = {res["file_path"]: res for res in lexical_results}
+        for res in semantic_results:
+            lexical = by_path.get(res["file_path"])
+            res["match"] = "hybrid" if lexical else "semantic"
+            if lexical:
+                res["lexical_score"] = lexical["lexical_score"]
+            by_path[res["file_path"]] = res
 
+        fused = reciprocal_rank_fusion(
+            [[res["file_path"] for res in semantic_results], [res["file_path"] for res in lexical_results]], k=k)
+        results = []
+        for path, score in fused:
+            res = by_path[path]
+            res["score"] = score
+            results.append(res)
+        return results
+
+    def _filter_vector_results(self, vector_results, mode, extensions, allowed_file_ids, path_cache, verdicts):
+        """벡터 검색 결과(청크 단위)에 경로를 붙이고 후처리 필터를 통과한 결과만 반환합니다."""
+        # 3-1. Vector ID -> File Path 변환 (이전 라운드에서 조회한 ID는 제외)
+        missing_ids = [res['vector_id'] for res in vector_results if res['vector_id'] not in path_cache]
+        if missing_ids:
+            id_to_path_map = self.db.get_file_paths_by_vector_ids(missing_ids)
+            for vid in missing_ids:
+                path_cache[vid] = id_to_path_map.get(vid)
+
+        # 4. 후속 필터링 (prefilter를 적용할 수 없는 기존 행, 삭제된 파일, 예외 경로 등)
+        hits = []
         for res in vector_results:
-            path = res.get('file_path') # vector_id에 해당하는 파일이 없을 수 있음 (DB 비동기 삭제 등)
+            path = path_cache.get(res['vector_id']) # vector_id에 해당하는 파일이 없을 수 있음 (DB 비동기 삭제 등)
             if not path:
                 continue
-                
-            # 파일 존재 여부 확인 (삭제된 파일이 벡터DB에 남아있을 수 있음)
-            if not os.path.exists(path):
-                continue
-            
-            # 모니터링 대상 여부 및 예외 경로 필터링 (1-3 및 버그 해결)
-            if not self.is_monitored(path):
+            if path not in verdicts:
+                verdicts[path] = self._passes_post_filter(path, mode, extensions, allowed_file_ids,
+                                                          res.get('file_id'))
+            if not verdicts[path]:
                 continue
+            res['file_path'] = path
+            hits.append(res)
+        return hits
 
-            # 태그 필터 적용
-            if allowed_files_by_tags is not None:
-                if path not in allowed_files_by_tags:
-                    continue
+    def _aggregate_hits(self, hits, search_cfg):
+        """
+        청크 단위 결과를 파일 단위로 묶어 파일 점수순으로 반환합니다.
+        각 결과의 distance는 파일 점수(유사도)이며, matched_chunk는 가장 유사한 청크 번호,
+        chunks는 일치한 청크 목록(유사도순)입니다.
+        """
+        ranked = aggregate_by_file(
+            [hit['file_path'] for hit in hits], [hit['distance'] for hit in hits],
+            method=search_cfg.get("aggregation", "fused"),
+            top_n=search_cfg.get("aggregation_top_n", 3),
+            alpha=search_cfg.get("aggregation_alpha", 0.7)
+        )
+        results = []
+        for path, score, indices in ranked:
+            best = hits[indices[0]]
+            results.append({
+                "file_path": path,
+                "file_id": best.get("file_id"),
+                "vector_id": best["vector_id"],
+                "distance": score,
+                "match": "semantic",
+                "matched_chunk": best.get("chunk_index"),
+                "chunks": [{"vector_id": hits[i]["vector_id"], "chunk_index": hits[i].get("chunk_index"),
+                            "distance": hits[i]["distance"]} for i in indices],
+            })
+        return results
 
-            ext = os.path.splitext(path)[1].lower().replace(".", "")
-            
-            if extensions and ext not in extensions:
-                continue
-                
-            # 이미지/텍스트 모드 필터 (간단 구현)
-            if mode == "이미지 검색" and ext not in ["jpg", "jpeg", "png", "bmp", "gif"]:
-                continue
-            if mode == "텍스트 검색" and ext in ["jpg", "jpeg", "png", "bmp", "gif"]:
-                continue
-                
-            filtered_results.append(res)
-            
-        # 5. 검색 결과에 태그 정보 포함 (배치 조회)
-        unique_results = []
-        seen_paths = set()
+    def _passes_post_filter(self, path, mode, extensions, allowed_file_ids, file_id=None):
+        # 파일 존재 여부 확인 (삭제된 파일이 벡터DB에 남아있을 수 있음)
+        if not os.path.exists(path):
+            return False
         
-        for res in filtered_results:
-            if res['file_path'] not in seen_paths:
-                seen_paths.add(res['file_path'])
-                unique_results.append(res)
+        # 모니터링 대상 여부 및 예외 경로 필터링 (1-3 및 버그 해결)
+        if not self.is_monitored(path):
+            return False
+
+        # 태그 필터 적용 (파일 ID 이진 탐색, 메타데이터 없이 저장된 기존 행은 경로로 ID 조회)
+        if allowed_file_ids is not None:
+            if file_id is None or file_id < 0:
+                file_id = self.db.get_file_id(path)
+            if file_id is None or not contains_sorted(allowed_file_ids, file_id):
+                return False
+
+        ext = os.path.splitext(path)[1].lower().replace(".", "")
         
-        if unique_results:
-            file_paths = [res['file_path'] for res in unique_results]
-            tags_map = self.db.get_tags_for_files(file_paths)
-            
-            for res in unique_results:
-                res['tags'] = tags_map.get(res['file_path'], [])
+        if extensions and ext not in extensions:
+            return False
             
-        return unique_results
+        # 이미지/텍스트 모드 필터 (간단 구현)
+        if mode == "이미지 검색" and ext not in ["jpg", "jpeg", "png", "bmp", "gif"]:
+            return False
+        if mode == "텍스트 검색" and ext in ["jpg", "jpeg", "png", "bmp", "gif"]:
+            return False
+        return True
 
     def is_monitored(self, path):
         path = os.path.normpath(path)
@@ -243,7 +564,11 @@ class SemanticIndexer:
         if not self.is_monitored(path):
             self.index_folder(path)
 
-    def remove_from_monitoring(self, path):
+    def remove_from_monitoring(self, path, progress=None):
+        """
+        경로를 모니터링에서 해제합니다. 등록된 루트이면 인덱스 데이터를 일괄 삭제하고 삭제된 파일 수를 반환합니다.
+        progress(current, total, message): 진행 상황 콜백 (FolderRemovalWorker에서 사용)
+        """
         path = os.path.normpath(path)
         # Get raw folders but check against normalized
         start_folders = self.config.get_folders()
@@ -259,39 +584,9 @@ class SemanticIndexer:
         if target_folder:
             self.remove_folder(target_folder)
             # Delete related data from DB
-            # RDB
-            # RDB
-            with self.db._get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Get IDs to delete (Exact match + Subpath match)
-                # 1. Exact match
-                cursor.execute("SELECT id FROM files WHERE file_path = ?", (path,))
-                ids = [row[0] for row in cursor.fetchall()]
-                
-                # 2. Subpath match
-                cursor.execute("SELECT id FROM files WHERE file_path LIKE ?", (f"{path}{os.sep}%",))
-                ids.extend([row[0] for row in cursor.fetchall()])
-                
-                # Delete vectors for these files
-                for fid in ids:
-                    v_ids = self.db.get_vector_ids(fid)
-                    if v_ids:
-                        self.vector_db.delete_vectors_by_ids(v_ids)
-                        self.db.delete_vector_ids(v_ids)
-
-                # Delete files (Cascading delete handles file_vectors and file_tags if configured, 
-                # but we prefer explicit handling or relying on DB cascade)
-                # Since we defined ON DELETE CASCADE in SQLite, deleting files should remove file_vectors rows automatically.
-                # However, we needed to delete from Vector DB FIRST (which we just did above).
-                
-                # Now delete files
-                cursor.execute("DELETE FROM files WHERE file_path = ?", (path,))
-                cursor.execute("DELETE FROM files WHERE file_path LIKE ?", (f"{path}{os.sep}%",))
-                conn.commit()
-
-            print(f"Removed {path} and cleaned up DB.")
-            return
+            removed = self._remove_indexed_tree(path, progress)
+            print(f"Removed {path} and cleaned up DB ({removed} files).")
+            return removed
 
         # Case 2: Subpath of Monitored Folder
         # Check if it is really monitored first
@@ -300,6 +595,36 @@ class SemanticIndexer:
             print(f"Added monitoring exception: {path}")
             # Do NOT delete from DB per requirements
 
+    def _remove_indexed_tree(self, path, progress=None):
+        """
+        폴더(또는 파일) 아래의 인덱스 데이터를 파일 단위 반복 없이 삭제합니다.
+        1) Vector ID를 한 번의 쿼리로 조회 2) 벡터 DB에서 한 번의 delete (가능하면 root_id 조건)
+        3) SQLite 행을 하나의 트랜잭션으로 삭제
+        """
+        steps = 3
+        def report(step, message):
+            if progress:
+                progress(step, steps, message)
+
+        report(0, f"삭제 대상 조회 중: {path}")
+        vector_ids = self.db.get_vector_ids_under(path)
+        # 루트 자체가 파일인 경우
+        exact_id = self.db.get_file_id(path)
+        exact_vector_ids = self.db.get_vector_ids(exact_id) if exact_id else []
+        vector_ids.extend(exact_vector_ids)
+
+        # Vector DB FIRST (SQLite의 ID 매핑이 남아 있어야 재시도 가능)
+        report(1, f"벡터 {len(vector_ids)}개 삭제 중")
+        self.vector_db.delete_bulk(vector_ids, root_ids=self.db.get_root_ids_under(path))
+
+        report(2, "메타데이터 삭제 중")
+        with self.db.transaction():
+            self.db.delete_vector_ids(exact_vector_ids)
+            self.db.delete_file(path)
+            removed = self.db.delete_files_under(path) + (1 if exact_id else 0)
+        report(steps, f"삭제 완료: {path}")
+        return removed
+
     def _on_change(self, file_path, action):
         # Check exceptions first
         if not self.is_monitored(file_path):
@@ -313,19 +638,17 @@ class SemanticIndexer:
         # Watchdog 이벤트 -> 우선순위 큐로 전달
         if action in ["created", "modified"]:
             # 단순 읽기 등으로 인한 중복 감지 방지
-            # DB에 저장된 시간과 현재 파일 시간이 같으면 큐에 추가하지 않음
+            # DB에 저장된 stat(mtime_ns, 크기)과 같으면 큐에 추가하지 않음
+            # (stat만 비교, 내용 해시는 워커의 Scanner에서 필요할 때만 계산)
             if os.path.exists(file_path):
-                current_mtime = os.path.getmtime(file_path)
-                last_modified = datetime.fromtimestamp(current_mtime)
-                
-                db_metadata = self.db.get_file_metadata(file_path)
-                if db_metadata:
-                    stored_modified = db_metadata.get('last_modified')
-                    # 저장된 시간과 현재 시간이 같으면 무시
-                    # (Scanner 내부에서도 체크하지만, 큐 진입 자체를 막기 위함)
-                    if str(stored_modified) == str(last_modified):
-                        # print(f"Ignored event (Unchanged): {file_path}")
-                        return
+                st = os.stat(file_path)
+                state = self.db.get_file_state(file_path)
+                unchanged = stat_unchanged(state, st)
+                if unchanged is None:
+                    unchanged = legacy_unchanged(state, st.st_mtime)
+                if unchanged:
+                    # print(f"Ignored event (Unchanged): {file_path}")
+                    return
 
             self.queue_manager.add_task(file_path, "update")
         elif action == "deleted":
@@ -333,51 +656,112 @@ class SemanticIndexer:
 
     def _worker(self):
         print("Indexing worker started")
+        # 여러 파일의 청크를 한 번에 임베딩하기 위해 update 작업은 묶어서 처리
+        batch_files = self.config.get_indexing_config().get("batch_files", 16)
         while self.running:
-            task = self.queue_manager.get_next_task()
-            if task:
+            tasks = self.queue_manager.get_next_tasks(batch_files)
+            if tasks:
                 try:
-                    self.queue_manager.set_current_task(task)
+                    self.queue_manager.set_current_task(tasks[0])
                     
-                    if task.status == "update":
-                        # 파일이 존재하는지 확인 (큐 대기 중 삭제되었을 수 있음)
-                        if os.path.exists(task.path):
-                            print(f"[Worker] Processing update: {task.path}")
-                            self.scanner.process_file(task.path)
-                            # 태그 생성
-                            try:
-                                tags = self.tagger.generate_tags(task.path, [tag[0] for tag in self.db.get_all_tags()])
-                                for tag in tags:
-                                    self.db.link_file_tag(task.path, tag)
-                            except Exception as e:
-                                print(f"[Worker] Tag generation failed for {task.path}: {e}")
-                        else:
-                             print(f"[Worker] File not found (skipping): {task.path}")
-
-                    elif task.status == "deleted":
-                        print(f"[Worker] Processing delete: {task.path}")
-                        # 1. 벡터 DB에서 삭제 (ID 조회 -> 삭제)
-                        file_id = self.db.get_file_id(task.path)
-                        if file_id:
-                            vector_ids = self.db.get_vector_ids(file_id)
-                            if vector_ids:
-                                self.vector_db.delete_vectors_by_ids(vector_ids)
-                                self.db.delete_vector_ids(vector_ids)
-                        
-                        # 2. 메타데이터 DB 삭제
-                        self.db.delete_file(task.path)
+                    if tasks[0].status == "deleted":
+                        self._process_delete(tasks[0].path)
+                    else:
+                        self._process_updates(tasks)
                 except Exception as e:
-                    print(f"[Worker] Error processing {task.path}: {e}")
+                    print(f"[Worker] Error processing {[t.path for t in tasks]}: {e}")
                 finally:
                     self.queue_manager.clear_current_task()
             else:
+                # 유휴 상태: 버퍼에 남은 벡터 변경 사항을 주기적으로 기록
+                try:
+                    self.vector_db.flush_if_due()
+                except Exception as e:
+                    print(f"[Worker] Vector flush failed: {e}")
+                if self._fts_backfill_cursor is not None:
+                    self._backfill_chunk_texts()
+                if self._vector_metadata_backfill:
+                    self._backfill_vector_metadata()
                 time.sleep(0.5) # Idle wait
 
+    def _backfill_chunk_texts(self):
+        """유휴 시간에 청크 전문 검색 인덱스를 조금씩 채웁니다 (인덱싱과 같은 워커 스레드에서 실행)."""
+        try:
+            result = self.scanner.backfill_chunk_texts(self._fts_backfill_cursor)
+        except Exception as e:
+            print(f"[Worker] Chunk text backfill failed: {e}")
+            self._fts_backfill_cursor = None
+            return
+        if result is None:
+            self._fts_backfill_cursor = None
+            return
+        self._fts_backfill_cursor, reindex = result
+        for path in reindex:
+            self.queue_manager.add_task(path, "update")
+
+    def _backfill_vector_metadata(self):
+        """유휴 시간에 메타데이터 없는 벡터 행을 조금씩 채웁니다 (끝나면 prefilter가 후보를 실제로 좁힘)."""
+        try:
+            done = self.scanner.backfill_vector_metadata() == 0
+        except Exception as e:
+            print(f"[Worker] Vector metadata backfill failed: {e}")
+            done = True
+        if done:
+            self._vector_metadata_backfill = False
+
+    def _process_updates(self, tasks):
+        # 파일이 존재하는지 확인 (큐 대기 중 삭제되었을 수 있음)
+        paths = []
+        for task in tasks:
+            if os.path.exists(task.path):
+                print(f"[Worker] Processing update: {task.path}")
+                paths.append(task.path)
+            else:
+                print(f"[Worker] File not found (skipping): {task.path}")
+        if not paths:
+            return
+
+        indexed = self.scanner.process_files(paths)
+
+        # 태그 생성 (실제로 다시 인덱싱된 파일만, touch/같은 내용 저장은 LLM 호출 없음)
+        for path in indexed:
+            if not self.running:
+                break # 종료 중: 남은 파일의 태그 생성은 건너뜀
+            try:
+                tags = self.tagger.generate_tags(path, self.db.get_tag_names())
+                self.db.link_file_tags(path, tags)
+            except Exception as e:
+                print(f"[Worker] Tag generation failed for {path}: {e}")
+
+    def _process_delete(self, path):
+        print(f"[Worker] Processing delete: {path}")
+        # 1. 벡터 DB에서 삭제 (ID 조회 -> 삭제)
+        file_id = self.db.get_file_id(path)
+        if file_id:
+            vector_ids = self.db.get_vector_ids(file_id)
+            if vector_ids:
+                self.vector_db.delete_vectors_by_ids(vector_ids)
+                self.db.delete_vector_ids(vector_ids)
+        
+        # 2. 메타데이터 DB 삭제
+        self.db.delete_file(path)
+
     def start_monitoring(self):
         self.monitor.start()
 
     def stop(self):
         self.running = False
         self.monitor.stop()
+        self.maintenance.stop()
         if self.worker_thread.is_alive():
-            self.worker_thread.join(timeout=1.0)
+            # 워커는 파일/임베딩 단계 사이에서 중단 요청을 확인하고 배치를 반영하지 않고 끝냄.
+            # 모델 로드나 임베딩 호출 중이면 기다리지 않음: 마지막 flush 이후 버퍼에 추가된 파일은
+            # vectors_pending으로 남아 다음 실행에서 다시 인덱싱됨
+            timeout = self.config.get_indexing_config().get("stop_timeout_sec", 5.0)
+            self.worker_thread.join(timeout=timeout)
+            if self.worker_thread.is_alive():
+                print(f"[Worker] Still busy after {timeout}s, stopping without waiting")
+        # 종료 전 write-behind 버퍼 기록
+        self.vector_db.flush()
+        self.db.close()
+        self.embedding_cache.close()
@@ -0,0 +1,47 @@
+import hashlib
+from datetime import datetime
+
+# 해시 읽기 단위 (1MB)
+_READ_SIZE = 1 << 20
+
+def content_hash(file_path):
+    """파일 내용의 빠른 해시 (BLAKE2b 128bit, hex). 내용이 같으면 mtime이 달라도 같은 값."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(_READ_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def try_content_hash(file_path):
+    """content_hash와 같지만 읽을 수 없는 파일(잠김, 권한 없음 등)이면 None."""
+    try:
+        return content_hash(file_path)
+    except OSError as e:
+        print(f"Could not hash {file_path}: {e}")
+        return None
+
+def stat_unchanged(state, st):
+    """
+    DB에 저장된 파일 상태(get_file_state)와 os.stat 결과가 같은지 (정수 mtime_ns + 크기 비교).
+    stat 정보 없이 저장된 기존 행이면 None (호출 측에서 last_modified 비교로 대체).
+    벡터 DB 기록이 끝나지 않은 파일(vectors_pending)은 항상 False.
+    """
+    if state and state.get("vectors_pending"):
+        return False
+    if not state or state.get("mtime_ns") is None:
+        return None
+    return state["mtime_ns"] == st.st_mtime_ns and state["size"] == st.st_size
+
+def content_unchanged(state, st, file_path):
+    """
+    stat이 달라진 파일의 내용이 저장된 해시와 같은지 확인합니다. (크기가 같고 해시가 있을 때만 해시 계산)
+    Returns: (unchanged 여부, 계산한 해시 또는 None)
+    """
+    if not state or state.get("vectors_pending") or not state.get("content_hash") or state.get("size") != st.st_size:
+        return False, None
+    digest = try_content_hash(file_path)
+    return digest is not None and digest == state["content_hash"], digest
+
+def legacy_unchanged(state, mtime):
+    """stat 컬럼 이전 행: 기존 방식대로 last_modified 문자열 비교."""
+    return bool(state) and str(state.get("last_modified")) == str(datetime.fromtimestamp(mtime))
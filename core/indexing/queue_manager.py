@@ -2,7 +2,7 @@ import heapq
 import time
 import threading
 from dataclasses import dataclass, field
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 
 @dataclass(order=True)
 class QueueItem:
@@ -80,6 +80,27 @@ class IndexingQueueManager:
                     continue
             return None
 
+    def get_next_tasks(self, max_count) -> List[QueueItem]:
+        """
+        여러 update 작업을 한 번에 꺼냅니다 (파일 간 배치 임베딩용).
+        delete 작업은 우선순위가 높으므로 단독으로 반환됩니다.
+        """
+        with self.lock:
+            tasks = []
+            while self.queue and len(tasks) < max_count:
+                item = self.queue[0]
+                if not (item.path in self.pending_tasks and self.pending_tasks[item.path] == item):
+                    heapq.heappop(self.queue) # stale
+                    continue
+                if tasks and item.status == "deleted":
+                    break
+                heapq.heappop(self.queue)
+                del self.pending_tasks[item.path]
+                tasks.append(item)
+                if item.status == "deleted":
+                    break
+            return tasks
+
     def get_queue_size(self):
         with self.lock:
             return len(self.pending_tasks)
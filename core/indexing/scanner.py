@@ -1,14 +1,22 @@
 import os
+import contextlib
+import numpy as np
 import pdfplumber
 from docx import Document
 from PIL import Image
 from datetime import datetime
+from core.embedding.scheduler import EmbeddingBatchScheduler
+from core.indexing.chunker import TextChunker
+from core.indexing.fingerprint import try_content_hash, stat_unchanged, content_unchanged, legacy_unchanged
 
 class FileScanner:
-    def __init__(self, embedding_adapter, db_manager, vector_db_manager=None):
+    def __init__(self, embedding_adapter, db_manager, vector_db_manager=None, embedding_cache=None, root_resolver=None):
         self.embedding_adapter = embedding_adapter
         self.db_manager = db_manager
         self.vector_db_manager = vector_db_manager
+        self.embedding_cache = embedding_cache # 청크 해시 기반 임베딩 캐시 (선택)
+        self.root_resolver = root_resolver # file_path -> 모니터링 루트 ID (선택, 벡터 prefilter용)
+        self.stop_requested = None # () -> bool, True면 처리 중인 배치를 반영하지 않고 중단 (종료 시)
         self.supported_extensions = {
             'text': ['.txt', '.md', '.py', '.c', '.cpp', '.h', '.java', '.js', '.html', '.css'],
             'document': ['.pdf', '.docx'],
@@ -24,98 +32,259 @@ class FileScanner:
 
     def process_file(self, file_path):
         """단일 파일을 처리하여 DB에 저장하고 임베딩을 생성합니다."""
+        return self.process_files([file_path])
+
+    def process_files(self, file_paths):
+        """
+        여러 파일을 한 번에 처리합니다.
+        모든 파일의 텍스트 청크를 스케줄러에 모아 길이 버킷 단위로 임베딩한 뒤,
+        파일별로 청크 순서에 맞게 DB에 반영합니다.
+        Returns: 실제로 다시 인덱싱된 파일 경로 목록 (정규화된 경로, 변경 없음/실패/임베딩 재시도 대기 파일 제외)
+        중단 요청 시 배치 전체를 반영하지 않으므로 DB의 stat이 그대로 남아 다음 스캔에서 다시 처리됩니다.
+        """
+        # 1. 변경 확인 및 텍스트/이미지 추출
+        jobs = []
+        seen_paths = set()
+        for file_path in file_paths:
+            if self._should_stop():
+                return []
+            try:
+                job = self._prepare_file(file_path)
+            except Exception as e:
+                print(f"Error preparing {file_path}: {e}")
+                continue
+            if job and job["file_path"] not in seen_paths:
+                seen_paths.add(job["file_path"])
+                jobs.append(job)
+        if not jobs:
+            return []
+
+        # 2. 임베딩 생성 (텍스트 청크는 파일 경계를 넘어 버킷 배치)
+        if self._should_stop():
+            return []
+        embeddings = {}
+        scheduler = EmbeddingBatchScheduler(self.embedding_adapter, cache=self.embedding_cache)
+        for job in jobs:
+            if job["chunks"]:
+                scheduler.submit(job["file_path"], job["chunks"])
+        embeddings.update(scheduler.flush())
+
+        # 이미지는 한 번의 호출로 병렬 디코딩 + 배치 임베딩
+        image_paths = [job["file_path"] for job in jobs if job["kind"] == "image"]
+        if image_paths and not self._should_stop():
+            embeddings.update(self._encode_images(image_paths))
+        if self._should_stop():
+            return []
+
+        # 3. DB 반영: 배치 전체를 하나의 SQLite 트랜잭션으로 (파일마다 SAVEPOINT)
+        # 벡터 DB 변경은 SAVEPOINT가 해제된 파일만 모아 두었다가 커밋 후 적용
+        # (롤백된 Vector ID의 벡터가 벡터 DB에 남아 다른 파일 결과로 검색되지 않도록)
+        # 벡터를 쓴 파일은 vectors_pending으로 커밋되고, 버퍼가 flush된 뒤에야 표시가 지워짐 (on_flush).
+        # 커밋과 버퍼 추가 사이에 다른 스레드의 flush가 이전 버전 벡터로 표시를 지우지 않도록 벡터 DB 잠금 유지
+        vector_lock = self.vector_db_manager.lock if self.vector_db_manager else contextlib.nullcontext()
+        indexed = []
+        with vector_lock:
+            vector_writes = []
+            with self.db_manager.transaction():
+                for job in jobs:
+                    try:
+                        with self.db_manager.transaction():
+                            write = self._commit_file(job, embeddings.get(job["file_path"]))
+                    except Exception as e:
+                        # 실패한 파일의 변경만 되돌리고 나머지 파일은 계속 반영
+                        print(f"Error indexing {job['file_path']}: {e}")
+                        continue
+                    if write:
+                        vector_writes.append(write)
+                    if write or not self._expects_vectors(job):
+                        indexed.append(job["file_path"])
+            self._apply_vector_writes(vector_writes)
+        return indexed
+
+    def _should_stop(self):
+        return bool(self.stop_requested and self.stop_requested())
+
+    def _prepare_file(self, file_path):
+        """변경된 파일이면 임베딩 대상(청크/이미지)을 담은 작업을 반환하고, 아니면 None."""
         # Normalize path to use OS separator (e.g. Backslash on Windows)
         file_path = os.path.normpath(file_path)
         
         ext = os.path.splitext(file_path)[1].lower()
-        mtime = os.path.getmtime(file_path)
-        last_modified = datetime.fromtimestamp(mtime)
+        st = os.stat(file_path)
+        last_modified = datetime.fromtimestamp(st.st_mtime)
 
         # 0. 변경 여부 확인 (중복 인덱싱 방지)
-        db_metadata = self.db_manager.get_file_metadata(file_path)
-        if db_metadata:
-            stored_last_modified_str = db_metadata.get("last_modified")
-            # SQLite stores datetime as string usually, need to parse if it's string
-            # But here let's rely on strict comparison or string comparison if format is consistent
-            # Python sqlite3 adapter might return datetime object if configured, but let's be safe.
-            # Assuming standard string format "YYYY-MM-DD HH:MM:SS..."
-            
-            # Simple string comparison might work if formats are identical.
-            # Let's try to parse if needed, or compare string representation of current time.
-            # Actually, `upsert_file` passes a datetime object. SQLite adapter handles conversion.
-            # When reading back, it might be string.
-            
-            # Let's simplify: Compare timestamp if possible or string. 
-            # Ideally we check if abs(stored - current) < threshold.
-            # For now, let's just convert current to string and compare, or parse stored.
-            
-            # Note: sqlite_manager uses `last_modified` from arguments directly.
-            # Let's fetch what we just read.
-            pass
-
-        # To avoid timezone/format complexity, let's re-fetch the robust way or just do a quick check.
-        # If we use string comparison, we need to ensure format matches DB's default.
-        # Let's compare timestamps.
+        # 1단계: 정수 mtime_ns + 크기 비교, 2단계: stat이 달라졌고 크기가 같으면 내용 해시 비교
+        state = self.db_manager.get_file_state(file_path)
+        unchanged = stat_unchanged(state, st)
+        if unchanged is None and legacy_unchanged(state, st.st_mtime):
+            # stat 정보 없이 저장된 기존 행: 이전 방식(last_modified 문자열)으로 확인 후 stat 기록
+            self.db_manager.update_file_stat(file_path, last_modified, st.st_mtime_ns, st.st_size)
+            unchanged = True
+        if unchanged:
+            print(f"Skipped (Unchanged): {file_path}")
+            return None
+
+        kind = self._file_kind(ext)
+
+        # 내용 해시는 임베딩 대상만 (재임베딩을 피할 때만 이득, 동영상/압축 파일 등은 전체 읽기 비용만 듦)
+        same_content, digest = content_unchanged(state, st, file_path) if kind else (False, None)
+        if same_content:
+            # touch/복사/같은 내용으로 다시 저장: 추출/임베딩 없이 stat만 갱신
+            self.db_manager.update_file_stat(file_path, last_modified, st.st_mtime_ns, st.st_size)
+            print(f"Skipped (Content unchanged): {file_path}")
+            return None
+
+        job = {"file_path": file_path, "last_modified": last_modified, "kind": kind, "chunks": [],
+               "mtime_ns": st.st_mtime_ns, "size": st.st_size,
+               "content_hash": (digest or try_content_hash(file_path)) if kind else None}
+        if kind == "text":
+            text = self.extract_text(file_path)
+            if text:
+                job["chunks"] = TextChunker().split_text(text)
+        return job
+
+    def _commit_file(self, job, embeddings):
+        """
+        파일 하나의 메타데이터/Vector ID 매핑을 SQLite에 반영합니다.
+        SQLite 쪽 작업은 호출 측 transaction() 안에서 실행되어 커밋되지 않고 모였다가 한 번에 커밋됩니다.
+        Returns: 커밋 후 벡터 DB에 적용할 변경 (_apply_vector_writes 입력) 또는 None
+        """
+        file_path = job["file_path"]
+
+        # 2. DB 업데이트: 항상 수행 (메타데이터/파일명 검색 등)
+        # 임베딩 대상인데 벡터가 없으면(인코딩 실패) 기존 벡터를 유지하고 vectors_pending으로 남겨 다음 스캔 때 재시도
+        expects_vectors = self._expects_vectors(job)
+        has_vectors = expects_vectors and embeddings is not None and len(embeddings) > 0
+        file_id = self.db_manager.upsert_file(file_path, job["last_modified"], mtime_ns=job.get("mtime_ns"),
+                                              size=job.get("size"), content_hash=job.get("content_hash"),
+                                              vectors_pending=expects_vectors)
         
-        should_process = True
-        if db_metadata:
-             stored_modified = db_metadata['last_modified']
-             # 파이썬 sqlite3 모듈에서 datetime 변환 처리가 이뤄질 수 있어 객체/문자열이 섞일 수 있음.
-             # 가장 안전한 방식은 양쪽 모두 문자열로 변환하여 밀리초 단위까지 동일한지 비교하는 것.
-             if str(stored_modified) == str(last_modified):
-                 should_process = False
-                 print(f"Skipped (Unchanged): {file_path}")
-
-        if should_process:
-            # 1. 텍스트/이미지 추출 및 임베딩 생성
-            embeddingsList = []
-            if self._is_supported(ext, 'text') or self._is_supported(ext, 'document'):
-                text = self.extract_text(file_path)
-                if text:
-                    from core.indexing.chunker import TextChunker
-                    chunker = TextChunker()
-                    chunks = chunker.split_text(text)
-                    
-                    if chunks:
-                        # 배치 단위 처리를 통해 VRAM 초과 방지
-                        batch_size = 8
-                        for i in range(0, len(chunks), batch_size):
-                            batch = chunks[i:i+batch_size]
-                            try:
-                                emb = self.embedding_adapter.encode_text(batch)
-                                embeddingsList.extend(emb)
-                            except Exception as e:
-                                print(f"Error encoding text batch for {file_path}: {e}")
-            elif self._is_supported(ext, 'image'):
-                try:
-                    emb = self.embedding_adapter.encode_image(file_path)
-                    if emb is not None and len(emb) > 0:
-                        embeddingsList.extend(emb)
-                except Exception as e:
-                    print(f"Error encoding image {file_path}: {e}")
-    
-            # 2. DB 업데이트: 항상 수행 (메타데이터/파일명 검색 등)
-            file_id = self.db_manager.upsert_file(file_path, last_modified)
-            
-            # 3. Vector DB 업데이트
-            if len(embeddingsList) > 0 and self.vector_db_manager:
-                import numpy as np
-                # 3-1. 기존 벡터 삭제 (파일 수정 시)
-                old_vector_ids = self.db_manager.get_vector_ids(file_id)
-                if old_vector_ids:
-                    self.vector_db_manager.delete_vectors_by_ids(old_vector_ids)
-                    self.db_manager.delete_vector_ids(old_vector_ids)
-
-                # 3-2. 새 벡터 ID 발급
-                new_vector_ids = []
-                for _ in range(len(embeddingsList)):
-                    new_vector_ids.append(self.db_manager.allocate_vector_id(file_id))
-                
-                # 3-3. Vector DB에 추가
-                self.vector_db_manager.add_vectors(np.array(embeddingsList), new_vector_ids)
-                print(f"Indexed (with {len(new_vector_ids)} embeddings): {file_path}")
-            else:
-                print(f"Indexed (metadata only): {file_path}")
+        # 3. Vector ID 매핑 업데이트 (벡터 DB 반영은 커밋 후)
+        if has_vectors:
+            # 3-1. 기존 Vector ID 삭제 (파일 수정 시)
+            old_vector_ids = self.db_manager.get_vector_ids(file_id)
+            if old_vector_ids:
+                self.db_manager.delete_vector_ids(old_vector_ids)
+
+            # 3-2. 새 벡터 ID 발급 (청크 수만큼 한 번의 INSERT)
+            new_vector_ids = self.db_manager.allocate_vector_ids(file_id, len(embeddings))
+
+            # 3-3. 청크 전문 검색 인덱스 (식별자/오류 코드 등 lexical 검색용)
+            if job["kind"] == "text" and len(job["chunks"]) == len(new_vector_ids):
+                self.db_manager.add_chunk_texts(new_vector_ids, job["chunks"])
+
+            # 3-4. Vector DB 변경 (검색 prefilter용 파일 메타데이터 포함)
+            root_id = self.root_resolver(file_path) if self.root_resolver else None
+            print(f"Indexed (with {len(new_vector_ids)} embeddings): {file_path}")
+            return {
+                "old_ids": old_vector_ids,
+                "ids": new_vector_ids,
+                "vectors": np.asarray(embeddings),
+                "metadata": {
+                    "file_id": file_id,
+                    "extension": os.path.splitext(file_path)[1].lower(),
+                    "kind": job["kind"],
+                    "root_id": root_id if root_id is not None else -1,
+                },
+            }
+        if expects_vectors:
+            print(f"Indexed (metadata only, embedding failed - will retry): {file_path}")
+        else:
+            print(f"Indexed (metadata only): {file_path}")
+        return None
+
+    def _encode_images(self, image_paths):
+        """이미지 배치 임베딩. 배치가 실패하면 이미지별로 다시 시도합니다 (실패한 이미지는 결과에서 제외)."""
+        try:
+            emb = self.embedding_adapter.encode_image(image_paths)
+            return {path: vec[np.newaxis, :] for path, vec in zip(image_paths, emb)}
+        except Exception as e:
+            print(f"Error encoding images {image_paths}: {e}")
+        if len(image_paths) == 1:
+            return {}
+        results = {}
+        for path in image_paths:
+            try:
+                results[path] = np.asarray(self.embedding_adapter.encode_image([path]))[:1]
+            except Exception as e:
+                print(f"Error encoding image {path}: {e}")
+        return results
+
+    def _expects_vectors(self, job):
+        """벡터를 기록해야 하는 작업인지 (텍스트 청크가 있거나 이미지)."""
+        return self.vector_db_manager is not None and (bool(job["chunks"]) or job["kind"] == "image")
+
+    def _apply_vector_writes(self, writes):
+        """SQLite 커밋이 끝난 파일의 기존 벡터 삭제/새 벡터 추가를 벡터 DB에 반영합니다."""
+        for write in writes:
+            if write["old_ids"]:
+                self.vector_db_manager.delete_vectors_by_ids(write["old_ids"])
+            self.vector_db_manager.add_vectors(write["vectors"], write["ids"], **write["metadata"])
+
+    def backfill_chunk_texts(self, after_id=0, limit=32):
+        """
+        청크 전문 검색 인덱스(chunks_fts) 도입 이전에 인덱싱된 파일의 청크 텍스트를 채웁니다.
+        변경 감지가 바뀌지 않은 파일을 건너뛰므로 backfill 없이는 기존 DB의 lexical 검색이 계속 비어 있습니다.
+        임베딩은 다시 계산하지 않고, 파일이 인덱싱 이후 그대로이고 청크 수가 저장된 Vector ID 수와 같을 때만
+        ID 순서대로 연결합니다.
+        Returns: (마지막으로 확인한 file_id, 다시 인덱싱해야 하는 경로 목록), 대상이 더 없으면 None
+        """
+        extensions = self.supported_extensions['text'] + self.supported_extensions['document']
+        rows = self.db_manager.get_files_missing_chunk_texts(extensions, after_id, limit)
+        if not rows:
+            return None
+        reindex = []
+        with self.db_manager.transaction():
+            for file_id, file_path in rows:
+                if not os.path.exists(file_path):
+                    continue # 삭제 이벤트에서 정리됨
+                st = os.stat(file_path)
+                state = self.db_manager.get_file_state(file_path)
+                unchanged = stat_unchanged(state, st)
+                if unchanged is None:
+                    unchanged = legacy_unchanged(state, st.st_mtime)
+                vector_ids = sorted(self.db_manager.get_vector_ids(file_id))
+                text = self.extract_text(file_path) if unchanged else ""
+                chunks = TextChunker().split_text(text) if text else []
+                if chunks and len(chunks) == len(vector_ids):
+                    self.db_manager.add_chunk_texts(vector_ids, chunks)
+                else:
+                    # 인덱싱 이후 바뀐 파일: 다시 인덱싱하면 청크 텍스트도 함께 기록됨
+                    reindex.append(file_path)
+        print(f"Backfilled chunk texts for {len(rows) - len(reindex)} files ({len(reindex)} need re-indexing)")
+        return rows[-1][0], reindex
+
+    def backfill_vector_metadata(self, limit=1000):
+        """
+        파일 메타데이터 컬럼 이전에 저장된 벡터(file_id < 0)에 metadata.db의 파일 정보를 채웁니다.
+        이런 행이 남아 있으면 모든 prefilter에 'OR file_id < 0'이 붙어 후보를 좁히지 못합니다.
+        Vector ID 매핑이 없는 행(삭제된 파일의 잔여 벡터)은 검색 결과로 쓸 수 없으므로 삭제합니다.
+        Returns: 처리한 벡터 수 (0이면 대상이 더 없음)
+        """
+        vector_ids = self.vector_db_manager.get_legacy_vector_ids(limit)
+        if not vector_ids:
+            return 0
+        files = self.db_manager.get_vector_files(vector_ids)
+        orphans = [vid for vid in vector_ids if vid not in files]
+        if orphans:
+            self.vector_db_manager.delete_vectors_by_ids(orphans)
+            self.vector_db_manager.flush()
+
+        found = [vid for vid in vector_ids if vid in files]
+        metadata = {name: [] for name in ("file_id", "extension", "kind", "root_id", "chunk_index")}
+        for vid in found:
+            file_id, file_path, chunk_index = files[vid]
+            ext = os.path.splitext(file_path)[1].lower()
+            root_id = self.root_resolver(file_path) if self.root_resolver else None
+            metadata["file_id"].append(file_id)
+            metadata["extension"].append(ext)
+            metadata["kind"].append(self._file_kind(ext) or "")
+            metadata["root_id"].append(root_id if root_id is not None else -1)
+            metadata["chunk_index"].append(chunk_index)
+        self.vector_db_manager.update_metadata(found, metadata)
+        print(f"Backfilled vector metadata for {len(found)} vectors ({len(orphans)} orphaned vectors removed)")
+        return len(vector_ids)
 
     def extract_text(self, file_path):
         ext = os.path.splitext(file_path)[1].lower()
@@ -142,5 +311,13 @@ class FileScanner:
             print(f"Error extracting text from {file_path}: {e}")
         return ""
 
+    def _file_kind(self, ext):
+        """임베딩 종류: 텍스트/문서는 "text", 이미지는 "image", 그 외는 None (메타데이터만 저장)."""
+        if self._is_supported(ext, 'text') or self._is_supported(ext, 'document'):
+            return "text"
+        if self._is_supported(ext, 'image'):
+            return "image"
+        return None
+
     def _is_supported(self, ext, category):
         return ext in self.supported_extensions.get(category, [])
@@ -0,0 +1,47 @@
+import numpy as np
+
+AGGREGATION_METHODS = ("max", "mean", "fused")
+
+def aggregate_by_file(file_keys, scores, method="fused", top_n=3, alpha=0.7):
+    """
+    청크 단위 검색 결과를 파일 단위 점수로 묶습니다.
+
+    method:
+      - "max": 파일 내 최고 청크 점수
+      - "mean": 상위 top_n개 청크 평균 (청크가 적으면 있는 만큼 평균)
+      - "fused": alpha * max + (1 - alpha) * (상위 top_n개 합 / top_n)
+                 일치하는 청크가 많은 파일을 우대하되 최고 점수를 주로 반영
+
+    Returns: [(file_key, file_score, hit_indices)] 파일 점수 내림차순.
+             hit_indices는 해당 파일 청크들의 입력 위치 (청크 점수 내림차순)
+    """
+    if method not in AGGREGATION_METHODS:
+        raise ValueError(f"Unknown aggregation method: {method}")
+    scores = np.asarray(scores, dtype=np.float32)
+    if len(scores) == 0:
+        return []
+
+    keys, inverse = np.unique(np.asarray(file_keys), return_inverse=True)
+    # 파일별로 모으고 파일 내부는 점수 내림차순
+    order = np.lexsort((-scores, inverse))
+    sorted_groups = inverse[order]
+    sorted_scores = scores[order]
+    # 모든 파일이 최소 1개 청크를 가지므로 g번째 구간이 keys[g]에 해당
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    counts = np.diff(np.r_[starts, len(order)])
+    rank = np.arange(len(order)) - np.repeat(starts, counts) # 파일 내 순위 (0 = 최고)
+
+    best = sorted_scores[starts]
+    top = rank < top_n
+    top_sum = np.bincount(sorted_groups[top], weights=sorted_scores[top], minlength=len(keys))
+
+    if method == "max":
+        file_scores = best
+    elif method == "mean":
+        file_scores = top_sum / np.minimum(counts, top_n)
+    else:
+        file_scores = alpha * best + (1 - alpha) * top_sum / top_n
+
+    ranked = np.argsort(-file_scores, kind="stable")
+    return [(keys[g].item(), float(file_scores[g]), order[starts[g]:starts[g] + counts[g]])
+            for g in ranked]
@@ -0,0 +1,14 @@
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    여러 순위 목록을 Reciprocal Rank Fusion으로 합칩니다.
+    score(d) = sum(1 / (k + rank)), rank는 각 목록에서 1부터 시작.
+    점수 척도가 다른 검색(BM25와 코사인 유사도)을 정규화 없이 결합할 수 있습니다.
+
+    rankings: [[key, ...], ...] 각 목록은 상위부터 정렬
+    Returns: [(key, score)] 점수 내림차순 (동점이면 먼저 등장한 순서)
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,55 @@
+import re
+
+# 공백 없는 한 단어이면서 숫자/밑줄/점/콜론/camelCase 등 코드·식별자 특징이 있는 검색어
+_IDENTIFIER_CHARS = re.compile(r"^[\w.:\-/\\#@$]+$")
+_IDENTIFIER_HINT = re.compile(r"\d|_|\.|::|->|[a-z][A-Z]|^[A-Z0-9]{3,}$")
+
+def looks_like_identifier(query):
+    """
+    함수명, 오류 코드, 파일명처럼 의미 임베딩보다 정확 일치가 중요한 검색어인지 판단합니다.
+    예: "ERR_CONN_RESET", "0x80070005", "getUserName", "config.json"
+    """
+    query = query.strip()
+    if len(query) < 3 or not _IDENTIFIER_CHARS.match(query):
+        return False
+    return bool(_IDENTIFIER_HINT.search(query))
+
+def build_fts_query(query, match_all=False):
+    """
+    사용자 검색어를 FTS5 MATCH 식으로 변환합니다.
+    각 단어를 따옴표로 감싸 FTS 연산자로 해석되지 않게 하고, 접두어(*) 검색으로
+    한국어 조사가 붙은 형태("보고서를")도 찾습니다. 단어가 없으면 빈 문자열.
+    """
+    terms = [term.replace('"', '""') for term in query.split()]
+    terms = [f'"{term}"*' for term in terms if term.strip('"')]
+    return (" AND " if match_all else " OR ").join(terms)
+
+def trigrams(text):
+    """소문자 기준 3글자 조각 목록 (trigram 토크나이저와 같은 단위, 등장 순서 유지)."""
+    text = text.lower()
+    return list(dict.fromkeys(text[i:i + 3] for i in range(len(text) - 2)))
+
+def build_trigram_query(query, fuzzy=False):
+    """
+    파일명 trigram 인덱스용 MATCH 식.
+    fuzzy=False: 검색어 전체를 부분 문자열로 포함 (trigram 토크나이저에서 구문 = 부분 일치)
+    fuzzy=True: 검색어 trigram을 앞/뒤 구간(길면 3구간)으로 나눠 한 구간이라도 모두 포함하면 후보.
+                오타가 없는 구간으로 후보를 찾으며, 각 구간이 AND 조건이라 흔한 trigram만으로
+                대량 일치하지 않습니다. (최종 유사도는 trigram_similarity로 호출 측에서 계산)
+    """
+    if not fuzzy:
+        return '"' + query.replace('"', '""') + '"'
+    grams = ['"' + gram.replace('"', '""') + '"' for gram in trigrams(query)]
+    if not grams:
+        return ""
+    groups = 3 if len(grams) >= 6 else min(2, len(grams))
+    size = -(-len(grams) // groups)
+    parts = ["(" + " AND ".join(grams[i:i + size]) + ")" for i in range(0, len(grams), size)]
+    return " OR ".join(parts)
+
+def trigram_similarity(query, text):
+    """검색어 trigram 중 text에 포함된 비율 (0~1)."""
+    grams = set(trigrams(query))
+    if not grams:
+        return 0.0
+    return len(grams & set(trigrams(text))) / len(grams)
@@ -0,0 +1,117 @@
+import threading
+import numpy as np
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+def _sorted_unique(ids):
+    """정렬 + 인접 중복 제거 (np.unique보다 빠름)."""
+    ids = np.sort(np.asarray(ids, dtype=np.int64))
+    if len(ids) < 2:
+        return ids
+    keep = np.empty(len(ids), dtype=bool)
+    keep[0] = True
+    np.not_equal(ids[1:], ids[:-1], out=keep[1:])
+    return ids[keep]
+
+def contains_sorted(sorted_ids, file_id):
+    """정렬된 ID 배열에 file_id가 있는지 (이진 탐색)."""
+    i = np.searchsorted(sorted_ids, file_id)
+    return bool(i < len(sorted_ids) and sorted_ids[i] == file_id)
+
+class TagPostingIndex:
+    """
+    태그별 파일 ID 목록(정렬된 int64 배열)을 메모리에 유지하는 태그 필터 엔진.
+    AND는 작은 목록부터 교집합, OR는 합집합, NOT은 차집합으로 계산하므로
+    GROUP BY/HAVING 조인이나 경로 문자열 집합 없이 수천 개 파일을 마이크로초 단위로 필터링합니다.
+
+    file_tags 변경은 add/remove/drop_tag/drop_files로 증분 반영합니다.
+    """
+    def __init__(self, pairs=()):
+        """pairs: (tag_id, file_id) 목록 또는 (N, 2) 배열"""
+        self.lock = threading.Lock()
+        self._postings = {}
+        pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+        if len(pairs):
+            pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+            starts = np.flatnonzero(np.diff(pairs[:, 0])) + 1
+            for tag_id, file_ids in zip(pairs[np.r_[0, starts], 0].tolist(), np.split(pairs[:, 1], starts)):
+                self._postings[tag_id] = _sorted_unique(file_ids)
+
+    def __len__(self):
+        return len(self._postings)
+
+    def postings(self, tag_id):
+        return self._postings.get(tag_id, _EMPTY)
+
+    def add(self, tag_id, file_ids):
+        file_ids = _sorted_unique(file_ids)
+        with self.lock:
+            current = self._postings.get(tag_id, _EMPTY)
+            # 정렬 위치에 삽입 (전체 재정렬 없이)
+            positions = np.searchsorted(current, file_ids)
+            present = positions < len(current)
+            present[present] = current[positions[present]] == file_ids[present]
+            new = ~present
+            if new.any():
+                self._postings[tag_id] = np.insert(current, positions[new], file_ids[new])
+
+    def remove(self, tag_id, file_ids):
+        with self.lock:
+            current = self._postings.get(tag_id)
+            if current is None:
+                return
+            remaining = np.setdiff1d(current, np.asarray(file_ids, dtype=np.int64), assume_unique=True)
+            if len(remaining):
+                self._postings[tag_id] = remaining
+            else:
+                del self._postings[tag_id]
+
+    def drop_tag(self, tag_id):
+        with self.lock:
+            self._postings.pop(tag_id, None)
+
+    def drop_files(self, file_ids):
+        """삭제된 파일을 모든 태그 목록에서 제거합니다."""
+        file_ids = np.unique(np.asarray(file_ids, dtype=np.int64))
+        if not len(file_ids):
+            return
+        with self.lock:
+            for tag_id, current in list(self._postings.items()):
+                mask = np.isin(current, file_ids, assume_unique=True, invert=True)
+                if mask.all():
+                    continue
+                if mask.any():
+                    self._postings[tag_id] = current[mask]
+                else:
+                    del self._postings[tag_id]
+
+    def query(self, tag_ids, condition="AND", exclude=None, universe=None):
+        """
+        태그 조건을 만족하는 파일 ID (정렬된 배열).
+        tag_ids: 포함 조건 태그 ID 목록 (condition: "AND" 또는 "OR")
+        exclude: 제외할 태그 ID 목록 (NOT)
+        universe: 포함 조건이 없을 때 NOT을 적용할 전체 파일 ID (정렬된 배열)
+        """
+        with self.lock:
+            lists = [self._postings.get(tag_id, _EMPTY) for tag_id in tag_ids]
+            excluded = [self._postings.get(tag_id, _EMPTY) for tag_id in (exclude or ())]
+
+        if lists:
+            if condition == "OR":
+                result = _sorted_unique(np.concatenate(lists))
+            else:
+                lists.sort(key=len)
+                result = lists[0]
+                for other in lists[1:]:
+                    if not len(result):
+                        break
+                    result = np.intersect1d(result, other, assume_unique=True)
+        elif universe is not None:
+            result = np.asarray(universe, dtype=np.int64)
+        else:
+            return _EMPTY
+
+        for other in excluded:
+            if len(result) and len(other):
+                result = np.setdiff1d(result, other, assume_unique=True)
+        return result
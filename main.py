@@ -5,14 +5,13 @@ from core.indexer import SemanticIndexer
 from ui.main_window import MainWindow
 
 def main():
-    # 1. 인덱서 초기화
-    # 주의: 실제 Qwen 모델 로드는 시간이 걸리므로 스플래시 스크린이나 
-    # 백그라운드 스레드 처리가 필요할 수 있습니다.
-    indexer = SemanticIndexer()
-    
-    # 2. Qt 앱 실행
+    # 1. Qt 앱 생성
     app = QApplication(sys.argv)
     
+    # 2. 인덱서 초기화
+    # Qwen 모델은 백그라운드 스레드에서 로드되므로 창은 즉시 표시됩니다.
+    indexer = SemanticIndexer()
+    
     # 글로벌 스타일시트 적용
     # 글로벌 스타일시트 적용
     from ui.style_manager import StyleManager
@@ -0,0 +1,114 @@
+import os
+# AhnLab/Banking security OpenSSL Applink crash fix
+os.environ.pop("SSLKEYLOGFILE", None)
+import sys
+import gc
+import time
+import argparse
+import numpy as np
+import psutil
+
+# core 모듈을 import 하기 위해 시스템 경로에 프로젝트 루트 추가
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.embedding.qwen_adapter import QwenEmbeddingAdapter
+from core.embedding.quantized_adapter import QuantizedQwenEmbeddingAdapter
+from core.indexing.chunker import TextChunker
+
+# 폴더를 지정하지 않았을 때 사용하는 샘플 코퍼스
+SAMPLE_TEXTS = [
+    "강아지가 공원에서 공을 가지고 놀고 있다.",
+    "고양이는 햇볕이 드는 창가에서 낮잠을 잔다.",
+    "자동차 엔진 오일은 주기적으로 교체해야 한다.",
+    "The quarterly financial report shows a 12% increase in revenue.",
+    "Python의 리스트 컴프리헨션은 간결한 반복문 작성에 유용하다.",
+    "서울의 겨울은 춥고 건조하며 가끔 눈이 내린다.",
+    "Install the package with pip and restart the application.",
+    "회의록: 다음 분기 마케팅 예산을 20% 증액하기로 결정함.",
+    "Error 0x80070005: Access is denied while writing the file.",
+    "바다 근처의 작은 마을에서 여름 휴가를 보냈다.",
+]
+SAMPLE_QUERIES = ["반려동물", "자동차 정비", "매출 보고서", "권한 오류", "여행"]
+
+def load_corpus(folder, limit):
+    if not folder:
+        return SAMPLE_TEXTS
+    chunker = TextChunker()
+    texts = []
+    for root, _, files in os.walk(folder):
+        for file in files:
+            if os.path.splitext(file)[1].lower() not in ['.txt', '.md']:
+                continue
+            with open(os.path.join(root, file), 'r', encoding='utf-8', errors='ignore') as f:
+                texts.extend(chunker.split_text(f.read()))
+            if len(texts) >= limit:
+                return texts[:limit]
+    return texts
+
+def run_backend(adapter_cls, texts, queries):
+    process = psutil.Process()
+    gc.collect()
+    rss_before = process.memory_info().rss
+
+    adapter = adapter_cls(batch_size=8)
+    start = time.perf_counter()
+    adapter.load_async().result()
+    load_time = time.perf_counter() - start
+    rss_loaded = process.memory_info().rss
+
+    start = time.perf_counter()
+    doc_emb = adapter.encode_text(texts)
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    query_emb = np.concatenate([adapter.encode_text(q) for q in queries])
+    query_time = (time.perf_counter() - start) / len(queries)
+
+    result = {
+        "name": adapter_cls.__name__,
+        "load_s": load_time,
+        "rss_mb": (rss_loaded - rss_before) / (1024 * 1024),
+        "chunks_per_s": len(texts) / encode_time,
+        "query_ms": query_time * 1000,
+        "doc_emb": doc_emb,
+        "query_emb": query_emb,
+    }
+    del adapter
+    gc.collect()
+    return result
+
+def top_k(query_emb, doc_emb, k):
+    doc = doc_emb / np.linalg.norm(doc_emb, axis=1, keepdims=True)
+    q = query_emb / np.linalg.norm(query_emb, axis=1, keepdims=True)
+    return np.argsort(-(q @ doc.T), axis=1)[:, :k]
+
+def main():
+    parser = argparse.ArgumentParser(description="fp32 vs int8 Qwen 임베딩 어댑터 벤치마크")
+    parser.add_argument("--folder", help="txt/md 파일을 읽어 코퍼스로 사용할 폴더 (생략 시 샘플 문장)")
+    parser.add_argument("--limit", type=int, default=200, help="최대 청크 수")
+    parser.add_argument("--k", type=int, default=5, help="recall@k의 k")
+    args = parser.parse_args()
+
+    texts = load_corpus(args.folder, args.limit)
+    queries = SAMPLE_QUERIES
+    k = min(args.k, len(texts))
+    print(f"Corpus: {len(texts)} chunks, {len(queries)} queries")
+
+    base = run_backend(QwenEmbeddingAdapter, texts, queries)
+    quant = run_backend(QuantizedQwenEmbeddingAdapter, texts, queries)
+
+    # fp32 결과를 기준(정답)으로 한 int8 검색 결과의 recall@k
+    base_top = top_k(base["query_emb"], base["doc_emb"], k)
+    quant_top = top_k(quant["query_emb"], quant["doc_emb"], k)
+    recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(base_top, quant_top)])
+    cos = np.sum(base["doc_emb"] * quant["doc_emb"], axis=1) / (
+        np.linalg.norm(base["doc_emb"], axis=1) * np.linalg.norm(quant["doc_emb"], axis=1))
+
+    print(f"\n{'backend':<32}{'load(s)':>10}{'RSS(MB)':>10}{'chunks/s':>10}{'query(ms)':>11}")
+    for r in (base, quant):
+        print(f"{r['name']:<32}{r['load_s']:>10.1f}{r['rss_mb']:>10.0f}{r['chunks_per_s']:>10.2f}{r['query_ms']:>11.1f}")
+    print(f"\nrecall@{k} (int8 vs fp32): {recall:.3f}")
+    print(f"mean cosine(fp32, int8) per chunk: {cos.mean():.4f} (min {cos.min():.4f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+from contextlib import contextmanager
+
+# core 모듈을 import 하기 위해 시스템 경로에 프로젝트 루트 추가
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.database.sqlite_manager import DatabaseManager
+
+class PerCallConnectionDatabaseManager(DatabaseManager):
+    """이전 방식: 호출마다 새 연결 (기본 rollback journal, synchronous=FULL)"""
+    @contextmanager
+    def _get_connection(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+def run(db, files):
+    """파일 하나를 인덱싱할 때의 메타데이터 왕복: 변경 확인 -> upsert -> 기존 벡터 조회 -> ID 발급"""
+    start = time.perf_counter()
+    for i, path in enumerate(files):
+        db.get_file_metadata(path)
+        file_id = db.upsert_file(path, f"2024-01-01 00:00:{i % 60:02d}")
+        db.get_vector_ids(file_id)
+        db.allocate_vector_id(file_id)
+    elapsed = time.perf_counter() - start
+
+    # watchdog 이벤트처럼 조회만 반복
+    start = time.perf_counter()
+    for path in files:
+        db.get_file_metadata(path)
+    lookup = time.perf_counter() - start
+    return elapsed, lookup
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite 연결 방식별 파일 메타데이터 왕복 벤치마크")
+    parser.add_argument("--files", type=int, default=2000, help="파일 수")
+    parser.add_argument("--dir", help="DB를 만들 폴더 (생략 시 임시 폴더, 실제 디스크에서 측정 권장)")
+    args = parser.parse_args()
+
+    files = [os.path.join("bench", f"dir_{i % 50}", f"file_{i}.txt") for i in range(args.files)]
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        print(f"{'mode':<28}{'index(ms/file)':>16}{'lookup(ms/file)':>17}")
+        for name, cls in (("per-call connect", PerCallConnectionDatabaseManager),
+                          ("thread-local + WAL", DatabaseManager)):
+            db = cls(os.path.join(tmp, f"{cls.__name__}.db"))
+            elapsed, lookup = run(db, files)
+            db.close()
+            print(f"{name:<28}{elapsed / len(files) * 1000:>16.3f}{lookup / len(files) * 1000:>17.3f}")
+
+if __name__ == "__main__":
+    main()
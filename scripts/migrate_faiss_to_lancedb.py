@@ -32,27 +32,24 @@ def migrate():
         print("No data in FAISS index to migrate.")
         return
 
-    print("Extracting vectors and IDs from FAISS index...")
-    # Get all vectors from base index
+    print("Extracting IDs from FAISS index...")
     base_index = faiss_db.index.index
-    vectors = np.zeros((ntotal, dimension), dtype=np.float32)
-    for i in range(ntotal):
-        try:
-            vectors[i] = base_index.reconstruct(i)
-        except Exception as e:
-            print(f"Failed to reconstruct vector at index {i}: {e}")
-            
     # Get IDs from id_map
-    vector_ids = faiss.vector_to_array(faiss_db.index.id_map)
-
-    print(f"Extracted {len(vectors)} vectors and {len(vector_ids)} IDs.")
+    vector_ids = faiss.vector_to_array(faiss_db.index.id_map).astype(np.int64)
 
     print(f"Initializing LanceDB at {lancedb_path}...")
     lancedb_manager = LanceDBManager(dimension, lancedb_path)
     
     print("Inserting data into LanceDB...")
-    # LanceDB add_vectors already handles proper list dict format
-    lancedb_manager.add_vectors(vectors, vector_ids)
+    # reconstruct_n으로 연속 float32 버퍼를 한 번에 얻고, add_vectors가 이를 그대로
+    # Arrow FixedSizeListArray로 감싸 기록 (행 단위 Python 변환 없음)
+    # 메모리 사용량을 제한하기 위해 구간 단위로 나누어 추가
+    batch_rows = 50000
+    for start in range(0, ntotal, batch_rows):
+        count = min(batch_rows, ntotal - start)
+        vectors = base_index.reconstruct_n(start, count)
+        lancedb_manager.add_vectors(vectors, vector_ids[start:start + count])
+        print(f"  Inserted {start + count}/{ntotal}")
     
     print("Migration completed successfully!")
     print(f"You can now safely move or delete '{faiss_path}' if desired.")
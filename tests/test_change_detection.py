@@ -0,0 +1,84 @@
+import unittest
+import os
+import tempfile
+from datetime import datetime
+from unittest import mock
+from core.database.sqlite_manager import DatabaseManager
+from core.indexing.scanner import FileScanner
+from tests.test_embedding_scheduler import FakeAdapter
+
+class TestChangeDetection(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, "metadata.db"))
+        self.adapter = FakeAdapter()
+        self.scanner = FileScanner(self.adapter, self.db)
+        self.path = os.path.join(self.tmp.name, "note.txt")
+        self._write("hello world")
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def _write(self, text, mtime_offset=0):
+        with open(self.path, "w") as f:
+            f.write(text)
+        st = os.stat(self.path)
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + mtime_offset))
+
+    def _index(self):
+        self.adapter.calls.clear()
+        self.scanner.process_file(self.path)
+        return len(self.adapter.calls)
+
+    def test_tiered_check(self):
+        self.assertEqual(self._index(), 1)
+        state = self.db.get_file_state(self.path)
+        self.assertEqual(state["mtime_ns"], os.stat(self.path).st_mtime_ns)
+        self.assertEqual(state["size"], len("hello world"))
+        self.assertTrue(state["content_hash"])
+
+        # stat 동일 -> 건너뜀
+        self.assertEqual(self._index(), 0)
+
+        # touch (mtime만 변경) -> 해시 비교 후 stat만 갱신, 모델 호출 없음
+        self._write("hello world", mtime_offset=5_000_000_000)
+        self.assertEqual(self._index(), 0)
+        self.assertEqual(self.db.get_file_state(self.path)["mtime_ns"], os.stat(self.path).st_mtime_ns)
+
+        # 같은 크기, 다른 내용 -> 재인덱싱
+        self._write("hello wxrld", mtime_offset=10_000_000_000)
+        self.assertEqual(self._index(), 1)
+        self.assertNotEqual(self.db.get_file_state(self.path)["content_hash"], state["content_hash"])
+
+    def test_legacy_rows_are_backfilled_without_reindex(self):
+        # stat 컬럼 이전 방식으로 저장된 행 (last_modified만 있음)
+        self.db.upsert_file(self.path, datetime.fromtimestamp(os.path.getmtime(self.path)))
+        self.assertEqual(self._index(), 0)
+        self.assertEqual(self.db.get_file_state(self.path)["size"], len("hello world"))
+        self.assertEqual(self._index(), 0)
+
+    def test_process_files_returns_reindexed_paths(self):
+        self.assertEqual(self.scanner.process_files([self.path]), [self.path])
+        self.assertEqual(self.scanner.process_files([self.path]), [])
+        self._write("hello world", mtime_offset=5_000_000_000) # touch
+        self.assertEqual(self.scanner.process_files([self.path]), [])
+
+    def test_only_embeddable_files_are_hashed(self):
+        video = os.path.join(self.tmp.name, "clip.mp4")
+        with open(video, "wb") as f:
+            f.write(b"\0" * 1024)
+        with mock.patch("core.indexing.fingerprint.content_hash") as hashed:
+            self.scanner.process_file(video)
+        hashed.assert_not_called()
+        self.assertIsNone(self.db.get_file_state(video)["content_hash"])
+
+    def test_unreadable_file_is_registered_without_hash(self):
+        with mock.patch("core.indexing.fingerprint.content_hash", side_effect=PermissionError("locked")):
+            self.scanner.process_file(self.path)
+        state = self.db.get_file_state(self.path)
+        self.assertIsNotNone(state)
+        self.assertIsNone(state["content_hash"])
+
+if __name__ == '__main__':
+    unittest.main()
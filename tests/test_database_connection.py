@@ -0,0 +1,148 @@
+import unittest
+import os
+import tempfile
+import sqlite3
+import threading
+from core.database.sqlite_manager import DatabaseManager
+from core.database.migrations import MIGRATIONS
+
+class TestThreadLocalConnections(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, "metadata.db"))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_connection_is_reused_per_thread(self):
+        with self.db._get_connection() as first:
+            pass
+        with self.db._get_connection() as second:
+            self.assertIs(first, second)
+            self.assertEqual(second.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(second.execute("PRAGMA synchronous").fetchone()[0], 1) # NORMAL
+
+        other = []
+        def worker():
+            with self.db._get_connection() as conn:
+                other.append(conn)
+            self.db.close()
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], first)
+
+    def test_uncommitted_work_is_rolled_back(self):
+        with self.assertRaises(RuntimeError):
+            with self.db._get_connection() as conn:
+                conn.execute("INSERT INTO tags (name) VALUES ('failed')")
+                raise RuntimeError("boom")
+        # 커밋하지 않고 끝난 블록의 변경도 다음 커밋에 섞이지 않음
+        with self.db._get_connection() as conn:
+            conn.execute("INSERT INTO tags (name) VALUES ('forgotten')")
+        self.db.add_tag("kept")
+        self.assertEqual([name for name, _ in self.db.get_all_tags()], ["kept"])
+
+    def test_nested_connection_keeps_outer_transaction(self):
+        self.db.upsert_file("/tmp/a.txt", "t")
+        with self.db._get_connection() as conn:
+            conn.execute("INSERT INTO tags (name) VALUES ('outer')")
+            self.db.add_tag("inner") # 중첩 연결, 커밋 시 바깥 변경도 함께 커밋
+        self.db.link_file_tags("/tmp/a.txt", ["work", "home", "work"])
+        self.assertEqual(sorted(self.db.get_tags_for_file("/tmp/a.txt")), ["home", "work"])
+        self.assertEqual(sorted(name for name, _ in self.db.get_all_tags()), ["home", "inner", "outer", "work"])
+
+class TestTransactionBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, "metadata.db"))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def _count(self, table):
+        with self.db._get_connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_allocate_vector_ids_in_one_statement(self):
+        file_id = self.db.upsert_file("/tmp/a.pdf", "t")
+        first = self.db.allocate_vector_ids(file_id, 200)
+        self.assertEqual(first, list(range(first[0], first[0] + 200)))
+        second = self.db.allocate_vector_ids(file_id, 3)
+        self.assertEqual(second[0], first[-1] + 1)
+        self.assertEqual(self.db.allocate_vector_ids(file_id, 0), [])
+        self.assertEqual(len(self.db.get_vector_ids(file_id)), 203)
+
+    def test_transaction_commits_once(self):
+        with self.db.transaction() as conn:
+            file_id = self.db.upsert_file("/tmp/a.txt", "t")
+            self.db.allocate_vector_ids(file_id, 5)
+            self.db.link_file_tags("/tmp/a.txt", ["work"])
+            self.assertTrue(conn.in_transaction) # 개별 메서드가 커밋하지 않음
+        self.assertFalse(conn.in_transaction)
+        self.assertEqual(self._count("file_vectors"), 5)
+        self.assertEqual(self.db.get_tags_for_file("/tmp/a.txt"), ["work"])
+
+    def test_exception_rolls_back_whole_block(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                file_id = self.db.upsert_file("/tmp/a.txt", "t")
+                self.db.allocate_vector_ids(file_id, 5)
+                raise RuntimeError("boom")
+        self.assertIsNone(self.db.get_file_id("/tmp/a.txt"))
+        self.assertEqual(self._count("file_vectors"), 0)
+
+    def test_nested_failure_rolls_back_only_savepoint(self):
+        with self.db.transaction():
+            for path in ("/tmp/a.txt", "/tmp/bad.txt", "/tmp/c.txt"):
+                try:
+                    with self.db.transaction():
+                        file_id = self.db.upsert_file(path, "t")
+                        self.db.allocate_vector_ids(file_id, 2)
+                        if "bad" in path:
+                            raise ValueError(path)
+                except ValueError:
+                    pass
+        self.assertIsNotNone(self.db.get_file_id("/tmp/a.txt"))
+        self.assertIsNone(self.db.get_file_id("/tmp/bad.txt"))
+        self.assertIsNotNone(self.db.get_file_id("/tmp/c.txt"))
+        self.assertEqual(self._count("file_vectors"), 4)
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "metadata.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _create_at_version(self, version):
+        # 외래 키 검사 이전 버전처럼 만든 DB
+        conn = sqlite3.connect(self.path)
+        for target, _, migrate in MIGRATIONS:
+            if target <= version:
+                migrate(conn.cursor())
+        conn.execute(f"PRAGMA user_version = {version}")
+        conn.commit()
+        return conn
+
+    def test_orphan_vector_rows_do_not_block_autoincrement_migration(self):
+        conn = self._create_at_version(6)
+        conn.execute("INSERT INTO files (id, file_path, file_name) VALUES (1, '/tmp/a.txt', 'a.txt')")
+        conn.executemany("INSERT INTO file_vectors (id, file_id) VALUES (?, ?)", [(1, 1), (2, 1), (5, 99)])
+        conn.commit()
+        conn.close()
+
+        db = DatabaseManager(self.path)
+        try:
+            self.assertEqual(db.get_schema_version(), MIGRATIONS[-1][0])
+            self.assertEqual(db.get_vector_ids(1), [1, 2])
+            # 버린 고아 행의 ID도 다시 발급하지 않음
+            self.assertGreater(db.allocate_vector_ids(1, 1)[0], 5)
+        finally:
+            db.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import os
+import tempfile
+from unittest.mock import MagicMock
+from core.indexer import SemanticIndexer
+from core.database.sqlite_manager import DatabaseManager
+from core.database.directories import directory_key, subtree_upper_bound
+
+class TestDirectoryHierarchy(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, "metadata.db"))
+        self.root = os.path.join(self.tmp.name, "root")
+        self.paths = [
+            os.path.join(self.root, "a.txt"),
+            os.path.join(self.root, "sub", "b.txt"),
+            os.path.join(self.root, "sub", "deep", "c.txt"),
+            os.path.join(self.root + "2", "d.txt"), # 이름이 같은 접두어인 형제 폴더
+        ]
+        for path in self.paths:
+            self.db.upsert_file(path, "t")
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_directory_key(self):
+        key = directory_key(os.path.join(self.root, "sub") + os.sep)
+        self.assertTrue(key.endswith("/sub/"))
+        self.assertEqual(key, directory_key(os.path.join(self.root, "sub")))
+        self.assertTrue(key < key + "x" < subtree_upper_bound(key))
+        self.assertFalse(directory_key(self.root + "2") < subtree_upper_bound(directory_key(self.root)))
+
+    def test_single_directory_files(self):
+        self.db.link_file_tags(self.paths[1], ["work"])
+        files = self.db.get_directory_files_with_tags(os.path.join(self.root, "sub"))
+        self.assertEqual(files, {self.paths[1]: [("work", "#007acc")]})
+        self.assertEqual(self.db.get_directory_files_with_tags(os.path.join(self.root, "missing")), {})
+
+    def test_subtree_lookup_and_delete(self):
+        ids = self.db.get_file_ids_under(self.root)
+        self.assertEqual(sorted(ids), sorted(self.db.get_file_id(p) for p in self.paths[:3]))
+
+        self.assertEqual(self.db.delete_files_under(os.path.join(self.root, "sub")), 2)
+        self.assertIsNone(self.db.get_file_id(self.paths[2]))
+        self.assertIsNotNone(self.db.get_file_id(self.paths[0]))
+        # 삭제된 폴더에 다시 파일이 추가되어도 계층이 재생성됨
+        self.db.upsert_file(self.paths[2], "t")
+        self.assertEqual(list(self.db.get_directory_files_with_tags(os.path.dirname(self.paths[2]))), [self.paths[2]])
+
+    def test_bulk_root_removal(self):
+        indexer = SemanticIndexer.__new__(SemanticIndexer)
+        indexer.db = self.db
+        indexer.vector_db = MagicMock()
+        root_id = self.db.get_or_create_root(self.root)
+        vector_ids = []
+        for path in self.paths:
+            file_id = self.db.get_file_id(path)
+            ids = self.db.allocate_vector_ids(file_id, 3)
+            self.db.add_chunk_texts(ids, ["alpha", "beta", "gamma"])
+            if path.startswith(self.root + os.sep):
+                vector_ids.extend(ids)
+
+        steps = []
+        removed = indexer._remove_indexed_tree(self.root, progress=lambda c, t, m: steps.append((c, t)))
+        self.assertEqual(removed, 3)
+        self.assertEqual(steps[-1], (3, 3))
+        # 벡터는 한 번의 호출로 삭제
+        indexer.vector_db.delete_bulk.assert_called_once()
+        args, kwargs = indexer.vector_db.delete_bulk.call_args
+        self.assertEqual(sorted(args[0]), sorted(vector_ids))
+        self.assertEqual(kwargs["root_ids"], [root_id])
+        # 형제 폴더(root2)는 유지
+        self.assertEqual([p for p in self.paths if self.db.get_file_id(p)], [self.paths[3]])
+        self.assertEqual(len(self.db.search_chunks_fts('"alpha"')), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import os
+import tempfile
+import threading
+import torch
+from unittest.mock import patch
+from PIL import Image
+from core.embedding.qwen_adapter import QwenEmbeddingAdapter
+from core.embedding.quantized_adapter import QuantizedQwenEmbeddingAdapter
+
+class TestEmbeddingBatching(unittest.TestCase):
+    def _make_adapter(self, batch_size=8, max_batch_tokens=8192):
+        # 모델 로드 없이 배치 계획 로직만 검증
+        adapter = QwenEmbeddingAdapter.__new__(QwenEmbeddingAdapter)
+        adapter.batch_size = batch_size
+        adapter.max_batch_tokens = max_batch_tokens
+        return adapter
+
+    def test_plan_batches_respects_batch_size(self):
+        adapter = self._make_adapter(batch_size=3)
+        batches = adapter._plan_batches([10] * 7)
+        self.assertEqual(batches, [(0, 3), (3, 6), (6, 7)])
+
+    def test_plan_batches_shrinks_for_long_chunks(self):
+        adapter = self._make_adapter(batch_size=8, max_batch_tokens=1000)
+        # 짧은 청크는 한 배치로, 긴 청크가 들어오면 패딩 예산 때문에 분리됨
+        batches = adapter._plan_batches([50, 50, 50, 400, 400, 900])
+        self.assertEqual(batches, [(0, 3), (3, 5), (5, 6)])
+
+    def test_plan_batches_oversized_single_item(self):
+        adapter = self._make_adapter(batch_size=8, max_batch_tokens=100)
+        self.assertEqual(adapter._plan_batches([500, 500]), [(0, 1), (1, 2)])
+        self.assertEqual(adapter._plan_batches([]), [])
+
+    def test_pooling_last_right_padding(self):
+        hidden = torch.arange(2 * 4 * 1, dtype=torch.float32).reshape(2, 4, 1)
+        mask = torch.tensor([[1, 1, 1, 1], [1, 1, 0, 0]])
+        pooled = QwenEmbeddingAdapter._pooling_last(hidden, mask)
+        self.assertEqual(pooled[:, 0].tolist(), [3.0, 5.0])
+
+    def test_load_image_downsizes_jpeg(self):
+        adapter = self._make_adapter()
+        adapter.image_max_side = 256
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "large.jpg")
+            Image.new("RGB", (4000, 3000), (200, 100, 50)).save(path, "JPEG")
+            img = adapter._load_image(path)
+            self.assertEqual(img.mode, "RGB")
+            self.assertLessEqual(max(img.size), 256)
+
+class TestLazyModelLoading(unittest.TestCase):
+    def test_constructor_does_not_load_model(self):
+        release = threading.Event()
+        with patch.object(QwenEmbeddingAdapter, '_load_model', side_effect=lambda: release.wait(5)) as load:
+            adapter = QwenEmbeddingAdapter()
+            self.assertFalse(load.called)
+            self.assertEqual(adapter.dimension, 2048) # 모델 없이도 차원 조회 가능
+
+            adapter.load_async()
+            adapter.load_async() # 중복 호출은 무시
+            self.assertFalse(adapter.is_ready())
+
+            release.set()
+            adapter.ready.result(timeout=5)
+            self.assertTrue(adapter.is_ready())
+            self.assertEqual(load.call_count, 1)
+
+    def test_load_failure_is_raised_on_encode(self):
+        with patch.object(QwenEmbeddingAdapter, '_load_model', side_effect=RuntimeError("no model")):
+            adapter = QwenEmbeddingAdapter()
+            with self.assertRaises(RuntimeError):
+                adapter.encode_text("hello")
+            self.assertTrue(adapter.is_ready())
+
+    def test_quantized_adapter_quantizes_linear_layers(self):
+        def fake_load(adapter):
+            adapter.model = torch.nn.Sequential(torch.nn.Linear(16, 16))
+        with patch.object(QwenEmbeddingAdapter, '_load_model', fake_load):
+            adapter = QuantizedQwenEmbeddingAdapter()
+            adapter.load_async().result(timeout=30)
+
+        self.assertEqual(adapter.device, "cpu")
+        self.assertNotEqual(adapter.embedding_id, QwenEmbeddingAdapter().embedding_id)
+        self.assertNotIsInstance(adapter.model[0], torch.nn.Linear)
+        self.assertEqual(adapter.model(torch.randn(2, 16)).shape, (2, 16))
+
+if __name__ == '__main__':
+    unittest.main()
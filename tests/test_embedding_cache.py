@@ -0,0 +1,78 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from core.embedding.cache import EmbeddingCache, QueryEmbeddingLRU
+from core.embedding.scheduler import EmbeddingBatchScheduler
+from tests.test_embedding_scheduler import FakeAdapter
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = EmbeddingCache(os.path.join(self.tmp.name, "embedding_cache.db"), max_entries=10)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip_and_key_scope(self):
+        vec = np.arange(4, dtype=np.float32)
+        self.cache.put_many("model-a", "inst", ["hello"], [vec])
+
+        self.assertTrue(np.array_equal(self.cache.get_many("model-a", "inst", ["hello"])[0], vec))
+        # 모델명이나 instruction이 다르면 다른 항목
+        self.assertIsNone(self.cache.get_many("model-b", "inst", ["hello"])[0])
+        self.assertIsNone(self.cache.get_many("model-a", "other", ["hello"])[0])
+
+    def test_eviction_keeps_recent_entries(self):
+        texts = [f"text-{i}" for i in range(10)]
+        self.cache.put_many("m", "i", texts, np.ones((10, 2), dtype=np.float32))
+        self.cache.get_many("m", "i", ["text-0"]) # 최근 사용 처리
+        self.cache.put_many("m", "i", ["text-new"], np.ones((1, 2), dtype=np.float32))
+
+        self.assertLessEqual(self.cache.count(), 10)
+        self.assertIsNotNone(self.cache.get_many("m", "i", ["text-new"])[0])
+
+    def test_scheduler_skips_cached_and_duplicate_chunks(self):
+        adapter = FakeAdapter()
+        scheduler = EmbeddingBatchScheduler(adapter, cache=self.cache)
+
+        scheduler.submit("a.txt", ["same", "only-a"])
+        scheduler.submit("b.txt", ["same"])
+        first = scheduler.flush()
+        self.assertEqual(sorted(t for call in adapter.calls for t in call), ["only-a", "same"])
+
+        adapter.calls.clear()
+        scheduler.submit("c.txt", ["only-a", "same"])
+        second = scheduler.flush()
+        self.assertEqual(adapter.calls, [])
+        self.assertEqual(second["c.txt"][:, 0].tolist(), [6.0, 4.0])
+        self.assertEqual(first["b.txt"][:, 0].tolist(), [4.0])
+
+    def test_query_lru_reuses_and_persists(self):
+        adapter = FakeAdapter()
+        lru = QueryEmbeddingLRU(capacity=2, persistent=self.cache)
+
+        first = lru.get_or_encode(adapter, "dog")
+        second = lru.get_or_encode(adapter, "dog")
+        self.assertIs(first, second)
+        self.assertEqual(len(adapter.calls), 1)
+        self.assertEqual(first.shape, (1, 1))
+
+        # 새 세션(빈 LRU)에서도 영속 캐시로 재사용
+        adapter.calls.clear()
+        restored = QueryEmbeddingLRU(capacity=2, persistent=self.cache).get_or_encode(adapter, "dog")
+        self.assertEqual(adapter.calls, [])
+        self.assertTrue(np.array_equal(restored, first))
+
+    def test_query_lru_evicts_oldest(self):
+        adapter = FakeAdapter()
+        lru = QueryEmbeddingLRU(capacity=2)
+        for q in ["a", "bb", "a", "ccc"]:
+            lru.get_or_encode(adapter, q)
+        adapter.calls.clear()
+        lru.get_or_encode(adapter, "a")
+        lru.get_or_encode(adapter, "bb")
+        self.assertEqual(adapter.calls, [["bb"]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import numpy as np
+from core.embedding.adapter import EmbeddingAdapter
+from core.embedding.scheduler import EmbeddingBatchScheduler
+
+class FakeAdapter(EmbeddingAdapter):
+    """텍스트 길이를 값으로 갖는 1차원 임베딩을 돌려주는 테스트용 어댑터"""
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+        self.model_name = "fake"
+        self.default_instruction = "inst"
+
+    def count_tokens(self, texts):
+        return [len(t) for t in texts]
+
+    def encode_text(self, texts):
+        if isinstance(texts, str): texts = [texts]
+        self.calls.append(list(texts))
+        if self.fail_on and self.fail_on in texts:
+            raise RuntimeError("encode failed")
+        return np.array([[float(len(t))] for t in texts], dtype=np.float32)
+
+    def encode_image(self, image_path):
+        raise NotImplementedError
+
+    @property
+    def dimension(self):
+        return 1
+
+class TestEmbeddingScheduler(unittest.TestCase):
+    def test_results_follow_file_and_chunk_order(self):
+        adapter = FakeAdapter()
+        scheduler = EmbeddingBatchScheduler(adapter, bucket_bounds=(4, 16))
+        scheduler.submit("a.txt", ["x" * 20, "xx", "x" * 10])
+        scheduler.submit("b.txt", ["xxx", "x" * 12])
+
+        results = scheduler.flush()
+        self.assertEqual(results["a.txt"][:, 0].tolist(), [20.0, 2.0, 10.0])
+        self.assertEqual(results["b.txt"][:, 0].tolist(), [3.0, 12.0])
+        self.assertEqual(scheduler.pending_count(), 0)
+
+    def test_chunks_are_grouped_by_length_bucket(self):
+        adapter = FakeAdapter()
+        scheduler = EmbeddingBatchScheduler(adapter, bucket_bounds=(4, 16))
+        scheduler.submit("a.txt", ["x" * 20, "xx", "x" * 10])
+        scheduler.submit("b.txt", ["xxx", "x" * 12])
+        scheduler.flush()
+
+        # 버킷별 1회 호출, 버킷 내부는 길이순
+        self.assertEqual([[len(t) for t in call] for call in adapter.calls],
+                         [[2, 3], [10, 12], [20]])
+
+    def test_failed_bucket_drops_affected_files(self):
+        adapter = FakeAdapter(fail_on="x" * 20)
+        scheduler = EmbeddingBatchScheduler(adapter, bucket_bounds=(4, 16))
+        scheduler.submit("a.txt", ["x" * 20, "xx"])
+        scheduler.submit("b.txt", ["xxx"])
+
+        results = scheduler.flush()
+        self.assertNotIn("a.txt", results)
+        self.assertEqual(results["b.txt"][:, 0].tolist(), [3.0])
+
+    def test_failed_bucket_is_retried_per_file(self):
+        adapter = FakeAdapter(fail_on="x" * 20)
+        scheduler = EmbeddingBatchScheduler(adapter, bucket_bounds=(4, 16))
+        scheduler.submit("a.txt", ["x" * 20])
+        scheduler.submit("b.txt", ["x" * 18, "xx"])
+
+        # 같은 버킷에 실패 청크가 있어도 b.txt는 단독 재시도로 임베딩됨
+        results = scheduler.flush()
+        self.assertNotIn("a.txt", results)
+        self.assertEqual(results["b.txt"][:, 0].tolist(), [18.0, 2.0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,6 @@
 import unittest
+import tempfile
+import threading
 from unittest.mock import MagicMock, patch
 from core.indexer import SemanticIndexer
 
@@ -9,7 +11,12 @@ class TestIndexerAsync(unittest.TestCase):
     @patch('core.indexer.VectorDBManager')
     @patch('core.indexer.QwenEmbeddingAdapter')
     def test_index_folder_async(self, MockEmbed, MockVec, MockDB, MockScanner, MockInitTagger):
-        indexer = SemanticIndexer()
+        # 실제 data/ 대신 임시 디렉터리 사용 (config.json, embedding_cache.db가 저장소에 생기지 않도록)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        indexer = SemanticIndexer(data_dir=tmp.name)
+        self.addCleanup(setattr, indexer, "running", False) # 워커 스레드 종료
+        self.addCleanup(indexer.embedding_cache.close)
         # Mock Queue Manager
         indexer.queue_manager = MagicMock()
         
@@ -31,5 +38,36 @@ class TestIndexerAsync(unittest.TestCase):
             self.assertEqual(indexer.queue_manager.add_task.call_count, 2)
             indexer.queue_manager.add_task.assert_any_call('/root\\file1.txt', 'update')
 
+    def test_only_reindexed_files_are_tagged(self):
+        indexer = SemanticIndexer.__new__(SemanticIndexer)
+        indexer.db = MagicMock()
+        indexer.tagger = MagicMock()
+        indexer.scanner = MagicMock()
+        indexer.running = True
+        # touched.txt는 내용이 같아 다시 인덱싱되지 않음
+        indexer.scanner.process_files.return_value = ["/docs/changed.txt"]
+        tasks = [MagicMock(path="/docs/changed.txt"), MagicMock(path="/docs/touched.txt")]
+        with patch('os.path.exists', return_value=True):
+            indexer._process_updates(tasks)
+        indexer.scanner.process_files.assert_called_once_with(["/docs/changed.txt", "/docs/touched.txt"])
+        indexer.tagger.generate_tags.assert_called_once_with("/docs/changed.txt", indexer.db.get_tag_names())
+
+    def test_stop_does_not_wait_for_busy_worker(self):
+        indexer = SemanticIndexer.__new__(SemanticIndexer)
+        for name in ("monitor", "maintenance", "vector_db", "db", "embedding_cache", "config"):
+            setattr(indexer, name, MagicMock())
+        indexer.config.get_indexing_config.return_value = {"stop_timeout_sec": 0.1}
+        indexer.running = True
+        # 임베딩/LLM 호출처럼 중단 요청을 확인하지 못하는 작업
+        release = threading.Event()
+        self.addCleanup(release.set)
+        indexer.worker_thread = threading.Thread(target=release.wait, daemon=True)
+        indexer.worker_thread.start()
+
+        indexer.stop()
+        self.assertFalse(indexer.running)
+        self.assertTrue(indexer.worker_thread.is_alive())
+        indexer.vector_db.flush.assert_called_once()
+
 if __name__ == '__main__':
     unittest.main()
@@ -48,5 +48,22 @@ class TestIndexingQueue(unittest.TestCase):
         item2 = qm.get_next_task()
         self.assertIsNone(item2)
 
+    def test_get_next_tasks_batches_updates(self):
+        qm = IndexingQueueManager()
+        qm.add_task("file1.txt", "update")
+        qm.add_task("file2.txt", "update")
+        qm.add_task("file3.txt", "update")
+        qm.add_task("file4.txt", "deleted")
+
+        # delete는 단독으로 먼저 반환
+        tasks = qm.get_next_tasks(10)
+        self.assertEqual([(t.path, t.status) for t in tasks], [("file4.txt", "deleted")])
+
+        tasks = qm.get_next_tasks(2)
+        self.assertEqual([t.path for t in tasks], ["file1.txt", "file2.txt"])
+        tasks = qm.get_next_tasks(2)
+        self.assertEqual([t.path for t in tasks], ["file3.txt"])
+        self.assertEqual(qm.get_next_tasks(2), [])
+
 if __name__ == '__main__':
     unittest.main()
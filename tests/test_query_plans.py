@@ -0,0 +1,125 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+from core.database.sqlite_manager import DatabaseManager
+from core.database.migrations import SCHEMA_VERSION
+
+# 자주 실행되는 쿼리 (sqlite_manager의 해당 메서드와 같은 형태). 인덱스 없이 전체 스캔하면 실패
+HOT_QUERIES = {
+    "get_file_metadata": ("SELECT last_modified FROM files WHERE file_path = ?", ("/a.txt",)),
+    "get_vector_ids": ("SELECT id FROM file_vectors WHERE file_id = ?", (1,)),
+    "delete_file_vectors_cascade": ("DELETE FROM file_vectors WHERE file_id = ?", (1,)),
+    "delete_tag_cascade": ("DELETE FROM file_tags WHERE tag_id = ?", (1,)),
+    "files_by_extension": ("SELECT id FROM files WHERE extension = ?", (".pdf",)),
+    "search_by_tag": ("""
+        SELECT f.file_path FROM files f
+        JOIN file_tags ft ON f.id = ft.file_id
+        JOIN tags t ON ft.tag_id = t.id
+        WHERE t.name = ?
+    """, ("work",)),
+    "get_file_paths_by_ids": ("""
+        SELECT j.value, f.file_path FROM json_each(?) j
+        JOIN files f ON f.id = j.value
+        ORDER BY j.key
+    """, ("[1, 2]",)),
+    "get_tags_for_file": ("""
+        SELECT t.name FROM tags t
+        JOIN file_tags ft ON t.id = ft.tag_id
+        JOIN files f ON f.id = ft.file_id
+        WHERE f.file_path = ?
+    """, ("/a.txt",)),
+    "get_file_paths_by_vector_ids": ("""
+        SELECT fv.id, f.file_path
+        FROM file_vectors fv
+        JOIN files f ON fv.file_id = f.id
+        WHERE fv.id IN (?, ?)
+    """, (1, 2)),
+    "get_directory_files_with_tags": ("""
+        SELECT f.file_path, t.name, t.color
+        FROM directories d
+        JOIN files f ON f.dir_id = d.id
+        LEFT JOIN file_tags ft ON f.id = ft.file_id
+        LEFT JOIN tags t ON ft.tag_id = t.id
+        WHERE d.path_key = ?
+    """, ("/docs/",)),
+    "get_file_ids_under": ("""
+        SELECT f.id FROM directories d
+        JOIN files f ON f.dir_id = d.id
+        WHERE d.path_key >= ? AND d.path_key < ?
+    """, ("/docs/", "/docs0")),
+    "get_vector_ids_under": ("""
+        SELECT fv.id FROM directories d
+        JOIN files f ON f.dir_id = d.id
+        JOIN file_vectors fv ON fv.file_id = f.id
+        WHERE d.path_key >= ? AND d.path_key < ?
+    """, ("/docs/", "/docs0")),
+    "delete_files_under": ("""
+        DELETE FROM files WHERE dir_id IN (
+            SELECT id FROM directories WHERE path_key >= ? AND path_key < ?
+        )
+    """, ("/docs/", "/docs0")),
+    "delete_child_directories_fk": ("SELECT id FROM directories WHERE parent_id = ?", (1,)),
+}
+
+class TestQueryPlans(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, "metadata.db"))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_hot_queries_use_indexes(self):
+        with self.db._get_connection() as conn:
+            for name, (query, params) in HOT_QUERIES.items():
+                plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+                # 가상 테이블(json_each 입력 목록, FTS)은 자체 인덱스로 순회하므로 제외
+                scans = [step for step in plan
+                         if step.startswith("SCAN") and "USING" not in step and "VIRTUAL TABLE" not in step]
+                self.assertEqual(scans, [], f"{name}: {plan}")
+
+    def test_schema_version_recorded(self):
+        self.assertEqual(self.db.get_schema_version(), SCHEMA_VERSION)
+        # 다시 열어도 마이그레이션을 반복하지 않음
+        self.db.close()
+        self.db = DatabaseManager(self.db.db_path)
+        self.assertEqual(self.db.get_schema_version(), SCHEMA_VERSION)
+
+    def test_unversioned_database_is_upgraded(self):
+        # 버전 관리 이전 DB: color 컬럼 없는 tags, 파일명 인덱스 없음
+        path = os.path.join(self.tmp.name, "legacy.db")
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            CREATE TABLE files (id INTEGER PRIMARY KEY AUTOINCREMENT, file_path TEXT UNIQUE NOT NULL,
+                                file_name TEXT NOT NULL, extension TEXT, last_modified TIMESTAMP,
+                                indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+            CREATE TABLE tags (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL,
+                               created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+            INSERT INTO files (file_path, file_name, extension) VALUES ('/docs/report_2024.pdf', 'report_2024.pdf', '.pdf');
+            INSERT INTO tags (name) VALUES ('old');
+        """)
+        conn.close()
+
+        legacy = DatabaseManager(path)
+        try:
+            self.assertEqual(legacy.get_schema_version(), SCHEMA_VERSION)
+            self.assertEqual(legacy.get_all_tags(), [("old", "#007acc")])
+            self.assertEqual(legacy.search_file_names('"report"'), [("/docs/report_2024.pdf", "report_2024.pdf")])
+            # 기존 파일의 폴더 계층 backfill
+            self.assertEqual(list(legacy.get_directory_files_with_tags("/docs")), ["/docs/report_2024.pdf"])
+        finally:
+            legacy.close()
+
+    def test_deleting_file_cascades(self):
+        file_id = self.db.upsert_file("/tmp/a.txt", "t")
+        self.db.allocate_vector_ids(file_id, 3)
+        self.db.link_file_tags("/tmp/a.txt", ["work"])
+        self.db.delete_file("/tmp/a.txt")
+        self.assertEqual(self.db.get_vector_ids(file_id), [])
+        with self.db._get_connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM file_tags").fetchone()[0], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from core.database.sqlite_manager import DatabaseManager
+from core.database.vector_db import VectorDBManager
+from core.indexing.scanner import FileScanner
+from tests.test_embedding_scheduler import FakeAdapter
+
+class ScannerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, "metadata.db"))
+        self.vdb = VectorDBManager(1, os.path.join(self.tmp.name, "lancedb"), index_type=None)
+        self.vdb.on_flush = self.db.mark_vectors_written
+        self.scanner = FileScanner(FakeAdapter(), self.db, self.vdb)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def _vector_rows(self):
+        self.vdb.flush()
+        rows = self.vdb.table.to_arrow().to_pydict()
+        return list(zip(rows["id"], rows["file_id"]))
+
+    def assertVectorsMatchMapping(self):
+        rows = self._vector_rows()
+        ids = [vid for vid, _ in rows]
+        self.assertEqual(len(ids), len(set(ids)), "duplicate vector ids")
+        for vid, file_id in rows:
+            self.assertIn(vid, self.db.get_vector_ids(file_id))
+        return rows
+
+class TestScannerBatch(ScannerTestCase):
+    def test_failed_file_in_batch_leaves_no_vectors(self):
+        paths = [self._write(name, "hello " + name) for name in ("a.txt", "b.txt", "c.txt")]
+        add_chunk_texts = self.db.add_chunk_texts
+        def failing_add_chunk_texts(vector_ids, texts):
+            # Vector ID 발급 후 실패 -> b.txt의 SAVEPOINT만 롤백
+            if "hello b.txt" in texts:
+                raise RuntimeError("boom")
+            add_chunk_texts(vector_ids, texts)
+        self.db.add_chunk_texts = failing_add_chunk_texts
+        self.scanner.process_files(paths)
+
+        self.assertIsNone(self.db.get_file_id(paths[1]))
+        rows = self.assertVectorsMatchMapping()
+        self.assertEqual({file_id for _, file_id in rows},
+                         {self.db.get_file_id(paths[0]), self.db.get_file_id(paths[2])})
+
+        # 롤백된 ID를 다음 파일에 다시 발급하지 않음
+        self.db.add_chunk_texts = add_chunk_texts
+        self.scanner.process_file(paths[1])
+        rows = self.assertVectorsMatchMapping()
+        self.assertEqual(len(rows), 3)
+        self.assertIn(self.db.get_file_id(paths[1]), {file_id for _, file_id in rows})
+
+    def test_file_stays_pending_until_vectors_are_flushed(self):
+        path = self._write("a.txt", "hello")
+        self.scanner.process_file(path)
+        # 버퍼에만 있는 동안 종료되면 다음 실행에서 다시 인덱싱
+        self.assertEqual(self.db.get_pending_vector_files(), [path])
+        self.assertTrue(self.db.get_file_state(path)["vectors_pending"])
+        adapter = self.scanner.embedding_adapter
+        adapter.calls.clear()
+        self.scanner.process_file(path)
+        self.assertEqual(len(adapter.calls), 1)
+
+        self.vdb.flush()
+        self.assertEqual(self.db.get_pending_vector_files(), [])
+        adapter.calls.clear()
+        self.scanner.process_file(path)
+        self.assertEqual(adapter.calls, [])
+
+    def test_failed_embedding_keeps_old_vectors_and_retries(self):
+        path = self._write("a.txt", "hello")
+        self.scanner.process_file(path)
+        self.vdb.flush()
+        old_ids = self.db.get_vector_ids(self.db.get_file_id(path))
+
+        adapter = self.scanner.embedding_adapter
+        adapter.fail_on = "broken"
+        self._write("a.txt", "broken")
+        self.scanner.process_file(path)
+        # 새 stat이 기록되어도 재시도 대상으로 남고 기존 벡터는 유지
+        self.assertEqual(self.db.get_pending_vector_files(), [path])
+        self.assertEqual(self.db.get_vector_ids(self.db.get_file_id(path)), old_ids)
+
+        adapter.fail_on = None
+        adapter.calls.clear()
+        self.scanner.process_file(path)
+        self.assertEqual(adapter.calls, [["broken"]])
+        self.assertNotEqual(self.db.get_vector_ids(self.db.get_file_id(path)), old_ids)
+        self.assertVectorsMatchMapping()
+        self.assertEqual(self.db.get_pending_vector_files(), [])
+
+    def test_stop_request_abandons_batch(self):
+        paths = [self._write(name, "hello " + name) for name in ("a.txt", "b.txt")]
+        adapter = self.scanner.embedding_adapter
+        encode_text = adapter.encode_text
+        def encode_then_stop(texts):
+            # 임베딩 중 종료 요청 -> 배치 전체를 반영하지 않음
+            self.scanner.stop_requested = lambda: True
+            return encode_text(texts)
+        adapter.encode_text = encode_then_stop
+        self.assertEqual(self.scanner.process_files(paths), [])
+        self.assertIsNone(self.db.get_file_id(paths[0]))
+        self.assertEqual(self._vector_rows(), [])
+
+        self.scanner.stop_requested = None
+        adapter.encode_text = encode_text
+        self.assertEqual(len(self.scanner.process_files(paths)), 2)
+
+    def test_deleted_vector_ids_are_not_reused(self):
+        path = self._write("a.txt", "hello")
+        self.scanner.process_file(path)
+        old_ids = self.db.get_vector_ids(self.db.get_file_id(path))
+        self.db.delete_vector_ids(old_ids)
+        new_ids = self.db.allocate_vector_ids(self.db.get_file_id(path), 1)
+        self.assertGreater(new_ids[0], max(old_ids))
+
+class TestScannerChunkTexts(ScannerTestCase):
+    def _fts_paths(self, term):
+        return [row[1] for row in self.db.search_chunks_fts(f'"{term}"')]
+
+    def test_process_files_writes_chunk_texts(self):
+        path = self._write("a.txt", "error code ERR_4021 in parser")
+        self.scanner.process_file(path)
+        self.assertEqual(self._fts_paths("ERR_4021"), [path])
+
+    def test_backfill_for_files_indexed_without_chunk_texts(self):
+        kept = self._write("a.txt", "error code ERR_4021 in parser")
+        changed = self._write("b.txt", "warning W_77")
+        self.scanner.process_files([kept, changed])
+        self.vdb.flush()
+        # chunks_fts 이전에 인덱싱된 DB처럼 청크 텍스트 삭제
+        with self.db._get_connection() as conn:
+            conn.execute("DELETE FROM chunks_fts")
+            conn.commit()
+        self._write("b.txt", "warning W_77 and more")
+        self.assertEqual(self._fts_paths("ERR_4021"), [])
+
+        last_id, reindex = self.scanner.backfill_chunk_texts()
+        self.assertEqual(self._fts_paths("ERR_4021"), [kept])
+        self.assertEqual(reindex, [changed])
+        self.assertIsNone(self.scanner.backfill_chunk_texts(last_id))
+
+class TestScannerVectorMetadata(ScannerTestCase):
+    def test_backfill_legacy_vector_metadata(self):
+        text_path = self._write("a.txt", "alpha")
+        self.scanner.process_file(text_path)
+        self.vdb.flush()
+        # 메타데이터 컬럼 이전에 저장된 행 + 매핑이 없는 잔여 행
+        self.vdb.table.update(values={"file_id": -1, "extension": "", "kind": "", "root_id": -1, "chunk_index": -1})
+        self.vdb.table.add(self.vdb._to_record_batch(np.ones((1, 1), dtype=np.float32), [999]))
+        vdb = VectorDBManager(1, os.path.join(self.tmp.name, "lancedb"), index_type=None)
+        self.scanner.vector_db_manager = vdb
+        self.scanner.root_resolver = lambda path: 7
+        self.assertIn("file_id < 0", vdb.build_filter(extensions=[".txt"]))
+
+        while self.scanner.backfill_vector_metadata(limit=1):
+            pass
+        self.assertEqual(vdb.build_filter(extensions=[".txt"]), "extension IN ('.txt')")
+        rows = vdb.table.to_arrow().to_pydict()
+        file_id = self.db.get_file_id(text_path)
+        self.assertEqual(rows["id"], self.db.get_vector_ids(file_id))
+        self.assertEqual(set(rows["file_id"]), {file_id})
+        self.assertEqual(set(zip(rows["extension"], rows["kind"], rows["root_id"])), {(".txt", "text", 7)})
+        self.assertEqual(rows["chunk_index"], list(range(len(rows["id"]))))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,208 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+from core.config import ConfigManager
+from core.database.sqlite_manager import DatabaseManager
+from core.database.vector_db import VectorDBManager
+from core.indexer import SemanticIndexer
+from core.search.aggregation import aggregate_by_file
+from core.search.fusion import reciprocal_rank_fusion
+from core.search.lexical import looks_like_identifier, build_fts_query
+
+class FixedQueryCache:
+    """검색어와 무관하게 지정된 질의 벡터를 반환 (모델 로드 없이 검색 경로 검증)"""
+    def __init__(self, vector):
+        self.vector = vector
+
+    def get_or_encode(self, adapter, query):
+        return self.vector
+
+class TestSearchOverfetch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "docs")
+        os.makedirs(self.root)
+
+        indexer = SemanticIndexer.__new__(SemanticIndexer)
+        indexer.config = ConfigManager(os.path.join(self.tmp.name, "config.json"))
+        indexer.config.add_folder(self.root)
+        indexer.db = DatabaseManager(os.path.join(self.tmp.name, "metadata.db"))
+        indexer.vector_db = VectorDBManager(16, os.path.join(self.tmp.name, "lancedb"))
+        indexer.embedding = None
+        indexer._root_ids = {}
+        self.indexer = indexer
+
+        # 질의와 가까운 순서대로 file_000 ~ file_099
+        rng = np.random.default_rng(0)
+        self.query = rng.standard_normal((1, 16)).astype(np.float32)
+        self.query /= np.linalg.norm(self.query)
+        ortho = rng.standard_normal(16).astype(np.float32)
+        ortho -= ortho.dot(self.query[0]) * self.query[0]
+        ortho /= np.linalg.norm(ortho)
+        self.paths = []
+        for i in range(100):
+            path = os.path.join(self.root, f"file_{i:03d}.txt")
+            with open(path, "w") as f:
+                f.write("x")
+            angle = 0.01 * (i + 1) # 뒤로 갈수록 질의와 멀어짐
+            vec = (np.cos(angle) * self.query[0] + np.sin(angle) * ortho).astype(np.float32)
+            file_id = indexer.db.upsert_file(path, "t")
+            vid = indexer.db.allocate_vector_id(file_id)
+            indexer.vector_db.add_vectors(vec[np.newaxis, :], [vid], file_id=file_id, extension=".txt",
+                                          kind="text", root_id=indexer._resolve_root_id(path))
+            self.paths.append(path)
+        indexer.query_cache = FixedQueryCache(self.query)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _set_search_config(self, **values):
+        self.indexer.config.config["search"].update(values)
+
+    def test_single_round_when_nothing_is_filtered(self):
+        self._set_search_config(page_size=10)
+        results = self.indexer.search("q")
+        self.assertEqual([r["file_path"] for r in results], self.paths[:10])
+        self.assertEqual(self.indexer.last_search_stats["rounds"], 1)
+
+    def test_widens_top_k_until_page_is_filled(self):
+        self._set_search_config(page_size=10, overfetch_growth=4, time_budget_ms=10000)
+        # 가까운 파일 대부분이 디스크에서 삭제되었지만 인덱스에는 남아 있음
+        for path in self.paths[:60]:
+            os.remove(path)
+        results = self.indexer.search("q")
+        self.assertEqual([r["file_path"] for r in results], self.paths[60:70])
+        self.assertEqual(self.indexer.last_search_stats["rounds"], 3) # 10 -> 40 -> 160
+
+    def test_stops_at_candidate_budget(self):
+        self._set_search_config(page_size=10, overfetch_growth=2, max_candidates=30, time_budget_ms=10000)
+        for path in self.paths[:95]:
+            os.remove(path)
+        results = self.indexer.search("q")
+        self.assertEqual(results, [])
+        self.assertEqual(self.indexer.last_search_stats["top_k"], 30)
+        self.assertFalse(self.indexer.last_search_stats["exhausted"])
+
+    def test_results_are_aggregated_per_file(self):
+        self._set_search_config(page_size=5, aggregation="fused", time_budget_ms=10000)
+        # file_099에 질의와 거의 같은 청크 3개 추가 -> 단일 청크 파일보다 앞으로
+        path = self.paths[99]
+        file_id = self.indexer.db.get_file_id(path)
+        vids = [self.indexer.db.allocate_vector_id(file_id) for _ in range(3)]
+        self.indexer.vector_db.add_vectors(np.repeat(self.query, 3, axis=0), vids, file_id=file_id,
+                                           extension=".txt", kind="text", chunk_indices=[4, 5, 6])
+        results = self.indexer.search("q")
+        self.assertEqual(len({r["file_path"] for r in results}), 5)
+        self.assertEqual(results[0]["file_path"], path)
+        self.assertEqual(len(results[0]["chunks"]), 3) # 원래의 먼 청크는 후보 밖
+        self.assertIn(results[0]["matched_chunk"], [4, 5, 6])
+        self.assertEqual(results[1]["file_path"], self.paths[0])
+
+    def test_tag_filter_uses_file_ids(self):
+        self._set_search_config(page_size=5, time_budget_ms=10000, tag_prefilter_max_files=1)
+        for i in range(0, 100, 10):
+            self.indexer.db.link_file_tags(self.paths[i], ["report"])
+            if i % 20 == 0:
+                self.indexer.db.link_file_tags(self.paths[i], ["draft"])
+        # prefilter 한도(1)를 넘으므로 후처리 필터(파일 ID 이진 탐색)로 거름
+        results = self.indexer.search("q", tags=["report"], tag_logic="AND", exclude_tags=["draft"])
+        self.assertEqual([r["file_path"] for r in results], [self.paths[i] for i in (10, 30, 50, 70, 90)])
+        self.assertEqual(results[0]["tags"], [("report", "#007acc")])
+        # 검색어 없이 태그만
+        paths = self.indexer.search("", tags=["report", "draft"], tag_logic="AND")
+        self.assertEqual([r["file_path"] for r in paths], [self.paths[i] for i in range(0, 100, 20)])
+
+    def test_hybrid_search_fuses_lexical_hits(self):
+        self._set_search_config(page_size=10)
+        # 의미 검색 순위는 최하위지만 키워드가 정확히 일치하는 파일
+        path = self.paths[99]
+        vids = self.indexer.db.get_vector_ids(self.indexer.db.get_file_id(path))
+        self.indexer.db.add_chunk_texts(vids, ["분기 매출 보고서: revenue increased 12%"])
+        results = self.indexer.search("revenue")
+        paths = [r["file_path"] for r in results]
+        self.assertIn(path, paths[:2])
+        self.assertEqual(results[paths.index(path)]["match"], "lexical")
+        self.assertEqual(len(results), 10)
+
+    def test_identifier_query_skips_model(self):
+        class NoModel:
+            def get_or_encode(self, adapter, query):
+                raise AssertionError("embedding should not be computed")
+        self.indexer.query_cache = NoModel()
+        path = self.paths[42]
+        vids = self.indexer.db.get_vector_ids(self.indexer.db.get_file_id(path))
+        self.indexer.db.add_chunk_texts(vids, ["connection failed with ERR_CONN_RESET after retry"])
+
+        results = self.indexer.search("ERR_CONN_RESET")
+        self.assertEqual([r["file_path"] for r in results], [path])
+        self.assertEqual(results[0]["matched_chunk"], 0)
+
+        # 벡터 ID가 정리되면 전문 검색 인덱스에서도 제거
+        self.indexer.db.delete_vector_ids(vids)
+        self.assertEqual(self.indexer.db.search_chunks_fts(build_fts_query("ERR_CONN_RESET")), [])
+
+    def test_filename_search_substring_and_fuzzy(self):
+        report = os.path.join(self.root, "sub", "Quarterly_Report_2024.pdf")
+        os.makedirs(os.path.dirname(report))
+        with open(report, "w") as f:
+            f.write("x")
+        self.indexer.db.upsert_file(report, "t")
+        self.indexer.query_cache = None # 모델 불필요
+
+        results = self.indexer.search("report_20", mode="파일명 검색")
+        self.assertEqual([r["file_path"] for r in results], [report])
+        self.assertEqual(results[0]["match"], "filename")
+
+        # 오타 허용 (Reprot)
+        results = self.indexer.search("quarterly reprot", mode="파일명 검색")
+        self.assertEqual(results[0]["file_path"], report)
+        self.assertEqual(results[0]["match"], "filename_fuzzy")
+
+        # 짧은 검색어와 폴더명(경로) 검색
+        self.assertEqual([r["file_path"] for r in self.indexer.search("99", mode="파일명 검색")], [self.paths[99]])
+        self.assertEqual([r["file_path"] for r in self.indexer.search("sub", mode="파일명 검색")], [report])
+
+        # 삭제 시 인덱스에서도 제거
+        self.indexer.db.delete_file(report)
+        self.assertEqual(self.indexer.search("report_20", mode="파일명 검색"), [])
+
+class TestLexicalHelpers(unittest.TestCase):
+    def test_looks_like_identifier(self):
+        for query in ["ERR_CONN_RESET", "0x80070005", "getUserName", "config.json", "std::vector", "HTTP404"]:
+            self.assertTrue(looks_like_identifier(query), query)
+        for query in ["반려동물 사진", "revenue", "ab", "고양이"]:
+            self.assertFalse(looks_like_identifier(query), query)
+
+    def test_build_fts_query_quotes_terms(self):
+        self.assertEqual(build_fts_query('보고서 "AND" x'), '"보고서"* OR """AND"""* OR "x"*')
+        self.assertEqual(build_fts_query("   "), "")
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], k=60)
+        self.assertEqual(fused[0][0], "c") # 양쪽 모두에 있는 문서가 최상위
+        self.assertAlmostEqual(fused[0][1], 1 / 63 + 1 / 61)
+        self.assertEqual([key for key, _ in fused[1:]], ["a", "b", "d"]) # 동점은 먼저 등장한 순서
+
+class TestAggregation(unittest.TestCase):
+    def setUp(self):
+        self.keys = ["a", "b", "a", "c", "a"]
+        self.scores = [0.9, 0.95, 0.8, 0.5, 0.85]
+
+    def test_max(self):
+        ranked = aggregate_by_file(self.keys, self.scores, method="max")
+        self.assertEqual([key for key, _, _ in ranked], ["b", "a", "c"])
+        self.assertEqual(list(ranked[1][2]), [0, 4, 2]) # 파일 내 청크는 점수순
+
+    def test_top_n_mean_and_fused(self):
+        ranked = dict((key, score) for key, score, _ in aggregate_by_file(self.keys, self.scores, method="mean", top_n=2))
+        self.assertAlmostEqual(ranked["a"], 0.875, places=5)
+        self.assertAlmostEqual(ranked["b"], 0.95, places=5)
+
+        ranked = aggregate_by_file(self.keys, self.scores, method="fused", top_n=3, alpha=0.5)
+        self.assertEqual(ranked[0][0], "a") # 일치 청크가 많은 파일 우대
+        self.assertAlmostEqual(ranked[0][1], 0.5 * 0.9 + 0.5 * (0.9 + 0.85 + 0.8) / 3, places=5)
+        self.assertEqual(aggregate_by_file([], []), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import os
+import tempfile
+import threading
+import numpy as np
+from core.database.sqlite_manager import DatabaseManager
+from core.search.tag_index import TagPostingIndex, contains_sorted
+
+class TestTagPostingIndex(unittest.TestCase):
+    def setUp(self):
+        # tag 1: 짝수, tag 2: 3의 배수, tag 3: 1~5
+        pairs = [(1, i) for i in range(0, 30, 2)] + [(2, i) for i in range(0, 30, 3)] + [(3, i) for i in range(1, 6)]
+        self.index = TagPostingIndex(pairs[::-1])
+
+    def test_boolean_queries(self):
+        self.assertEqual(self.index.query([1, 2]).tolist(), [0, 6, 12, 18, 24])
+        self.assertEqual(self.index.query([2, 3], condition="OR").tolist(), [0, 1, 2, 3, 4, 5, 6, 9, 12, 15, 18, 21, 24, 27])
+        self.assertEqual(self.index.query([1], exclude=[2]).tolist(), [2, 4, 8, 10, 14, 16, 20, 22, 26, 28])
+        self.assertEqual(self.index.query([], exclude=[1, 2], universe=np.arange(10)).tolist(), [1, 5, 7])
+        self.assertEqual(self.index.query([1, 99]).tolist(), [])
+        self.assertEqual(self.index.query([]).tolist(), [])
+
+    def test_incremental_updates(self):
+        self.index.add(3, [7, 3])
+        self.index.remove(1, [0, 2])
+        self.index.drop_files([6])
+        self.assertEqual(self.index.postings(3).tolist(), [1, 2, 3, 4, 5, 7])
+        self.assertEqual(self.index.query([1, 2]).tolist(), [12, 18, 24])
+        self.index.drop_tag(2)
+        self.assertEqual(self.index.query([1, 2]).tolist(), [])
+        self.assertTrue(contains_sorted(self.index.postings(1), 28))
+        self.assertFalse(contains_sorted(self.index.postings(1), 29))
+
+class TestTagPostingMaintenance(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, "metadata.db"))
+        self.paths = [f"/docs/sub{i % 2}/file{i}.txt" for i in range(6)]
+        for i, path in enumerate(self.paths):
+            self.db.upsert_file(path, "t")
+            self.db.link_file_tags(path, ["all"] + (["even"] if i % 2 == 0 else []))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def _assert_matches_rebuild(self):
+        fresh = DatabaseManager(self.db.db_path)
+        try:
+            for tags, condition in ((["all"], "AND"), (["all", "even"], "AND"), (["even", "work"], "OR")):
+                self.assertEqual(self.db.get_file_ids_by_tags(tags, condition).tolist(),
+                                 fresh.get_file_ids_by_tags(tags, condition).tolist())
+        finally:
+            fresh.close()
+
+    def test_writes_update_postings(self):
+        self.assertEqual(self.db.search_by_tags(["all", "even"]), self.paths[0::2])
+        self.assertEqual(self.db.search_by_tags(["all"], condition="AND"), self.paths)
+        self.assertEqual(self.db.search_by_tags(["all", "missing"]), [])
+
+        self.db.update_file_tags(self.paths[0], ["work"])
+        self.db.link_file_tags(self.paths[1], ["even"])
+        self.db.delete_file(self.paths[2])
+        self.db.delete_files_under("/docs/sub1") # 1, 3, 5
+        self._assert_matches_rebuild()
+        self.assertEqual(self.db.search_by_tags(["even"]), [self.paths[4]])
+
+        self.db.delete_tag("even")
+        self.assertEqual(self.db.search_by_tags(["even", "work"], condition="OR"), [self.paths[0]])
+        self.assertEqual(self.db.search_by_tags(["all"]), [self.paths[4]])
+        self._assert_matches_rebuild()
+
+    def test_concurrent_link_during_rebuild_is_not_lost(self):
+        fresh = DatabaseManager(self.db.db_path)
+        fresh.get_tag_names() # 카탈로그만 로드, 태그 필터 엔진은 아직 없음
+        self.db.upsert_file("/docs/new.txt", "t")
+        original = fresh._connections.in_transaction_block
+        main = threading.get_ident()
+        interleaved = []
+        def link_from_other_thread():
+            fresh.link_file_tags("/docs/new.txt", ["all"])
+            fresh.close()
+        def hooked():
+            # file_tags를 읽은 뒤 캐시에 저장하기 직전에 다른 스레드가 태그 연결
+            if not interleaved and threading.get_ident() == main:
+                interleaved.append(True)
+                thread = threading.Thread(target=link_from_other_thread)
+                thread.start()
+                thread.join()
+            return original()
+        fresh._connections.in_transaction_block = hooked
+        try:
+            fresh.search_by_tags(["all"])
+            self.assertTrue(interleaved)
+            self.assertEqual(fresh.search_by_tags(["all"]), self.paths + ["/docs/new.txt"])
+        finally:
+            fresh.close()
+
+    def test_not_without_include_uses_all_files(self):
+        ids = self.db.get_file_ids_by_tags([], exclude_tags=["even"])
+        self.assertEqual(self.db.get_file_paths_by_ids(ids), self.paths[1::2])
+
+if __name__ == '__main__':
+    unittest.main()
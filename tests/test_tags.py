@@ -1,6 +1,8 @@
 import unittest
 import os
 import sqlite3
+import tempfile
+import threading
 from core.database.sqlite_manager import DatabaseManager
 
 class TestTagManager(unittest.TestCase):
@@ -11,6 +13,7 @@ class TestTagManager(unittest.TestCase):
         self.db = DatabaseManager(self.test_db)
 
     def tearDown(self):
+        self.db.close()
         if os.path.exists(self.test_db):
             try:
                 os.remove(self.test_db)
@@ -71,5 +74,88 @@ class TestTagManager(unittest.TestCase):
         self.assertIn("NewName", tags)
         self.assertNotIn("OldName", tags)
 
+class TestTagCatalogCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, "metadata.db"))
+        self.db.upsert_file("/tmp/a.txt", "t")
+        self.db.link_file_tags("/tmp/a.txt", ["work", "home"])
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def _trace(self):
+        statements = []
+        with self.db._get_connection() as conn:
+            conn.set_trace_callback(statements.append)
+        return statements
+
+    def test_hot_path_does_not_query_tags_table(self):
+        self.db.get_all_tags() # warm
+        statements = self._trace()
+        self.assertEqual(sorted(self.db.get_tag_names()), ["home", "work"])
+        self.assertEqual(self.db.add_tag("work"), self.db.add_tag("work"))
+        self.db.link_file_tags("/tmp/a.txt", ["work"])
+        self.assertEqual(sorted(self.db.get_tags_for_files(["/tmp/a.txt"])["/tmp/a.txt"]),
+                         [("home", "#007acc"), ("work", "#007acc")])
+        self.assertFalse([sql for sql in statements if "tags " in sql.replace("file_tags", "")], statements)
+
+    def test_write_through(self):
+        self.db.get_all_tags()
+        self.db.update_tag_color("work", "#ff0000")
+        self.assertTrue(self.db.rename_tag("home", "house"))
+        self.assertFalse(self.db.rename_tag("house", "work")) # 중복 이름
+        self.db.add_tag("new", color="#00ff00")
+        self.db.delete_tag("new")
+        expected = [("work", "#ff0000"), ("house", "#007acc")]
+        self.assertEqual(self.db.get_all_tags(), expected)
+        self.assertEqual(sorted(self.db.get_tags_for_files(["/tmp/a.txt"])["/tmp/a.txt"]), sorted(expected))
+        # 새 연결(캐시 없음)에서 읽어도 같은 결과
+        fresh = DatabaseManager(self.db.db_path)
+        self.assertEqual(fresh.get_all_tags(), expected)
+        fresh.close()
+
+    def test_rolled_back_tags_are_not_cached(self):
+        self.db.get_all_tags()
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.add_tag("temp")
+                raise RuntimeError("boom")
+        self.assertEqual(sorted(self.db.get_tag_names()), ["home", "work"])
+
+    def test_tag_added_during_load_is_not_lost(self):
+        fresh = DatabaseManager(self.db.db_path)
+        original = fresh._connections.in_transaction_block
+        main = threading.get_ident()
+        interleaved = []
+        def add_from_other_thread():
+            fresh.add_tag("late")
+            fresh.close()
+        def hooked():
+            # tags를 읽은 뒤 캐시에 저장하기 직전에 다른 스레드가 태그 추가
+            if not interleaved and threading.get_ident() == main:
+                interleaved.append(True)
+                thread = threading.Thread(target=add_from_other_thread)
+                thread.start()
+                thread.join()
+            return original()
+        fresh._connections.in_transaction_block = hooked
+        try:
+            fresh.get_tag_names()
+            self.assertTrue(interleaved)
+            self.assertEqual(sorted(fresh.get_tag_names()), ["home", "late", "work"])
+        finally:
+            fresh.close()
+
+    def test_unknown_tag_id_reloads_catalog(self):
+        self.db.get_all_tags()
+        # 다른 연결이 만든 태그는 이 캐시에 없음
+        other = DatabaseManager(self.db.db_path)
+        other.link_file_tags("/tmp/a.txt", ["late"])
+        other.close()
+        tags = self.db.get_tags_for_files(["/tmp/a.txt"])["/tmp/a.txt"]
+        self.assertIn(("late", "#007acc"), tags)
+
 if __name__ == '__main__':
     unittest.main()
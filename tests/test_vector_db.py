@@ -0,0 +1,266 @@
+import unittest
+import tempfile
+import threading
+import numpy as np
+import lancedb
+import pyarrow as pa
+from datetime import timedelta
+from core.database.vector_db import VectorDBManager, VectorSchemaMismatchError
+from core.database.maintenance import VectorMaintenanceScheduler
+from core.indexing.queue_manager import IndexingQueueManager
+
+class TestVectorDB(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = self.tmp.name
+        rng = np.random.default_rng(0)
+        self.vectors = rng.standard_normal((20, 16)).astype(np.float32)
+        self.ids = list(range(1, 21))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_add_and_search_full_dimension(self):
+        vdb = VectorDBManager(16, self.path)
+        vdb.add_vectors(self.vectors, self.ids)
+        results = vdb.search(self.vectors[3:4], top_k=5)
+        self.assertEqual(results[0]["vector_id"], 4)
+        self.assertAlmostEqual(results[0]["distance"], 1.0, places=4)
+        self.assertEqual(len(results), 5)
+
+    def test_truncated_storage_with_rerank(self):
+        vdb = VectorDBManager(16, self.path, store_dimension=8, keep_full_vectors=True)
+        vdb.add_vectors(self.vectors, self.ids)
+        self.assertEqual(vdb.table.schema.field("vector").type.list_size, 8)
+
+        results = vdb.search(self.vectors[7:8], top_k=3)
+        self.assertEqual(results[0]["vector_id"], 8)
+        # rerank 점수는 전체 차원 코사인
+        self.assertAlmostEqual(results[0]["distance"], 1.0, places=4)
+
+    def test_dimension_mismatch_is_detected(self):
+        VectorDBManager(16, self.path, store_dimension=8)
+        with self.assertRaises(VectorSchemaMismatchError):
+            VectorDBManager(16, self.path)
+        with self.assertRaises(VectorSchemaMismatchError):
+            VectorDBManager(32, self.path, store_dimension=8)
+        # 같은 설정으로는 다시 열 수 있음
+        VectorDBManager(16, self.path, store_dimension=8)
+
+    def test_write_behind_buffer_batches_changes(self):
+        vdb = VectorDBManager(16, self.path, flush_rows=1000, flush_interval=3600)
+        version = vdb.table.version
+        for i in range(0, 20, 5):
+            vdb.add_vectors(self.vectors[i:i + 5], self.ids[i:i + 5])
+        vdb.delete_vectors_by_ids([1, 2])
+        # 아직 기록 전
+        self.assertEqual(vdb.table.count_rows(), 0)
+        self.assertEqual(vdb.table.version, version)
+
+        vdb.flush()
+        self.assertEqual(vdb.table.count_rows(), 18)
+        # 조건식 delete 1번 + append 1번 (삭제분은 pending add에서 먼저 제거되고, 기록된 행용 조건만 남음)
+        self.assertEqual(vdb.table.version, version + 2)
+
+        vdb.delete_vectors_by_ids([3, 4])
+        vdb.add_vectors(self.vectors[:1], [3]) # 재사용 ID
+        results = vdb.search(self.vectors[0:1], top_k=1) # 검색 전 자동 flush
+        self.assertEqual(results[0]["vector_id"], 3)
+        self.assertEqual(vdb.table.count_rows(), 17)
+
+    def test_search_does_not_wait_for_large_buffer_or_lock(self):
+        vdb = VectorDBManager(16, self.path, flush_rows=1000, flush_interval=3600, search_flush_rows=4)
+        vdb.add_vectors(self.vectors[:10], self.ids[:10])
+        vdb.flush()
+        vdb.add_vectors(self.vectors[10:], self.ids[10:])
+        vdb.delete_vectors_by_ids([4])
+        version = vdb.table.version
+        # 버퍼가 크면 기록하지 않고, 삭제 예정 ID만 결과에서 제외
+        results = vdb.search(self.vectors[3:4], top_k=5)
+        self.assertEqual(vdb.table.version, version)
+        self.assertNotIn(4, [r["vector_id"] for r in results])
+        self.assertEqual(len(results), 5)
+
+        vdb.flush()
+        vdb.delete_vectors_by_ids([5])
+        held = threading.Event()
+        release = threading.Event()
+        def hold_lock():
+            with vdb.lock:
+                held.set()
+                release.wait()
+        worker = threading.Thread(target=hold_lock)
+        worker.start()
+        held.wait()
+        try:
+            # 인덱서가 잠금을 쥐고 있어도 기다리지 않음
+            results = vdb.search(self.vectors[4:5], top_k=3)
+            self.assertNotIn(5, [r["vector_id"] for r in results])
+        finally:
+            release.set()
+            worker.join()
+        # 잠금이 비어 있고 버퍼가 작으면 검색 전에 기록
+        vdb.search(self.vectors[4:5], top_k=3)
+        self.assertEqual(vdb.table.count_rows(), 18)
+
+    def test_flush_on_row_threshold(self):
+        vdb = VectorDBManager(16, self.path, flush_rows=10, flush_interval=3600)
+        vdb.add_vectors(self.vectors[:6], self.ids[:6])
+        self.assertEqual(vdb.table.count_rows(), 0)
+        vdb.add_vectors(self.vectors[6:12], self.ids[6:12])
+        self.assertEqual(vdb.table.count_rows(), 12)
+
+    def test_index_is_built_after_row_threshold(self):
+        rng = np.random.default_rng(1)
+        vectors = rng.standard_normal((600, 16)).astype(np.float32)
+        vdb = VectorDBManager(16, self.path, index_min_rows=500, nprobes=8, refine_factor=5)
+        vdb.add_vectors(vectors[:400], list(range(400)))
+        vdb.flush()
+        self.assertIsNone(vdb._index_thread)
+
+        vdb.add_vectors(vectors[400:], list(range(400, 600)))
+        vdb.flush()
+        vdb._index_thread.join(timeout=60)
+        self.assertIsNotNone(vdb._get_vector_index())
+        self.assertEqual(vdb._indexed_rows, 600)
+
+        stats = vdb.measure_recall(sample_size=5, k=5)
+        self.assertEqual(stats["queries"], 5)
+        self.assertGreater(stats["recall"], 0.0)
+
+class TestVectorPrefilter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(3)
+        self.vectors = rng.standard_normal((100, 16)).astype(np.float32)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_prefilter_returns_full_page(self):
+        vdb = VectorDBManager(16, self.tmp.name)
+        # 파일 100개 중 5개만 PDF
+        for i in range(100):
+            ext, kind = (".pdf", "text") if i % 20 == 0 else (".jpg", "image")
+            vdb.add_vectors(self.vectors[i:i + 1], [i + 1], file_id=i + 1, extension=ext, kind=kind, root_id=1)
+
+        where = vdb.build_filter(extensions=[".pdf"], root_ids=[1])
+        self.assertNotIn("file_id < 0", where)
+        results = vdb.search(self.vectors[50:51], top_k=5, where=where)
+        self.assertEqual(sorted(r["file_id"] for r in results), [1, 21, 41, 61, 81])
+
+        results = vdb.search(self.vectors[50:51], top_k=3, where=vdb.build_filter(kinds=["image"]))
+        self.assertEqual(results[0]["file_id"], 51)
+        self.assertEqual(vdb.search(self.vectors[:1], where=vdb.build_filter(file_ids=[])), [])
+        self.assertIsNone(vdb.build_filter())
+
+    def test_bulk_delete_uses_root_predicate(self):
+        vdb = VectorDBManager(16, self.tmp.name, flush_rows=1000, flush_interval=3600)
+        for i in range(100):
+            vdb.add_vectors(self.vectors[i:i + 1], [i + 1], file_id=i + 1, root_id=1 if i < 60 else 2)
+        self.assertIsNone(vdb.delete_bulk([], root_ids=[1]))
+        # 버퍼에 있던 행까지 한 번에 삭제
+        self.assertEqual(vdb.delete_bulk(list(range(1, 61)), root_ids=[1]), "root")
+        self.assertEqual(vdb.table.count_rows(), 40)
+
+        # 루트 정보 없이 저장된 행이 섞이면 ID 목록으로 삭제
+        vdb.add_vectors(self.vectors[:1], [200], file_id=200)
+        self.assertEqual(vdb.delete_bulk(list(range(61, 81)) + [200], root_ids=[2]), "ids")
+        self.assertEqual(sorted(r["id"] for r in vdb.table.search().select(["id"]).limit(100).to_list()),
+                         list(range(81, 101)))
+
+    def test_legacy_table_gets_metadata_columns(self):
+        # 메타데이터 컬럼이 없던 이전 스키마의 테이블
+        schema = pa.schema([pa.field("id", pa.int64()), pa.field("vector", pa.list_(pa.float32(), 16))])
+        table = lancedb.connect(self.tmp.name).create_table("vectors", schema=schema)
+        table.add(pa.table({"id": [1, 2], "vector": [self.vectors[0].tolist(), self.vectors[1].tolist()]}))
+
+        vdb = VectorDBManager(16, self.tmp.name)
+        self.assertIn("root_id", vdb.table.schema.names)
+        vdb.add_vectors(self.vectors[2:3], [3], file_id=3, extension=".txt", kind="text", root_id=1)
+
+        # 기존 행은 prefilter를 통과시켜 후처리 필터에 맡김
+        where = vdb.build_filter(extensions=[".txt"])
+        results = vdb.search(self.vectors[0:1], top_k=10, where=where)
+        self.assertEqual(sorted(r["vector_id"] for r in results), [1, 2, 3])
+        self.assertEqual({r["file_id"] for r in results}, {-1, 3})
+
+class TestVectorMaintenance(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.vdb = VectorDBManager(16, self.tmp.name, flush_rows=1, index_type=None)
+        rng = np.random.default_rng(2)
+        # 파일 단위로 기록된 것처럼 작은 fragment와 버전을 다수 생성
+        for i in range(12):
+            self.vdb.add_vectors(rng.standard_normal((3, 16)).astype(np.float32), [i * 3, i * 3 + 1, i * 3 + 2])
+        self.vdb.delete_vectors_by_ids([0, 1])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_compact_merges_fragments_and_prunes_versions(self):
+        before = self.vdb.get_storage_stats()
+        self.assertGreaterEqual(before["small_fragments"], 8)
+        self.assertTrue(self.vdb.needs_compaction(min_small_fragments=8, min_versions=100))
+
+        result = self.vdb.compact(cleanup_older_than=timedelta(0))
+        self.assertEqual(result["after"]["fragments"], 1)
+        self.assertLess(result["after"]["versions"], before["versions"])
+        self.assertGreater(result["reclaimed_bytes"], 0)
+        self.assertEqual(self.vdb.table.count_rows(), 34)
+        self.assertFalse(self.vdb.needs_compaction(min_small_fragments=8, min_versions=100))
+
+    def test_compact_merges_bounded_subset_per_run(self):
+        fragments = [self.vdb.get_storage_stats()["fragments"]]
+        for _ in range(10):
+            result = self.vdb.compact(cleanup_older_than=timedelta(0), max_fragments=4)
+            fragments.append(result["after"]["fragments"])
+            if not result["partial"]:
+                break
+        # 한 번에 최대 4개만 합치므로 여러 번에 걸쳐 줄어들고, 마지막에 전체 optimize
+        self.assertFalse(result["partial"])
+        self.assertGreater(len(fragments), 3)
+        for prev, cur in zip(fragments, fragments[1:-1]):
+            self.assertGreaterEqual(cur, prev - 3)
+            self.assertLess(cur, prev)
+        self.assertEqual(fragments[-1], 1)
+        self.assertEqual(self.vdb.table.count_rows(), 34)
+        self.assertEqual(len(self.vdb.search(np.ones((1, 16), dtype=np.float32), top_k=50)), 34)
+
+    def test_scheduler_resumes_partial_compaction(self):
+        queue = IndexingQueueManager()
+        scheduler = VectorMaintenanceScheduler(self.vdb, queue, idle_seconds=0, min_interval=3600,
+                                               cleanup_older_than=0, max_fragments=4)
+        fragments = self.vdb.get_storage_stats()["fragments"]
+        now = 0
+        while True:
+            result = scheduler.tick(now=now)
+            self.assertIsNotNone(result) # 남은 작업이 있으면 min_interval 전에도 이어서 실행
+            self.assertLess(result["after"]["fragments"], fragments)
+            fragments = result["after"]["fragments"]
+            now += 1
+            if not result["partial"]:
+                break
+        self.assertEqual(fragments, 1)
+        self.assertIsNone(scheduler.tick(now=now))
+
+    def test_scheduler_runs_only_when_idle(self):
+        queue = IndexingQueueManager()
+        scheduler = VectorMaintenanceScheduler(self.vdb, queue, idle_seconds=10, min_interval=100,
+                                               min_small_fragments=8, cleanup_older_than=0)
+        queue.add_task("/tmp/a.txt", "update")
+        self.assertIsNone(scheduler.tick(now=0))
+        self.assertIsNone(scheduler.tick(now=50))
+        queue.get_next_tasks(10)
+
+        self.assertIsNone(scheduler.tick(now=60)) # 유휴 시작
+        self.assertIsNone(scheduler.tick(now=65))
+        result = scheduler.tick(now=71)
+        self.assertIsNotNone(result)
+        self.assertEqual(result["after"]["fragments"], 1)
+        # 최소 실행 간격 내에는 다시 실행하지 않음
+        self.assertIsNone(scheduler.tick(now=120))
+        self.assertEqual(scheduler.last_run, 71)
+
+if __name__ == '__main__':
+    unittest.main()
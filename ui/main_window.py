@@ -4,7 +4,7 @@ from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QComboBox, QScrollArea, QFrame, QSplitter, QApplication)
 from PySide6.QtCore import Qt, QSize, QUrl, QTimer
 from PySide6.QtGui import QFont, QAction, QDesktopServices, QIcon, QPixmap
-from ui.workers import IndexingWorker
+from ui.workers import IndexingWorker, FolderRemovalWorker
 from ui.settings_dialog import SettingsDialog
 from ui.components.result_item import FileResultWidget
 from ui.components.detail_pane import DetailPane
@@ -46,10 +46,14 @@ class MainWindow(QMainWindow):
         self.completer = None
         self.tag_colors = {} # Initialize tag_colors dictionary
         self.worker = None
+        self.removal_worker = None
+        self.pending_removals = [] # 삭제 작업 진행 중 요청된 경로 (끝나면 이어서 실행)
         self.view_mode = "list"
         self.selected_item = None # Currently selected FileResultWidget
         self.current_context = "search"
         self.current_directory = None
+        self.search_pending = False # 모델 로딩 중 요청된 의미 검색
+        self.model_loading = not self.indexer.is_model_ready()
 
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -83,7 +87,7 @@ class MainWindow(QMainWindow):
         search_layout = QHBoxLayout()
         
         self.search_mode = QComboBox()
-        self.search_mode.addItems(["통합 검색", "텍스트 검색", "이미지 검색"])
+        self.search_mode.addItems(["통합 검색", "텍스트 검색", "이미지 검색", "파일명 검색"])
         self.search_mode.setFixedWidth(120)
         
         self.search_input = QLineEdit()
@@ -245,7 +249,7 @@ class MainWindow(QMainWindow):
         self.progress_bar.setFixedWidth(200) # Fixed width
         status_layout.addWidget(self.progress_bar)
         
-        self.status_label = QLabel("준비 완료")
+        self.status_label = QLabel("임베딩 모델 로딩 중..." if self.model_loading else "준비 완료")
         self.status_label.setObjectName("statusLabel")
         status_layout.addWidget(self.status_label)
         
@@ -277,6 +281,15 @@ class MainWindow(QMainWindow):
             size = self.indexer.queue_manager.get_queue_size()
             self.queue_btn.set_badge_count(size)
 
+        # 백그라운드 모델 로드 완료 확인
+        if self.model_loading and self.indexer.is_model_ready():
+            self.model_loading = False
+            if self.search_pending:
+                self.search_pending = False
+                self.perform_search()
+            elif self.status_label.text() == "임베딩 모델 로딩 중...":
+                self.status_label.setText("준비 완료")
+
     def show_queue_status(self):
         from ui.queue_dialog import QueueStatusDialog
         dlg = QueueStatusDialog(self.indexer.queue_manager, self)
@@ -298,7 +311,14 @@ class MainWindow(QMainWindow):
         if not query and not tags:
             return
         
+        # 의미 검색은 모델이 준비될 때까지 보류 (태그/파일명/식별자 검색은 즉시 수행)
         mode = self.search_mode.currentText()
+        if (query and mode != "파일명 검색" and not self.indexer.is_model_ready()
+                and not self.indexer.is_lexical_query(query)):
+            self.search_pending = True
+            self.status_label.setText(f"임베딩 모델 로딩 중... 완료 후 검색합니다: {query}")
+            return
+        
         exts = [e.strip().lower() for e in self.ext_filter.text().split(",") if e.strip()]
         
         if query:
@@ -341,6 +361,16 @@ class MainWindow(QMainWindow):
             path = res['file_path']
             tags = res.get('tags', [])
             widget = FileResultWidget(path, view_mode=self.view_mode, tags=tags)
+            # 의미/전문 검색 결과: 가장 잘 일치한 청크와 일치 청크 수 표시
+            if res.get('chunks') and res.get('matched_chunk') is not None and res['matched_chunk'] >= 0:
+                if res.get('match') == "lexical":
+                    score_text = f"키워드 일치 {res['lexical_score']:.2f}"
+                else:
+                    score_text = f"유사도 {res['distance']:.3f}"
+                    if res.get('match') == "hybrid":
+                        score_text += " + 키워드 일치"
+                widget.setToolTip(f"{score_text} · 가장 일치하는 청크 #{res['matched_chunk'] + 1} "
+                                  f"(일치 청크 {len(res['chunks'])}개)")
             widget.clicked.connect(self.on_file_clicked)
             widget.double_clicked.connect(self.on_file_double_clicked)
             widget.manage_tags_requested.connect(self.open_file_tag_dialog)
@@ -486,6 +516,7 @@ class MainWindow(QMainWindow):
 
     def show_settings(self):
         dialog = SettingsDialog(self.indexer, self)
+        dialog.folder_removal_requested.connect(self.start_folder_removal)
         dialog.exec()
         # 설정 창이 닫힌 후 태그 정보(색상 등)가 변경되었을 수 있으므로 갱신
         self.refresh_tag_completer()
@@ -559,39 +590,13 @@ class MainWindow(QMainWindow):
                 disk_files = [e for e in entries if e.is_file()]
                 
             # 2. Build tag/status map from DB
-            # We use LIKE queries to cover both forward and backward slash variants in DB
+            # directories 테이블의 dir_id 인덱스로 이 폴더의 파일만 조회 (구분자/대소문자는 path_key로 정규화)
             db_map = {} # normcase_path -> tags list
-            
-            # Prepare prefixes
-            # Ensure trailing slash to match only children/descendants (though we filter later)
-            path_win = path.rstrip(os.sep) + os.sep
-            path_unix = path.replace('\\', '/').rstrip('/') + '/'
-            
-            # Query
-            query = """
-                SELECT f.file_path, t.name, t.color 
-                FROM files f
-                LEFT JOIN file_tags ft ON f.id = ft.file_id
-                LEFT JOIN tags t ON ft.tag_id = t.id
-                WHERE f.file_path LIKE ? OR f.file_path LIKE ?
-            """
-            
-            with self.indexer.db._get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, (f"{path_win}%", f"{path_unix}%"))
-                rows = cursor.fetchall()
-                
-                # Process DB results
-                for f_path, t_name, t_color in rows:
-                    # Normalize DB path to compare with Disk path
-                    # normcase handles case-insensitivity on Windows and slash normalization
-                    norm_path = os.path.normcase(os.path.normpath(f_path))
-                    
-                    if norm_path not in db_map:
-                        db_map[norm_path] = {'tags': [], 'registered': True}
-                    
-                    if t_name: # If tag exists
-                        db_map[norm_path]['tags'].append((t_name, t_color))
+            for f_path, tags in self.indexer.db.get_directory_files_with_tags(path).items():
+                # Normalize DB path to compare with Disk path
+                # normcase handles case-insensitivity on Windows and slash normalization
+                norm_path = os.path.normcase(os.path.normpath(f_path))
+                db_map[norm_path] = {'tags': tags, 'registered': True}
 
             # 3. Create Widgets
             for entry in disk_files:
@@ -636,10 +641,45 @@ class MainWindow(QMainWindow):
             if reply != QMessageBox.Yes:
                 return
                 
-            self.indexer.remove_from_monitoring(path)
-            self.status_label.setText(f"모니터링 해제됨: {path}")
-            # QMessageBox.information(self, "모니터링 해제", f"'{path}' 경로가 모니터링에서 해제되었습니다.")
+            # 루트 폴더는 인덱스 데이터 삭제에 시간이 걸리므로 백그라운드에서 처리 (완료 시 화면 갱신)
+            self.start_folder_removal([path])
+            return
+
+        self.refresh_current_view()
+
+    def start_folder_removal(self, paths):
+        if self.removal_worker and self.removal_worker.isRunning():
+            # 실행 중인 QThread 참조를 덮어쓰면 스레드가 실행 중에 파괴되므로 끝난 뒤 이어서 실행
+            self.pending_removals.extend(p for p in paths if p not in self.pending_removals)
+            self.status_label.setText(f"모니터링 해제 대기 중 ({len(self.pending_removals)}개 경로)")
+            return
+
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(0)
+        self.status_label.setText("모니터링 해제 중...")
+
+        self.removal_worker = FolderRemovalWorker(self.indexer, paths)
+        self.removal_worker.progress.connect(self.update_removal_progress)
+        self.removal_worker.finished.connect(self.on_folder_removal_finished)
+        self.removal_worker.start()
+
+    def update_removal_progress(self, current, total, message):
+        percent = int((current / total) * 100) if total > 0 else 0
+        self.progress_bar.setValue(percent)
+        self.status_label.setText(message)
+
+    def on_folder_removal_finished(self, removed):
+        # finished는 run() 마지막에 emit되므로 스레드가 완전히 끝난 뒤 다음 작업 시작
+        self.removal_worker.wait()
+        self.refresh_current_view()
+        if self.pending_removals:
+            paths, self.pending_removals = self.pending_removals, []
+            self.start_folder_removal(paths)
+            return
+        self.progress_bar.setVisible(False)
+        self.status_label.setText(f"모니터링 해제됨 (인덱스 {removed}개 파일 삭제)")
 
+    def refresh_current_view(self):
         #Refresh UI
         if self.current_context == 'directory' and self.current_directory:
             self.load_directory(self.current_directory)
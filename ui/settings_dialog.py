@@ -1,10 +1,13 @@
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTabWidget, 
                              QWidget, QLabel, QLineEdit, QPushButton, QComboBox, 
                              QFormLayout, QListWidget, QListWidgetItem, QMessageBox, QFileDialog, QSizePolicy)
-from PySide6.QtCore import Qt, QSize
+from PySide6.QtCore import Qt, QSize, Signal
 from PySide6.QtGui import QColor
 
 class SettingsDialog(QDialog):
+    # 모니터링 해제할 폴더 목록 (인덱스 삭제는 MainWindow의 백그라운드 작업에서 수행)
+    folder_removal_requested = Signal(list)
+
     def __init__(self, indexer, parent=None):
         super().__init__(parent)
         self.indexer = indexer
@@ -232,11 +235,12 @@ class SettingsDialog(QDialog):
             QMessageBox.warning(self, "경고", "삭제할 폴더를 선택해주세요.")
             return
         
+        folders = []
         for item in items:
-            folder = item.text()
-            # Use remove_from_monitoring to ensure DB cleanup (Bug fix)
-            self.indexer.remove_from_monitoring(folder)
+            folders.append(item.text())
             self.folder_list.takeItem(self.folder_list.row(item))
+        # remove_from_monitoring(DB 정리)은 MainWindow가 백그라운드에서 일괄 수행
+        self.folder_removal_requested.emit(folders)
 
     def _remove_exception(self):
         items = self.exception_list.selectedItems()
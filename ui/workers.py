@@ -26,3 +26,27 @@ class IndexingWorker(QThread):
                     self.progress.emit(indexed_count, total_files, file)
         
         self.finished.emit(indexed_count)
+
+class FolderRemovalWorker(QThread):
+    """모니터링 해제 + 인덱스 데이터 일괄 삭제를 UI 스레드 밖에서 수행합니다."""
+    progress = Signal(int, int, str) # current, total, message
+    finished = Signal(int) # total_removed
+
+    def __init__(self, indexer, paths):
+        super().__init__()
+        self.indexer = indexer
+        self.paths = paths
+
+    def run(self):
+        removed = 0
+        steps = 3 # Indexer._remove_indexed_tree 단계 수
+        total = steps * len(self.paths)
+        for i, path in enumerate(self.paths):
+            def report(current, _, message, base=i * steps):
+                self.progress.emit(base + current, total, message)
+            try:
+                removed += self.indexer.remove_from_monitoring(path, progress=report) or 0
+            except Exception as e:
+                print(f"Error removing {path}: {e}")
+
+        self.finished.emit(removed)